@@ -0,0 +1,273 @@
+"""Async versions of the hot attendance APIs, routed when served via ASGI.
+
+school_project/asgi_urls.py maps these in front of the regular URLconf and
+ASGIURLConfMiddleware selects it for ASGI requests, so WSGI deployments keep
+using the synchronous views in views.py.
+"""
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .attendance_export import aiter_export
+from .db_routing import read_database, replica_reads
+from .db_writer import db_writer
+from .idempotency import idempotent
+from .models import DailyStats, AttendanceLog
+from .presence import absent_students, present_records
+from .rate_limit import rate_limited, scan_limiter, shed_load
+from .response_cache import cache_key, encoded_response, etag_matches, not_modified, response_cache
+from .roster_cache import roster_cache
+from .scan_dedupe import scan_dedupe
+from . import metrics, stats
+from .events import broker, format_sse
+from .views import (
+    STUDENT_STREAM_CHUNK_SIZE,
+    _absent_record,
+    _already_present,
+    _daily_etag,
+    _daily_payload,
+    _daily_record,
+    _export_request,
+    _parse_page_size,
+    _record_scan,
+    _student_row,
+    _student_summary,
+    _students_etag,
+    _students_page,
+    _students_queryset,
+    extract_student_id_from_qr,
+)
+
+
+def csrf_exempt(view):
+    # django.views.decorators.csrf.csrf_exempt only wraps coroutines from Django 5.0
+    view.csrf_exempt = True
+    return view
+
+
+async def _astream_students(rows):
+    yield '{"status": "success", "students": ['
+    total = 0
+    async for row in rows:
+        yield (', ' if total else '') + json.dumps(_student_row(row))
+        total += 1
+    yield f'], "total": {total}}}'
+
+
+@csrf_exempt
+@replica_reads
+async def get_students_api(request):
+    """Async get_students_api (same parameters and payload)"""
+    if request.method == 'GET':
+        try:
+            try:
+                students = _students_queryset(request)
+                page_size = _parse_page_size(request)
+            except ValueError as e:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+            
+            etag = _students_etag()
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            
+            if request.GET.get('stream') in ('1', 'true'):
+                # Pinned now: the stream is read after the view (and replica_reads) has returned
+                rows = students.using(read_database()).aiterator(chunk_size=STUDENT_STREAM_CHUNK_SIZE)
+                response = StreamingHttpResponse(
+                    _astream_students(rows),
+                    content_type='application/json'
+                )
+                response['ETag'] = etag
+                return response
+            
+            key = cache_key(request, etag)
+            entry = response_cache.get(key)
+            if entry is None:
+                if page_size is None:
+                    students_data = [_student_row(row) async for row in students]
+                    payload = {
+                        'status': 'success',
+                        'students': students_data,
+                        'total': len(students_data)
+                    }
+                else:
+                    rows = [row async for row in students[:page_size + 1]]
+                    payload = _students_page(rows, page_size)
+                entry = response_cache.set(key, etag, payload)
+            
+            return encoded_response(request, entry)
+            
+        except Exception as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+    
+    return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
+
+
+@csrf_exempt
+@rate_limited(scan_limiter)
+@idempotent
+@shed_load
+async def mark_attendance_api(request):
+    """Async mark_attendance_api (same request and response format)"""
+    if request.method == 'POST':
+        student = None
+        try:
+            data = json.loads(request.body)
+            qr_data = data.get('qr_data', '')
+            teacher_id = data.get('teacher_id', '')
+            
+            student_id = extract_student_id_from_qr(qr_data)
+            if not student_id:
+                metrics.record_scan('invalid_qr')
+                return JsonResponse({
+                    'status': 'error', 
+                    'message': 'Invalid QR code format. Expected STUDENT:ID format.'
+                }, status=400)
+            
+            student = await roster_cache.aget_student(student_id)
+            if student is None:
+                metrics.record_scan('unknown_student')
+                return JsonResponse({
+                    'status': 'error', 
+                    'message': f'Student ID {student_id} not found in database.'
+                }, status=404)
+            
+            today = timezone.now().date()
+            time_marked = scan_dedupe.get(student.pk, today)
+            if time_marked is not None:
+                metrics.record_scan('duplicate')
+                return _already_present(student, time_marked)
+            
+            teacher_pk = await roster_cache.aget_teacher_pk(teacher_id) if teacher_id else None
+            
+            # The mark, its log row and the DailyStats update share one transaction,
+            # which the async ORM cannot open, so the write runs as a sync unit
+            marked, daily_attendance = await db_writer.arun(_record_scan, student, teacher_pk, today, qr_data)
+            scan_dedupe.add(student.pk, today, daily_attendance.time_marked)
+            
+            if not marked:
+                metrics.record_scan('duplicate')
+                return _already_present(student, daily_attendance.time_marked)
+            
+            metrics.record_scan('marked')
+            return JsonResponse({
+                'status': 'success',
+                'message': f'✅ {student.get_full_name()} marked present!',
+                'student': _student_summary(student, daily_attendance.time_marked)
+            })
+            
+        except Exception as e:
+            metrics.record_scan('error')
+            # Log the failed attempt
+            try:
+                if student:
+                    await AttendanceLog.objects.acreate(
+                        student_id=student.pk,
+                        date=timezone.now().date(),
+                        method='QR_SCAN',
+                        qr_data=data.get('qr_data', ''),
+                        success=False,
+                        message=f'Error: {str(e)}'
+                    )
+            except Exception:
+                pass  # Don't fail the response if logging fails
+            
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+    
+    return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
+
+
+@csrf_exempt
+@replica_reads
+async def get_daily_attendance_api(request):
+    """Async get_daily_attendance_api"""
+    if request.method == 'GET':
+        try:
+            today = timezone.now().date()
+            etag = _daily_etag(today)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            
+            key = cache_key(request, etag)
+            entry = response_cache.get(key)
+            if entry is None:
+                records = [_daily_record(record) async for record in present_records(today)]
+                records += [_absent_record(student) async for student in absent_students(today)]
+                
+                daily_stats = await DailyStats.objects.filter(date=today).afirst()
+                if daily_stats is None:
+                    daily_stats = await sync_to_async(stats.get_daily_stats)(today)
+                
+                entry = response_cache.set(key, etag, _daily_payload(today, records, daily_stats))
+            
+            return encoded_response(request, entry)
+            
+        except Exception as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+    
+    return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
+
+
+@csrf_exempt
+async def export_attendance_api(request):
+    """Async export_attendance_api; rows are fetched with aiterator so the
+    export streams instead of being collected by the ASGI handler"""
+    if request.method == 'GET':
+        try:
+            try:
+                export, filename, content_type = _export_request(request)
+            except ValueError as e:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+            
+            response = StreamingHttpResponse(aiter_export(*export), content_type=content_type)
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
+            
+        except Exception as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+    
+    return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
+
+
+async def _event_stream(subscription, backlog):
+    keepalive = getattr(settings, 'ATTENDANCE_EVENT_KEEPALIVE', 15)
+    # Django 4.2 does not notice disconnected clients mid-stream, so streams end
+    # after a while and EventSource reconnects with Last-Event-ID
+    deadline = time.monotonic() + getattr(settings, 'ATTENDANCE_EVENT_STREAM_MAX_AGE', 300)
+    try:
+        yield 'retry: 3000\n\n'
+        for event in backlog:
+            yield format_sse(event)
+        while time.monotonic() < deadline:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            yield format_sse(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def attendance_stream_api(request):
+    """Server-Sent Events feed of new marks and updated counts.
+    
+    Reconnecting clients send Last-Event-ID (EventSource does this itself) and
+    receive only the events they missed, or a ``resync`` event when those are
+    no longer in the history.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    subscription, backlog = broker.subscribe(last_event_id)
+    
+    response = StreamingHttpResponse(_event_stream(subscription, backlog), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,160 @@
+"""Streaming attendance export (CSV or JSONL, optionally gzipped).
+
+Rows are read with a server-side iterator over a single joined query and
+encoded in batches, so exporting a year for thousands of students never holds
+more than EXPORT_CHUNK_SIZE rows in memory. ``daily`` exports the stored
+DailyAttendance rows (presence only in sparse mode, see presence.py), ``log``
+exports every AttendanceLog entry.
+"""
+import csv
+import json
+import zlib
+
+from django.conf import settings
+
+from .models import AttendanceLog, DailyAttendance
+
+FORMATS = ('csv', 'jsonl')
+
+DAILY_COLUMNS = (
+    'date', 'student_id', 'first_name', 'last_name', 'course', 'level',
+    'present', 'method', 'time_marked', 'marked_by',
+)
+LOG_COLUMNS = (
+    'date', 'time', 'student_id', 'first_name', 'last_name', 'course', 'level',
+    'teacher_id', 'method', 'success', 'message', 'qr_data',
+)
+
+
+def _chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def _filter_students(queryset, course, level):
+    if course:
+        queryset = queryset.filter(student__course=course)
+    if level:
+        queryset = queryset.filter(student__level=level)
+    return queryset
+
+
+def _daily_queryset(start, end, course, level):
+    records = _filter_students(DailyAttendance.objects.filter(date__range=(start, end)), course, level)
+    # values() rather than values_list(): in Django 4.2 only the former defers
+    # its query until iteration, which aiterator() relies on
+    return records.order_by('date', 'student_id').values(
+        'date', 'student__student_id', 'student__first_name', 'student__last_name',
+        'student__course', 'student__level', 'is_present', 'qr_scanned', 'time_marked',
+        'marked_by_teacher__teacher_id',
+    )
+
+
+def _daily_row(values):
+    present = values['is_present']
+    method = ('QR Scan' if values['qr_scanned'] else 'Manual') if present else ''
+    return (
+        values['date'].isoformat(), values['student__student_id'], values['student__first_name'],
+        values['student__last_name'], values['student__course'], values['student__level'],
+        present, method, values['time_marked'].strftime('%H:%M:%S'),
+        values['marked_by_teacher__teacher_id'] or '',
+    )
+
+
+def _log_queryset(start, end, course, level):
+    logs = _filter_students(AttendanceLog.objects.filter(date__range=(start, end)), course, level)
+    return logs.order_by('date', 'time_marked', 'id').values(
+        'date', 'time_marked', 'student__student_id', 'student__first_name', 'student__last_name',
+        'student__course', 'student__level', 'teacher__teacher_id', 'method', 'success',
+        'message', 'qr_data',
+    )
+
+
+def _log_row(values):
+    return (
+        values['date'].isoformat(), values['time_marked'].strftime('%H:%M:%S'),
+        values['student__student_id'], values['student__first_name'], values['student__last_name'],
+        values['student__course'], values['student__level'], values['teacher__teacher_id'] or '',
+        values['method'], values['success'], values['message'], values['qr_data'],
+    )
+
+
+SOURCES = {
+    'daily': (DAILY_COLUMNS, _daily_queryset, _daily_row),
+    'log': (LOG_COLUMNS, _log_queryset, _log_row),
+}
+
+
+class _Echo:
+    """File-like object for csv.writer that hands back each formatted line"""
+
+    def write(self, value):
+        return value
+
+
+class ExportEncoder:
+    """Turns batches of rows into CSV/JSONL bytes, gzipping them on the fly if asked"""
+
+    def __init__(self, columns, format='csv', compress=False):
+        if format not in FORMATS:
+            raise ValueError(f'Unsupported format: {format} (expected csv or jsonl)')
+        self.columns = columns
+        self.format = format
+        self._writer = csv.writer(_Echo())
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+
+    def _output(self, text):
+        data = text.encode()
+        return self._compressor.compress(data) if self._compressor else data
+
+    def header(self):
+        return self._output(self._writer.writerow(self.columns) if self.format == 'csv' else '')
+
+    def encode(self, rows):
+        if self.format == 'csv':
+            return self._output(''.join(self._writer.writerow(row) for row in rows))
+        return self._output(''.join(json.dumps(dict(zip(self.columns, row))) + '\n' for row in rows))
+
+    def finish(self):
+        return self._compressor.flush() if self._compressor else b''
+
+
+def build_export(source, start, end, course=None, level=None, format='csv', compress=False):
+    """Return ``(queryset, row_function, encoder)`` for one export"""
+    if source not in SOURCES:
+        raise ValueError(f'Unsupported source: {source} (expected daily or log)')
+    if end < start:
+        raise ValueError('end must not be before start')
+    columns, queryset, row = SOURCES[source]
+    return queryset(start, end, course, level), row, ExportEncoder(columns, format, compress)
+
+
+def export_filename(source, start, end, format='csv', compress=False):
+    return f"attendance_{source}_{start}_{end}.{format}{'.gz' if compress else ''}"
+
+
+def iter_export(queryset, row, encoder):
+    """Yield the encoded export in chunks of EXPORT_CHUNK_SIZE rows"""
+    chunk_size = _chunk_size()
+    yield encoder.header()
+    batch = []
+    for values in queryset.iterator(chunk_size=chunk_size):
+        batch.append(row(values))
+        if len(batch) >= chunk_size:
+            yield encoder.encode(batch)
+            batch = []
+    yield encoder.encode(batch)
+    yield encoder.finish()
+
+
+async def aiter_export(queryset, row, encoder):
+    """Async iter_export, for the ASGI view"""
+    chunk_size = _chunk_size()
+    yield encoder.header()
+    batch = []
+    async for values in queryset.aiterator(chunk_size=chunk_size):
+        batch.append(row(values))
+        if len(batch) >= chunk_size:
+            yield encoder.encode(batch)
+            batch = []
+    yield encoder.encode(batch)
+    yield encoder.finish()
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(deploy=True)
+def shared_cache_check(app_configs, **kwargs):
+    """The version counters (versions.py) only reach every worker through a shared cache"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PER_PROCESS_CACHES:
+        return []
+    return [Warning(
+        f'The default cache ({backend}) is per process, so a write in one worker leaves the '
+        'roster, ETags and cached responses of the others stale.',
+        hint='Set ATTENDANCE_CACHE=file (one host) or ATTENDANCE_CACHE=redis://... (several hosts).',
+        id='attendance_app.W001',
+    )]
+
+
+@register(deploy=True)
+def vendored_scripts_check(app_configs, **kwargs):
+    """Scripts that are not vendored are fetched from third-party CDNs on every fresh load"""
+    from .static_assets import unvendored_scripts
+
+    missing = unvendored_scripts()
+    if not missing:
+        return []
+    return [Warning(
+        f'Not vendored: {", ".join(missing)}. The page loads these scripts from their pinned CDN URLs.',
+        hint='Run python manage.py vendor_static, commit static/attendance_app/vendor/, then collectstatic.',
+        id='attendance_app.W002',
+    )]
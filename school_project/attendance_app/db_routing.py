@@ -0,0 +1,186 @@
+"""Database routing: campus shards and read replicas.
+
+Campus shards: every campus in ATTENDANCE_CAMPUS_DATABASES has a database of
+its own holding all of the attendance_app tables (students, teachers, marks,
+logs, statistics, bitmaps). The routing key is the campus of the request,
+which CampusRoutingMiddleware takes from the X-Campus header, a ``campus``
+query parameter or cookie; without one the request is served from
+default_database(). The alias is kept in a context variable, so it follows
+the request into sync_to_async threads and the single writer thread, and the
+router, the transactions and the per-worker caches (versions.py,
+roster_cache.py, scan_dedupe.py, events.py) are all scoped to it. Management
+commands use ATTENDANCE_DEFAULT_CAMPUS (the ATTENDANCE_CAMPUS environment
+variable). Other apps (auth, sessions, admin) stay on 'default'.
+
+Read replicas: ATTENDANCE_READ_REPLICAS maps a primary alias to its replica.
+Views wrapped in replica_reads() (roster, daily list, reports) send their
+attendance reads to the replica while it passes the health check, and to the
+primary otherwise; writes, and reads inside a write transaction, always use
+the primary. A replica may lag its primary, so a response can be cached under
+a newer ETag than the data it was built from until the next change; with
+SQLite files standing in for replicas, sync_replica copies the primaries and
+bumps the versions afterwards.
+"""
+import contextlib
+import functools
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+ROUTED_APPS = {'attendance_app'}
+
+_database = ContextVar('attendance_database', default=None)
+_replica_reads = ContextVar('attendance_replica_reads', default=False)
+
+
+class UnknownCampus(Exception):
+    pass
+
+
+def campus_databases():
+    return getattr(settings, 'ATTENDANCE_CAMPUS_DATABASES', {})
+
+
+def read_replicas():
+    return getattr(settings, 'ATTENDANCE_READ_REPLICAS', {})
+
+
+def database_for_campus(campus):
+    """Alias of the database holding ``campus``"""
+    try:
+        return campus_databases()[campus]
+    except KeyError:
+        raise UnknownCampus(f'Unknown campus: {campus}')
+
+
+def default_database():
+    campus = getattr(settings, 'ATTENDANCE_DEFAULT_CAMPUS', None)
+    return database_for_campus(campus) if campus else DEFAULT_DB_ALIAS
+
+
+def current_database():
+    """Primary alias of the campus being served"""
+    return _database.get() or default_database()
+
+
+def set_database(alias):
+    """Serve the rest of this context (e.g. the current request) from ``alias``"""
+    _database.set(alias)
+
+
+@contextlib.contextmanager
+def using_database(alias):
+    token = _database.set(alias)
+    try:
+        yield alias
+    finally:
+        _database.reset(token)
+
+
+def read_database():
+    """Alias attendance reads go to: the replica inside replica_reads() when it is usable"""
+    primary = current_database()
+    if not _replica_reads.get():
+        return primary
+    replica = read_replicas().get(primary)
+    # Read your own writes: inside a write transaction stay on the primary
+    if replica is None or connections[primary].in_atomic_block or not database_health.is_healthy(replica):
+        return primary
+    return replica
+
+
+def replica_reads(view):
+    """Let the attendance reads of ``view`` be served from a read replica"""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            token = _replica_reads.set(True)
+            try:
+                return await view(*args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+    else:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            token = _replica_reads.set(True)
+            try:
+                return view(*args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+    return wrapper
+
+
+class AttendanceRouter:
+    """Send attendance_app models to the campus database, and reads to its replica where allowed"""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in ROUTED_APPS:
+            return read_database()
+        return None
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in ROUTED_APPS:
+            return current_database()
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of their primary, never migrated directly
+        if db in read_replicas().values():
+            return False
+        return None
+
+
+# ============ HEALTH CHECKS ============
+
+class DatabaseHealth:
+    """Liveness of each database alias, probed at most every ATTENDANCE_DB_HEALTH_INTERVAL seconds"""
+
+    def __init__(self, interval=None):
+        self.interval = interval if interval is not None else getattr(settings, 'ATTENDANCE_DB_HEALTH_INTERVAL', 5.0)
+        self._lock = threading.Lock()
+        # alias -> (checked at, status dict)
+        self._results = {}
+
+    def check(self, alias):
+        """Probe ``alias`` now: reachable and migrated (a fresh SQLite file has no tables)"""
+        started = time.perf_counter()
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1 FROM django_migrations LIMIT 1')
+                cursor.fetchone()
+            status = {'ok': True, 'error': None}
+        except Exception as e:
+            status = {'ok': False, 'error': str(e)}
+            # Don't keep a broken connection around for the next request
+            with contextlib.suppress(Exception):
+                connections[alias].close()
+        status['latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        with self._lock:
+            self._results[alias] = (time.monotonic(), status)
+        return status
+
+    def is_healthy(self, alias):
+        result = self._results.get(alias)
+        if result is None or time.monotonic() - result[0] >= self.interval:
+            return self.check(alias)['ok']
+        return result[1]['ok']
+
+    def reset(self):
+        with self._lock:
+            self._results.clear()
+
+
+database_health = DatabaseHealth()
+
+
+def database_roles():
+    """alias -> role ('primary' or 'replica of <alias>') for every configured database"""
+    replicas = {replica: primary for primary, replica in read_replicas().items()}
+    return {
+        alias: f'replica of {replicas[alias]}' if alias in replicas else 'primary'
+        for alias in settings.DATABASES
+    }
@@ -0,0 +1,94 @@
+"""Single-writer queue for attendance writes.
+
+SQLite allows one writer at a time; when many request threads try to write at
+once they queue up on the file lock and eventually fail with "database is
+locked". With ``ATTENDANCE_SINGLE_WRITER`` enabled, attendance writes are
+handed to one dedicated thread through a queue instead, so request threads
+never contend for the write lock. When it is disabled the write function is
+simply called in the request thread.
+"""
+import asyncio
+import contextvars
+import queue
+import threading
+from concurrent.futures import Future
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+
+class SingleWriter:
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'ATTENDANCE_SINGLE_WRITER', False)
+
+    def depth(self):
+        """Number of writes waiting for the writer thread"""
+        return self._queue.qsize()
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue ``fn`` for the writer thread and return a Future for its result"""
+        self._ensure_started()
+        future = Future()
+        # Run in the caller's context so per-request state (e.g. metrics) follows the write
+        self._queue.put((future, contextvars.copy_context(), fn, args, kwargs))
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        """Run a write, through the writer thread when the single writer is enabled"""
+        if not self.enabled or threading.current_thread() is self._thread:
+            return fn(*args, **kwargs)
+        return self.submit(fn, *args, **kwargs).result(
+            timeout=getattr(settings, 'ATTENDANCE_WRITE_TIMEOUT', 30)
+        )
+
+    async def arun(self, fn, *args, **kwargs):
+        """Await a write without blocking the event loop (queued when the single writer is enabled)"""
+        if not self.enabled:
+            return await sync_to_async(fn)(*args, **kwargs)
+        return await asyncio.wait_for(
+            asyncio.wrap_future(self.submit(fn, *args, **kwargs)),
+            timeout=getattr(settings, 'ATTENDANCE_WRITE_TIMEOUT', 30)
+        )
+
+    def stop(self):
+        """Stop the writer thread (it is restarted on the next write)"""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(None)
+            thread.join()
+            self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work, name='attendance-writer', daemon=True)
+                self._thread.start()
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            future, context, fn, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            close_old_connections()
+            try:
+                future.set_result(context.run(fn, *args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+        connections.close_all()
+
+
+db_writer = SingleWriter()
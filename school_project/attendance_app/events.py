@@ -0,0 +1,138 @@
+"""In-process pub/sub fan-out for the live attendance feed.
+
+Marks and roster changes are published after their transaction commits. Each
+connected dashboard (see async_views.attendance_stream_api) holds an asyncio
+queue on its event loop; publishers may run in any thread. A bounded history
+lets reconnecting clients resume from Last-Event-ID and receive only what they
+missed. The fan-out is per process: run a single ASGI worker, or dashboards
+only see the scans handled by the worker they are connected to. Events are
+tagged with the database they were written to, and dashboards only receive
+those of their own campus (see db_routing.py).
+"""
+import asyncio
+import itertools
+import json
+import threading
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+
+from . import stats
+from .db_routing import current_database
+
+# Event IDs are "<boot>-<n>" so IDs from before a restart are recognised as stale
+BOOT_ID = uuid.uuid4().hex[:8]
+
+
+class Subscription:
+    def __init__(self, loop, max_queue, database):
+        self.loop = loop
+        self.database = database
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+    def deliver(self, event):
+        # Runs on the subscriber's event loop
+        if self.queue.full():
+            # Too slow to keep up: drop the backlog and ask the client to refetch
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = resync_event()
+        self.queue.put_nowait(event)
+
+
+class EventBroker:
+    def __init__(self, history_size=None, max_queue=None):
+        self.history_size = history_size or getattr(settings, 'ATTENDANCE_EVENT_HISTORY', 1000)
+        self.max_queue = max_queue or getattr(settings, 'ATTENDANCE_EVENT_QUEUE_SIZE', 500)
+        self._history = deque(maxlen=self.history_size)
+        self._counter = itertools.count(1)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event_type, data):
+        with self._lock:
+            event = {'id': f'{BOOT_ID}-{next(self._counter)}', 'event': event_type, 'data': data,
+                     'database': current_database()}
+            self._history.append(event)
+            subscribers = [
+                subscription for subscription in self._subscribers if subscription.database == event['database']
+            ]
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The subscriber's loop is gone
+                self.unsubscribe(subscription)
+        return event
+
+    def subscribe(self, last_event_id=None):
+        """Register the running event loop; returns (subscription, missed events)"""
+        subscription = Subscription(asyncio.get_running_loop(), self.max_queue, current_database())
+        with self._lock:
+            self._subscribers.add(subscription)
+            backlog = self._since(last_event_id) if last_event_id else []
+        backlog = [event for event in backlog if event.get('database', subscription.database) == subscription.database]
+        return subscription, backlog
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def _since(self, last_event_id):
+        boot, _, number = last_event_id.partition('-')
+        if boot != BOOT_ID or not number.isdigit():
+            return [resync_event()]
+        number = int(number)
+        if self._history and int(self._history[0]['id'].split('-')[1]) > number + 1:
+            # Part of what the client missed has already left the history
+            return [resync_event()]
+        return [event for event in self._history if int(event['id'].split('-')[1]) > number]
+
+
+def resync_event():
+    """Tell a client its view is stale and it should refetch /api/attendance/daily/"""
+    return {'id': None, 'event': 'resync', 'data': {}}
+
+
+def format_sse(event):
+    lines = []
+    if event['id']:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['event']}")
+    lines.append(f"data: {json.dumps(event['data'])}")
+    return '\n'.join(lines) + '\n\n'
+
+
+broker = EventBroker()
+
+
+def publish_marks(date, marks, method='QR Scan'):
+    """Publish (student, attendance record) pairs once the marking transaction commits"""
+    def send():
+        counts = stats.summarize(stats.get_daily_stats(date))
+        for student, record in marks:
+            broker.publish('mark', {
+                'date': date.isoformat(),
+                'student_id': student.student_id,
+                'student_name': student.get_full_name(),
+                'course_level': f"{student.course} - Year {student.level}",
+                'time_marked': record.time_marked.strftime('%H:%M:%S'),
+                'method': method,
+                'statistics': counts,
+            })
+
+    if marks:
+        transaction.on_commit(send, using=current_database())
+
+
+def publish_statistics(date):
+    """Publish refreshed counts (e.g. after a registration) once the transaction commits"""
+    transaction.on_commit(lambda: broker.publish('statistics', {
+        'date': date.isoformat(),
+        'statistics': stats.summarize(stats.get_daily_stats(date)),
+    }), using=current_database())
@@ -0,0 +1,139 @@
+"""Idempotency-Key support for the scan endpoints.
+
+A client that retries a POST after a dropped connection sends the same
+``Idempotency-Key`` header again; the first response stored under that key
+(for the same path and body) is replayed instead of running the view twice.
+A retry that arrives while the original is still running gets 409, a key
+reused with a different body gets 422. 5xx responses are not stored, so a
+retry after a server error runs again. Keys are kept per worker for
+IDEMPOTENCY_KEY_TTL seconds.
+"""
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+
+from .db_routing import current_database
+
+MAX_KEY_LENGTH = 255
+
+StoredResponse = namedtuple('StoredResponse', ['fingerprint', 'expires', 'status', 'body', 'content_type'])
+
+
+class IdempotencyStore:
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = ttl if ttl is not None else getattr(settings, 'IDEMPOTENCY_KEY_TTL', 86400)
+        self.max_entries = max_entries or getattr(settings, 'IDEMPOTENCY_CACHE_SIZE', 10000)
+        self._lock = threading.Lock()
+        # (database, path, key) -> StoredResponse (status None while the request is in flight), oldest first
+        self._entries = OrderedDict()
+        self.replays = 0
+
+    def begin(self, request):
+        """Return ``(key, None)`` to run the view, or ``(None, response)`` to answer without it"""
+        header = request.headers.get('Idempotency-Key')
+        if not header or request.method != 'POST':
+            return None, None
+        if len(header) > MAX_KEY_LENGTH:
+            return None, JsonResponse({
+                'status': 'error',
+                'message': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters.'
+            }, status=400)
+
+        key = (current_database(), request.path, header)
+        fingerprint = hashlib.sha256(request.body).digest()
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = StoredResponse(fingerprint, now + self.ttl, None, None, None)
+                return key, None
+            if entry.fingerprint != fingerprint:
+                return None, JsonResponse({
+                    'status': 'error',
+                    'message': 'Idempotency-Key was already used for a different request.'
+                }, status=422)
+            if entry.status is None:
+                response = JsonResponse({
+                    'status': 'error',
+                    'message': 'A request with this Idempotency-Key is still being processed.'
+                }, status=409)
+                response['Retry-After'] = '1'
+                return None, response
+            self.replays += 1
+
+        response = HttpResponse(entry.body, status=entry.status, content_type=entry.content_type)
+        response['Idempotent-Replayed'] = 'true'
+        return None, response
+
+    def finish(self, key, response):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or response.status_code >= 500 or response.streaming:
+                return
+            self._entries[key] = entry._replace(
+                status=response.status_code, body=response.content, content_type=response['Content-Type']
+            )
+
+    def abandon(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _expire(self, now):
+        # Same TTL for every key, so the oldest ones expire first
+        while self._entries:
+            oldest = next(iter(self._entries.values()))
+            if oldest.expires > now and len(self._entries) < self.max_entries:
+                break
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {'size': len(self._entries), 'ttl': self.ttl, 'replays': self.replays}
+
+
+idempotency_store = IdempotencyStore()
+
+
+def idempotent(view):
+    """Honour Idempotency-Key on a sync or async view"""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            key, response = idempotency_store.begin(request)
+            if response is not None:
+                return response
+            if key is None:
+                return await view(request, *args, **kwargs)
+            try:
+                response = await view(request, *args, **kwargs)
+            except BaseException:
+                idempotency_store.abandon(key)
+                raise
+            idempotency_store.finish(key, response)
+            return response
+    else:
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key, response = idempotency_store.begin(request)
+            if response is not None:
+                return response
+            if key is None:
+                return view(request, *args, **kwargs)
+            try:
+                response = view(request, *args, **kwargs)
+            except BaseException:
+                idempotency_store.abandon(key)
+                raise
+            idempotency_store.finish(key, response)
+            return response
+    return wrapper
@@ -0,0 +1,185 @@
+"""AttendanceLog retention: monthly archives and a reader that spans them.
+
+Whole months that ended more than ATTENDANCE_LOG_RETENTION_DAYS ago are moved
+into one gzipped JSONL file per month under ATTENDANCE_LOG_ARCHIVE_DIR. The
+month file is rewritten to a temporary file and renamed into place, so it is
+never half-written. Only then are the archived rows deleted, in short batches.
+A run interrupted between the two steps is safe to repeat: rows whose id is
+already in the archive are only deleted, not written again. Logs backdated
+into an archived month later are appended on the next run.
+
+read_logs() returns live and archived logs together, newest first.
+"""
+import datetime
+import gzip
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from .db_routing import current_database
+from .db_writer import db_writer
+from .models import AttendanceLog
+
+LOG_FIELDS = ('id', 'date', 'time_marked', 'student__student_id', 'teacher__teacher_id',
+              'method', 'qr_data', 'success', 'message')
+
+
+def archive_dir():
+    path = Path(getattr(settings, 'ATTENDANCE_LOG_ARCHIVE_DIR', settings.BASE_DIR / 'archive' / 'attendance_logs'))
+    database = current_database()
+    # Each campus shard archives into a directory of its own
+    return path if database == DEFAULT_DB_ALIAS else path / database
+
+
+def retention_cutoff(today=None, days=None):
+    """First date kept in the database: the start of the month the retention window begins in"""
+    days = days if days is not None else getattr(settings, 'ATTENDANCE_LOG_RETENTION_DAYS', 180)
+    return ((today or timezone.now().date()) - datetime.timedelta(days=days)).replace(day=1)
+
+
+def month_path(month):
+    return archive_dir() / f'attendance_log_{month:%Y-%m}.jsonl.gz'
+
+
+def _month_bounds(month):
+    next_month = (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return month, next_month - datetime.timedelta(days=1)
+
+
+def _log_record(values):
+    return {
+        'id': values['id'],
+        'date': values['date'].isoformat(),
+        'time': values['time_marked'].strftime('%H:%M:%S'),
+        'student_id': values['student__student_id'],
+        'teacher_id': values['teacher__teacher_id'],
+        'method': values['method'],
+        'qr_data': values['qr_data'],
+        'success': values['success'],
+        'message': values['message'],
+    }
+
+
+def _read_archive(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as archive:
+        for line in archive:
+            if line.strip():
+                yield json.loads(line)
+
+
+def archive_month(month):
+    """Add the month's logs to its archive file.
+
+    Returns ``(written, max_id)``. Every log of the month with an id up to max_id
+    is in the archive (ids only grow, and a month is archived whole), so those
+    rows can be deleted.
+    """
+    path = month_path(month)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    logs = AttendanceLog.objects.filter(date__range=_month_bounds(month))
+
+    written = 0
+    max_id = 0
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as raw, gzip.open(raw, 'wt', encoding='utf-8') as archive:
+            if path.exists():
+                for record in _read_archive(path):
+                    archive.write(json.dumps(record) + '\n')
+                    max_id = max(max_id, record['id'])
+            archived_up_to = max_id
+            # Rows at or below the archive's max id are left over from an interrupted run
+            rows = logs.filter(id__gt=archived_up_to).order_by('id').values(*LOG_FIELDS)
+            for values in rows.iterator(chunk_size=2000):
+                archive.write(json.dumps(_log_record(values)) + '\n')
+                max_id = values['id']
+                written += 1
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return written, max_id
+
+
+def _delete_batch(ids):
+    return AttendanceLog.objects.filter(id__in=ids).delete()[0]
+
+
+def delete_archived(month, max_id, batch_size=None):
+    """Delete the archived rows of one month in batches; returns the number deleted"""
+    batch_size = batch_size or getattr(settings, 'ATTENDANCE_LOG_DELETE_BATCH', 5000)
+    logs = AttendanceLog.objects.filter(date__range=_month_bounds(month), id__lte=max_id).order_by('id')
+
+    deleted = 0
+    while True:
+        ids = list(logs.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        # One short write transaction per batch so scans are never blocked for long
+        deleted += db_writer.run(_delete_batch, ids)
+
+
+def months_to_archive(cutoff):
+    """Months with logs dated before ``cutoff`` (a month start)"""
+    return list(AttendanceLog.objects.filter(date__lt=cutoff).dates('date', 'month'))
+
+
+def optimize_database(vacuum=True, model=AttendanceLog):
+    """Refresh planner statistics and return freed pages to the filesystem"""
+    table = model._meta.db_table
+    connection = connections[current_database()]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('ANALYZE')
+            if vacuum:
+                cursor.execute('VACUUM')
+        elif connection.vendor == 'postgresql':
+            cursor.execute(f'VACUUM ANALYZE {connection.ops.quote_name(table)}' if vacuum
+                           else f'ANALYZE {connection.ops.quote_name(table)}')
+        else:
+            cursor.execute(f'ANALYZE TABLE {connection.ops.quote_name(table)}')
+
+
+def _archived_months(start, end):
+    month = start.replace(day=1)
+    months = []
+    while month <= end:
+        if month_path(month).exists():
+            months.append(month)
+        month = _month_bounds(month)[1] + datetime.timedelta(days=1)
+    return months
+
+
+def read_logs(start, end, student_id=None, limit=100):
+    """Up to ``limit`` logs dated ``start``..``end`` from the database and the archives, newest first"""
+    logs = AttendanceLog.objects.filter(date__range=(start, end))
+    if student_id:
+        logs = logs.filter(student__student_id=student_id)
+    records = [
+        dict(_log_record(values), archived=False)
+        for values in logs.order_by('-date', '-time_marked', '-id').values(*LOG_FIELDS)[:limit]
+    ]
+
+    def newest_first():
+        records.sort(key=lambda record: (record['date'], record['time'], record['id']), reverse=True)
+        del records[limit:]
+
+    start_text, end_text = start.isoformat(), end.isoformat()
+    for month in reversed(_archived_months(start, end)):
+        # Stop once this month is older than everything that already made the cut
+        if len(records) >= limit and _month_bounds(month)[1].isoformat() < records[-1]['date']:
+            break
+        for record in _read_archive(month_path(month)):
+            if start_text <= record['date'] <= end_text and (not student_id or record['student_id'] == student_id):
+                record['archived'] = True
+                records.append(record)
+                if len(records) >= 2 * limit:
+                    newest_first()
+        newest_first()
+
+    return records
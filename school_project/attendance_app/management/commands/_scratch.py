@@ -0,0 +1,53 @@
+"""Helpers shared by the benchmark commands"""
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import override_settings
+
+from attendance_app.db_routing import using_database
+from attendance_app.db_writer import db_writer
+from attendance_app.idempotency import idempotency_store
+from attendance_app.rate_limit import scan_limiter, upload_limiter
+from attendance_app.roster_cache import invalidate_roster
+from attendance_app.scan_dedupe import scan_dedupe
+from attendance_app.stats import ATTENDANCE_VERSION
+from attendance_app.versions import bump_version
+
+
+@contextmanager
+def scratch_database(name, db_options=None):
+    """Point the default database at a fresh, migrated SQLite file for the block.
+
+    ``db_options`` replaces the database OPTIONS; None keeps the configured ones.
+    Campus routing and read replicas are switched off for the block, so every
+    query (from any thread) goes to the scratch file, and so are the per-device
+    rate limits and load shedding, which would otherwise throttle the benchmark.
+    """
+    db_settings = connections.settings['default']
+    original = dict(db_settings)
+    with tempfile.TemporaryDirectory() as tmp, using_database(DEFAULT_DB_ALIAS), override_settings(
+        ATTENDANCE_CAMPUS_DATABASES={}, ATTENDANCE_DEFAULT_CAMPUS=None, ATTENDANCE_READ_REPLICAS={},
+        SCAN_RATE_LIMIT=0, UPLOAD_RATE_LIMIT=0, ATTENDANCE_MAX_WRITES_IN_FLIGHT=0, ATTENDANCE_WRITE_QUEUE_LIMIT=0,
+    ):
+        connections['default'].close()
+        db_settings['NAME'] = str(Path(tmp) / f'{name}.sqlite3')
+        if db_options is not None:
+            db_settings['OPTIONS'] = db_options
+        try:
+            call_command('migrate', verbosity=0, interactive=False)
+            yield
+        finally:
+            db_writer.stop()
+            connections['default'].close()
+            db_settings.clear()
+            db_settings.update(original)
+            # Nothing cached from the scratch database may outlive it
+            invalidate_roster()
+            bump_version(ATTENDANCE_VERSION)
+            scan_dedupe.clear()
+            idempotency_store.clear()
+            scan_limiter.clear()
+            upload_limiter.clear()
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+
+from attendance_app.log_archive import (
+    archive_dir, archive_month, delete_archived, month_path, months_to_archive, optimize_database,
+    retention_cutoff,
+)
+from attendance_app.models import AttendanceLog
+
+
+class Command(BaseCommand):
+    help = (
+        'Move AttendanceLog rows of months past the retention window into per-month '
+        'jsonl.gz archives, delete them in batches, then ANALYZE/VACUUM'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help='Keep at least this many days of logs (default ATTENDANCE_LOG_RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int,
+                            help='Rows deleted per transaction (default ATTENDANCE_LOG_DELETE_BATCH)')
+        parser.add_argument('--no-vacuum', action='store_true',
+                            help='Only ANALYZE afterwards; VACUUM rewrites the whole SQLite file')
+        parser.add_argument('--dry-run', action='store_true', help='Show what would be archived')
+
+    def handle(self, *args, **options):
+        cutoff = retention_cutoff(days=options['days'])
+        self.stdout.write(f'Archiving logs dated before {cutoff} to {archive_dir()}')
+
+        if options['dry_run']:
+            counts = (AttendanceLog.objects.filter(date__lt=cutoff).annotate(month=TruncMonth('date'))
+                      .values('month').annotate(logs=Count('id')).order_by('month'))
+            for row in counts:
+                self.stdout.write(f"{row['month']:%Y-%m}: {row['logs']} logs -> {month_path(row['month'])}")
+            return
+
+        total = 0
+        for month in months_to_archive(cutoff):
+            written, max_id = archive_month(month)
+            deleted = delete_archived(month, max_id, options['batch_size'])
+            total += deleted
+            self.stdout.write(f'{month:%Y-%m}: archived {written}, deleted {deleted} -> {month_path(month)}')
+
+        if total:
+            optimize_database(vacuum=not options['no_vacuum'])
+        self.stdout.write(self.style.SUCCESS(f'Moved {total} logs out of the database'))
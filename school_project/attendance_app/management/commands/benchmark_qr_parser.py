@@ -0,0 +1,76 @@
+import json
+import random
+import re
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from attendance_app.qr_payload import parse_student_qr, student_qr_data
+
+
+def legacy_extract_student_id(qr_data):
+    """extract_student_id_from_qr as it was before the v2 payload, for comparison"""
+    if not qr_data:
+        return None
+    if qr_data.startswith('STUDENT:'):
+        return qr_data.split('STUDENT:')[1]
+    numeric_match = re.search(r'\d+', qr_data)
+    if numeric_match:
+        return numeric_match.group()
+    return None
+
+
+def sample_payloads(count, rng):
+    """Scans as a phone camera sees them: badges of each format plus things that are not badges"""
+    kinds = {
+        'v2': lambda i: student_qr_data(f'{2024000 + i}'),
+        'legacy': lambda i: f'STUDENT:{2024000 + i}',
+        'forged_v2': lambda i: f'STUDENT:v2:{2024000 + i}:{rng.getrandbits(48):012x}',
+        'url': lambda i: f'https://example.com/products/{rng.randrange(10 ** 6)}?ref=qr{i}',
+        'ean13': lambda i: f'{rng.randrange(10 ** 12, 10 ** 13)}',
+        'text': lambda i: f'WIFI:S:Library-{i};T:WPA;P:{rng.getrandbits(32):08x};;',
+    }
+    return {kind: [make(i) for i in range(count)] for kind, make in kinds.items()}
+
+
+class Command(BaseCommand):
+    help = (
+        'Micro-benchmark parse_student_qr (v2 payloads) against the old regex-based '
+        'extract_student_id_from_qr: time per call and how many scans of each kind '
+        'would go on to a student lookup'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payloads', type=int, default=1000, help='Payloads per kind')
+        parser.add_argument('--repeat', type=int, default=5, help='Timing runs; the fastest is reported')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the payloads')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        payloads = sample_payloads(options['payloads'], random.Random(options['seed']))
+        parsers = [('legacy_regex', legacy_extract_student_id), ('qr_payload_v2', parse_student_qr)]
+
+        results = []
+        for kind, values in payloads.items():
+            for name, parse in parsers:
+                seconds = min(timeit.repeat(
+                    lambda: [parse(value) for value in values], number=1, repeat=options['repeat']
+                ))
+                results.append({
+                    'payload': kind,
+                    'parser': name,
+                    'ns_per_call': round(seconds / len(values) * 1e9),
+                    'accepted': sum(1 for value in values if parse(value) is not None),
+                    'payloads': len(values),
+                })
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{'payload':<12}{'parser':<16}{'ns/call':>10}{'accepted':>12}")
+        for result in results:
+            self.stdout.write(
+                f"{result['payload']:<12}{result['parser']:<16}{result['ns_per_call']:>10}"
+                f"{result['accepted']:>7}/{result['payloads']}"
+            )
@@ -0,0 +1,117 @@
+import json
+import random
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import RequestFactory, override_settings
+
+from attendance_app.models import Student
+from attendance_app.qr_payload import student_qr_data
+from attendance_app.roster_cache import invalidate_roster
+from attendance_app.views import mark_attendance_api
+
+from ._scratch import scratch_database
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark mark_attendance_api scans/second against a scratch SQLite file, '
+        'with and without the production profile (WAL pragmas + single writer)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000, help='Students to seed')
+        parser.add_argument('--scans', type=int, default=2000, help='Scans per profile')
+        parser.add_argument('--threads', type=int, default=16, help='Concurrent scanner threads')
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        profiles = [
+            ('default', {}, False, {}),
+            ('production', settings.SQLITE_PRODUCTION_PRAGMAS, True, {'timeout': 20}),
+        ]
+        results = [
+            self.run_profile(name, pragmas, single_writer, db_options, options)
+            for name, pragmas, single_writer, db_options in profiles
+        ]
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{'profile':<12}{'scans/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}{'locked':>8}")
+        for result in results:
+            self.stdout.write(
+                f"{result['profile']:<12}{result['scans_per_second']:>10}{result['p50_ms']:>10}"
+                f"{result['p95_ms']:>10}{result['errors']:>8}{result['locked']:>8}"
+            )
+
+    def run_profile(self, name, pragmas, single_writer, db_options, options):
+        with override_settings(SQLITE_PRAGMAS=pragmas, ATTENDANCE_SINGLE_WRITER=single_writer):
+            with scratch_database(name, db_options):
+                Student.objects.bulk_create([
+                    Student(student_id=str(100000 + i), first_name='Bench', last_name=f'Student{i}',
+                            course='BENCH', level='1')
+                    for i in range(options['students'])
+                ])
+                invalidate_roster()
+                result = self.drive_scans(options)
+
+        result['profile'] = name
+        return result
+
+    def drive_scans(self, options):
+        rng = random.Random(42)
+        scans = [
+            json.dumps({'qr_data': student_qr_data(str(100000 + rng.randrange(options["students"])))})
+            for _ in range(options['scans'])
+        ]
+        factory = RequestFactory()
+        latencies = []
+        outcomes = {'success': 0, 'warning': 0, 'errors': 0, 'locked': 0}
+        lock = threading.Lock()
+        next_scan = iter(scans)
+
+        def scanner():
+            while True:
+                with lock:
+                    body = next(next_scan, None)
+                if body is None:
+                    break
+                request = factory.post('/api/attendance/mark/', body, content_type='application/json')
+                start = time.perf_counter()
+                response = mark_attendance_api(request)
+                elapsed = (time.perf_counter() - start) * 1000
+                payload = json.loads(response.content)
+                with lock:
+                    latencies.append(elapsed)
+                    if payload['status'] in ('success', 'warning'):
+                        outcomes[payload['status']] += 1
+                    else:
+                        outcomes['errors'] += 1
+                        if 'locked' in payload['message']:
+                            outcomes['locked'] += 1
+            connections.close_all()
+
+        threads = [threading.Thread(target=scanner) for _ in range(options['threads'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        return {
+            'scans': len(scans),
+            'threads': options['threads'],
+            'seconds': round(elapsed, 3),
+            'scans_per_second': round(len(scans) / elapsed, 1),
+            'p50_ms': round(statistics.median(latencies), 2),
+            'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1], 2),
+            **outcomes,
+        }
@@ -0,0 +1,133 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from attendance_app import views
+from attendance_app.models import Student, Teacher
+from attendance_app.qr_payload import student_qr_data
+from attendance_app.roster_cache import invalidate_roster
+
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+
+# Tables a scan is the right plan for: a school has a few dozen teachers, the
+# roster cache loads all the active ones in one query, and lookups by ID use
+# the unique teacher_id index
+SMALL_TABLES = {Teacher._meta.db_table}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Run EXPLAIN QUERY PLAN on every query the attendance APIs issue and fail '
+        'if any of them does a full table scan'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--allow-scan', action='append', default=[], metavar='TABLE',
+            help='Table that may be scanned (repeatable), e.g. attendance_app_dailystats'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('check_query_plans only understands SQLite query plans')
+
+        plans = []
+        failed_calls = []
+        try:
+            # Everything (fixture rows, scans) is rolled back at the end
+            with transaction.atomic():
+                self.seed()
+                for name, call in self.api_calls():
+                    invalidate_roster()
+                    with CaptureQueriesContext(connection) as captured:
+                        response = call()
+                    if response.status_code >= 400:
+                        # An error response skips the queries that would have been checked
+                        failed_calls.append(f'{name} returned {response.status_code}')
+                    for query in captured.captured_queries:
+                        sql = query['sql']
+                        if sql.lstrip().upper().startswith(EXPLAINABLE):
+                            plans.append((name, sql, self.explain(sql)))
+                raise Rollback
+        except Rollback:
+            pass
+
+        allowed = SMALL_TABLES | set(options['allow_scan'])
+        failures = 0
+        for name, sql, plan in plans:
+            # Scans of a subquery's rows or of the schema (feature checks) read no table
+            scans = [
+                detail for detail in plan
+                if detail.startswith('SCAN ') and 'INDEX' not in detail
+                and detail.split()[1] not in allowed
+                and not detail.split()[1].startswith('(') and detail.split()[1] != 'sqlite_master'
+            ]
+            status = 'FULL SCAN' if scans else 'ok'
+            failures += bool(scans)
+            self.stdout.write(f'[{status}] {name}: {sql[:120]}')
+            for detail in plan:
+                self.stdout.write(f'    {detail}')
+
+        for failed_call in failed_calls:
+            self.stdout.write(self.style.WARNING(f'[not checked] {failed_call}'))
+        if failures:
+            raise CommandError(f'{failures} of {len(plans)} queries do a full table scan')
+        self.stdout.write(self.style.SUCCESS(f'{len(plans)} queries checked, no full table scans'))
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def seed(self):
+        Student.objects.create(student_id='QP0001', first_name='Query', last_name='Plan', course='QP', level='1')
+        Student.objects.create(student_id='QP0002', first_name='Query', last_name='Plan', course='QP', level='1')
+        Teacher.objects.create(teacher_id='QPT01', first_name='Query', last_name='Plan', subject='QP')
+
+    def api_calls(self):
+        factory = RequestFactory()
+
+        def post(view, path, payload):
+            return lambda: view(factory.post(path, json.dumps(payload), content_type='application/json'))
+
+        def get(view, path, params=None):
+            return lambda: view(factory.get(path, params or {}))
+
+        def stream(view, path, params=None):
+            # Streaming views only query while their content is consumed
+            def call():
+                response = view(factory.get(path, params or {}))
+                b''.join(response.streaming_content)
+                return response
+            return call
+
+        cursor = views._encode_student_cursor({'last_name': 'Plan', 'first_name': 'Query', 'id': 0})
+        return [
+            ('mark_attendance_api', post(views.mark_attendance_api, '/api/attendance/mark/',
+                                         {'qr_data': student_qr_data('QP0001'), 'teacher_id': 'QPT01'})),
+            ('mark_attendance_batch_api', post(views.mark_attendance_batch_api, '/api/attendance/mark/batch/',
+                                               {'scans': [{'qr_data': student_qr_data('QP0001'), 'teacher_id': 'QPT01'},
+                                                          {'qr_data': student_qr_data('QP0002')}]})),
+            ('get_daily_attendance_api', get(views.get_daily_attendance_api, '/api/attendance/daily/')),
+            ('get_students_api', get(views.get_students_api, '/api/students/')),
+            ('get_students_api (page)', get(views.get_students_api, '/api/students/',
+                                            {'page_size': 10, 'cursor': cursor})),
+            ('search_students_api', get(views.search_students_api, '/api/students/search/', {'q': 'que pl'})),
+            ('attendance_logs_api', get(views.attendance_logs_api, '/api/attendance/logs/',
+                                        {'start': '2026-01-01', 'end': '2026-12-31', 'student_id': 'QP0001'})),
+            ('attendance_report_api', get(views.attendance_report_api, '/api/reports/attendance/',
+                                          {'course': 'QP', 'matrix': 1})),
+            ('presence_query_api', get(views.presence_query_api, '/api/reports/presence/',
+                                       {'course': 'QP', 'compare': 'QP,QX', 'absent_streak': 2})),
+            ('export_attendance_api', stream(views.export_attendance_api, '/api/attendance/export/',
+                                             {'start': '2026-01-01', 'end': '2026-12-31', 'course': 'QP'})),
+            ('export_attendance_api (log)', stream(views.export_attendance_api, '/api/attendance/export/',
+                                                   {'source': 'log', 'start': '2026-01-01', 'end': '2026-12-31'})),
+        ]
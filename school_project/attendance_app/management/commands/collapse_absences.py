@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from attendance_app.log_archive import optimize_database
+from attendance_app.models import DailyAttendance
+from attendance_app.presence import collapse_absences, sparse_presence
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete the is_present=False DailyAttendance rows the dense storage mode created, '
+        'in batches, then ANALYZE/VACUUM. Absence is derived from the active roster instead.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows deleted per transaction')
+        parser.add_argument('--no-vacuum', action='store_true',
+                            help='Only ANALYZE afterwards; VACUUM rewrites the whole SQLite file')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be deleted')
+
+    def handle(self, *args, **options):
+        if not sparse_presence():
+            self.stdout.write(self.style.WARNING(
+                'ATTENDANCE_SPARSE_PRESENCE is off: registrations will keep creating absent rows'
+            ))
+
+        if options['dry_run']:
+            count = collapse_absences(dry_run=True)
+            self.stdout.write(f'{count} absent rows would be deleted')
+            return
+
+        deleted = collapse_absences(options['batch_size'])
+        if deleted:
+            optimize_database(vacuum=not options['no_vacuum'], model=DailyAttendance)
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} absent rows'))
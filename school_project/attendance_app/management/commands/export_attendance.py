@@ -0,0 +1,57 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from attendance_app.attendance_export import FORMATS, SOURCES, build_export, iter_export
+
+
+class Command(BaseCommand):
+    help = 'Export attendance history for a date range as CSV or JSONL (streamed, optionally gzipped)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First date (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--end', help='Last date (YYYY-MM-DD), defaults to --start')
+        parser.add_argument('--course', help='Only students in this course')
+        parser.add_argument('--level', help='Only students in this year level')
+        parser.add_argument('--source', choices=sorted(SOURCES), default='daily',
+                            help='daily: one row per student per day; log: every scan')
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output (implied by a .gz --output)')
+        parser.add_argument('-o', '--output', help='Output file, defaults to standard output')
+
+    def handle(self, *args, **options):
+        start = self.parse(options['start']) if options['start'] else timezone.now().date()
+        end = self.parse(options['end']) if options['end'] else start
+        output = options['output']
+        compress = options['gzip'] or bool(output and output.endswith('.gz'))
+
+        try:
+            export = build_export(
+                options['source'], start, end, course=options['course'], level=options['level'],
+                format=options['format'], compress=compress,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if output:
+            with open(output, 'wb') as stream:
+                size = self.write(stream, export)
+            self.stderr.write(self.style.SUCCESS(f'Wrote {size} bytes to {output}'))
+        else:
+            self.write(sys.stdout.buffer, export)
+            sys.stdout.buffer.flush()
+
+    def write(self, stream, export):
+        size = 0
+        for chunk in iter_export(*export):
+            stream.write(chunk)
+            size += len(chunk)
+        return size
+
+    def parse(self, value):
+        date = parse_date(value)
+        if date is None:
+            raise CommandError(f'Invalid date: {value}')
+        return date
@@ -0,0 +1,41 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance_app.student_import import FORMATS, guess_format, import_students, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Register or update students in bulk from a CSV or JSONL file (columns: id, firstname, lastname, course, level)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV/JSONL file, or '-' for standard input")
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to jsonl for .jsonl/.ndjson files, else csv')
+        parser.add_argument('--chunk-size', type=int, help='Rows per bulk upsert (default STUDENT_IMPORT_CHUNK_SIZE)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or guess_format(path)
+        start = time.perf_counter()
+
+        try:
+            if path == '-':
+                summary = import_students(read_rows(sys.stdin.buffer, file_format), options['chunk_size'])
+            else:
+                with open(path, 'rb') as source:
+                    summary = import_students(read_rows(source, file_format), options['chunk_size'])
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            raise CommandError(str(e))
+
+        for error in summary['errors']:
+            self.stderr.write(f"line {error['line']}: {error['message']}")
+        if summary['failed'] > len(summary['errors']):
+            self.stderr.write(f"... and {summary['failed'] - len(summary['errors'])} more")
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {summary['created'] + summary['updated']} students "
+            f"({summary['created']} new, {summary['updated']} updated) from {summary['rows']} rows "
+            f"in {elapsed:.2f}s; {summary['failed']} rows failed"
+        ))
@@ -0,0 +1,273 @@
+import http.client
+import json
+import logging
+import platform
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.utils import timezone
+
+from attendance_app.qr_payload import student_qr_data
+from attendance_app.student_import import import_students
+
+from ._scratch import scratch_database
+
+ENDPOINTS = {
+    'mark': ('POST', '/api/attendance/mark/'),
+    'students': ('GET', '/api/students/'),
+    'daily': ('GET', '/api/attendance/daily/'),
+}
+
+STUDENT_ID_PREFIX = 'LT'
+# Each worker sends X-Device-ID: load-test-<n>, so a server's per-device
+# rate limits treat the workers as separate scanners
+DEVICE_ID_PREFIX = 'load-test'
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return round(ordered[int(rank) - 1], 2)
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ENDPOINTS:
+            raise CommandError(f'Unknown endpoint in --mix: {name} (expected {", ".join(ENDPOINTS)})')
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise CommandError(f'Invalid weight in --mix: {part}')
+    return mix
+
+
+class ClientTransport:
+    """Requests through Django's test client (full middleware stack, in process)"""
+
+    def __init__(self, device_id):
+        self.client = Client(raise_request_exception=False, HTTP_X_DEVICE_ID=device_id)
+
+    def request(self, method, path, body=None, headers=None):
+        if method == 'POST':
+            response = self.client.post(path, body, content_type='application/json')
+        else:
+            response = self.client.get(path)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, content
+
+    def close(self):
+        connections.close_all()
+
+
+class HTTPTransport:
+    """Keep-alive HTTP connection to a running server, one per worker thread"""
+
+    def __init__(self, url, device_id):
+        parts = urlsplit(url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connect = lambda: connection_class(parts.hostname, parts.port, timeout=60)
+        self.prefix = parts.path.rstrip('/')
+        self.device_id = device_id
+        self.connection = self.connect()
+
+    def request(self, method, path, body=None, headers=None):
+        headers = {'Content-Type': 'application/json', 'X-Device-ID': self.device_id, **(headers or {})}
+        try:
+            self.connection.request(method, self.prefix + path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            # Reconnect for the next request; this one counts as an error
+            self.connection.close()
+            self.connection = self.connect()
+            return None, b''
+
+    def close(self):
+        self.connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the scan, roster and daily endpoints with concurrent clients and report '
+        'throughput, latency percentiles, error rates and "database is locked" counts as JSON. '
+        'By default runs in process against a scratch copy of the configured database, with '
+        'rate limits and load shedding off; --url targets a running server (whose students are '
+        'upserted and marked present) under its own limits. Each worker sends its own X-Device-ID, '
+        'so scans are limited per worker, and 429 and 503 answers are reported as throttled and '
+        'shed rather than errors.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Base URL of a running server, e.g. http://127.0.0.1:8000')
+        parser.add_argument('--students', type=int, default=1000, help='Students to seed')
+        parser.add_argument('--requests', type=int, default=2000, help='Total requests to send')
+        parser.add_argument('--duration', type=float, help='Run for this many seconds instead of --requests')
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent client threads')
+        parser.add_argument('--mix', default='mark=8,students=1,daily=1',
+                            help='Relative weight of each endpoint (mark, students, daily)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the request sequence')
+        parser.add_argument('--output', help='Also write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options['mix'])
+        if options['url']:
+            report = self.run(options, mix, lambda device_id: HTTPTransport(options['url'], device_id))
+        else:
+            # Failed requests are counted in the report; don't also log each one
+            request_logger = logging.getLogger('django.request')
+            level = request_logger.level
+            request_logger.setLevel(logging.CRITICAL)
+            try:
+                with scratch_database('load_test'):
+                    report = self.run(options, mix, ClientTransport)
+            finally:
+                request_logger.setLevel(level)
+
+        text = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(text + '\n')
+        self.stdout.write(text)
+
+    def seed(self, options, transport):
+        count = options['students']
+        rows = (
+            {'id': f'{STUDENT_ID_PREFIX}{i:06d}', 'firstname': 'Load', 'lastname': f'Test{i:06d}',
+             'course': 'LOAD', 'level': str(i % 4 + 1)}
+            for i in range(count)
+        )
+        if options['url']:
+            body = ''.join(json.dumps(row) + '\n' for row in rows).encode()
+            status, content = transport.request(
+                'POST', '/api/students/import/?format=jsonl', body, {'Content-Type': 'application/x-ndjson'}
+            )
+            if status != 200:
+                raise CommandError(f'Seeding through /api/students/import/ failed ({status}): {content[:200]!r}')
+        else:
+            import_students(enumerate(rows, 1))
+
+    def run(self, options, mix, make_transport):
+        self.seed(options, make_transport(f'{DEVICE_ID_PREFIX}-seed'))
+
+        rng = random.Random(options['seed'])
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        total = None if options['duration'] else options['requests']
+        deadline = time.perf_counter() + options['duration'] if options['duration'] else None
+
+        lock = threading.Lock()
+        issued = 0
+        samples = {name: [] for name in names}
+        stats = {
+            name: {'statuses': {}, 'errors': 0, 'locked': 0, 'throttled': 0, 'shed': 0, 'outcomes': {}}
+            for name in names
+        }
+
+        def next_request():
+            nonlocal issued
+            with lock:
+                if total is not None and issued >= total:
+                    return None
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return None
+                issued += 1
+                name = rng.choices(names, weights)[0]
+                student = f'{STUDENT_ID_PREFIX}{rng.randrange(options["students"]):06d}'
+            body = json.dumps({'qr_data': student_qr_data(student)}) if name == 'mark' else None
+            return name, body
+
+        def worker(number):
+            transport = make_transport(f'{DEVICE_ID_PREFIX}-{number}')
+            try:
+                while True:
+                    item = next_request()
+                    if item is None:
+                        return
+                    name, body = item
+                    method, path = ENDPOINTS[name]
+                    start = time.perf_counter()
+                    status, content = transport.request(method, path, body)
+                    elapsed = (time.perf_counter() - start) * 1000
+                    self.record(stats[name], samples[name], lock, status, content, elapsed)
+            finally:
+                transport.close()
+
+        threads = [threading.Thread(target=worker, args=(number,)) for number in range(options['concurrency'])]
+        started_at = timezone.now()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - start
+
+        endpoints = {}
+        for name in names:
+            latencies = sorted(samples[name])
+            count = len(latencies)
+            endpoints[name] = {
+                'requests': count,
+                'requests_per_second': round(count / seconds, 1) if seconds else None,
+                'p50_ms': percentile(latencies, 50),
+                'p95_ms': percentile(latencies, 95),
+                'p99_ms': percentile(latencies, 99),
+                'max_ms': round(latencies[-1], 2) if latencies else None,
+                'error_rate': round(stats[name]['errors'] / count, 4) if count else 0,
+                **stats[name],
+            }
+
+        all_latencies = sorted(latency for name in names for latency in samples[name])
+        return {
+            'started_at': started_at.isoformat(),
+            'target': options['url'] or 'in-process test client, scratch database',
+            'db_profile': None if options['url'] else getattr(settings, 'ATTENDANCE_DB_PROFILE', 'default'),
+            'python': platform.python_version(),
+            'students': options['students'],
+            'concurrency': options['concurrency'],
+            'mix': mix,
+            'seconds': round(seconds, 3),
+            'requests': len(all_latencies),
+            'requests_per_second': round(len(all_latencies) / seconds, 1) if seconds else None,
+            'p50_ms': percentile(all_latencies, 50),
+            'p95_ms': percentile(all_latencies, 95),
+            'p99_ms': percentile(all_latencies, 99),
+            'errors': sum(stats[name]['errors'] for name in names),
+            'locked': sum(stats[name]['locked'] for name in names),
+            'throttled': sum(stats[name]['throttled'] for name in names),
+            'shed': sum(stats[name]['shed'] for name in names),
+            'endpoints': endpoints,
+        }
+
+    def record(self, stats, samples, lock, status, content, elapsed):
+        # Only small bodies (scan results, errors) are worth parsing; full rosters are not
+        try:
+            payload = json.loads(content) if content and len(content) < 65536 else {}
+        except ValueError:
+            payload = {}
+        outcome = payload.get('status') if isinstance(payload, dict) else None
+        # The server's rate limit (429) and load shedding (503) refusing a request are not errors
+        throttled = status == 429
+        shed = status == 503
+        failed = not (throttled or shed) and (status is None or status >= 500 or outcome == 'error')
+        locked = failed and 'locked' in str(payload.get('message', '') if isinstance(payload, dict) else '')
+
+        with lock:
+            samples.append(elapsed)
+            key = str(status) if status is not None else 'connection_error'
+            stats['statuses'][key] = stats['statuses'].get(key, 0) + 1
+            if outcome:
+                stats['outcomes'][outcome] = stats['outcomes'].get(outcome, 0) + 1
+            stats['errors'] += failed
+            stats['locked'] += locked
+            stats['throttled'] += throttled
+            stats['shed'] += shed
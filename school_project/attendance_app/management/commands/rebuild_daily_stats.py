@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from attendance_app.db_routing import current_database
+from attendance_app.presence_bitmaps import rebuild_bitmaps
+from attendance_app.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute DailyStats and the presence bitmaps for a date range from DailyAttendance to repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First date (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--end', help='Last date (YYYY-MM-DD), defaults to --start')
+
+    def handle(self, *args, **options):
+        start = self.parse(options['start']) if options['start'] else timezone.now().date()
+        end = self.parse(options['end']) if options['end'] else start
+        if end < start:
+            raise CommandError('--end must not be before --start')
+
+        with transaction.atomic(using=current_database()):
+            rows = rebuild_stats(start, end)
+            bitmaps = rebuild_bitmaps(start, end)
+
+        for stats in rows:
+            self.stdout.write(
+                f'{stats.date}: {stats.present}/{stats.total_active} present '
+                f'({stats.qr_count} QR, {stats.manual_count} manual)'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {len(rows)} day(s) and {len(bitmaps)} presence bitmap(s) from {start} to {end}'
+        ))
+
+    def parse(self, value):
+        date = parse_date(value)
+        if date is None:
+            raise CommandError(f'Invalid date: {value}')
+        return date
@@ -0,0 +1,59 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from attendance_app.db_routing import database_health, read_replicas, using_database
+from attendance_app.stats import ATTENDANCE_VERSION
+from attendance_app.versions import bump_version
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy each SQLite primary onto its read replica (ATTENDANCE_READ_REPLICAS) with the '
+        'online backup API, standing in for server-side replication in local setups'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', help='Only this primary alias')
+        parser.add_argument('--every', type=float, help='Keep copying every this many seconds')
+
+    def handle(self, *args, **options):
+        pairs = read_replicas()
+        if options['database']:
+            if options['database'] not in pairs:
+                raise CommandError(f"{options['database']} has no read replica")
+            pairs = {options['database']: pairs[options['database']]}
+        if not pairs:
+            raise CommandError('No read replicas are configured (set ATTENDANCE_READ_REPLICA=1)')
+        for primary, replica in pairs.items():
+            if connections[primary].vendor != 'sqlite' or connections[replica].vendor != 'sqlite':
+                raise CommandError(f'{primary} -> {replica}: only SQLite replicas are copied; '
+                                   'other backends replicate on the server')
+
+        while True:
+            for primary, replica in pairs.items():
+                self.copy(primary, replica)
+            if not options['every']:
+                return
+            time.sleep(options['every'])
+
+    def copy(self, primary, replica):
+        started = time.perf_counter()
+        connections[replica].close()
+        source = sqlite3.connect(connections[primary].settings_dict['NAME'])
+        target = sqlite3.connect(connections[replica].settings_dict['NAME'])
+        try:
+            # A consistent snapshot, taken without blocking writers for the whole copy
+            source.backup(target, pages=1024)
+        finally:
+            target.close()
+            source.close()
+
+        # Every replica-read ETag includes the attendance version, so responses
+        # cached from the old copy are not served again
+        with using_database(primary):
+            bump_version(ATTENDANCE_VERSION)
+        database_health.reset()
+        self.stdout.write(f'{primary} -> {replica} in {time.perf_counter() - started:.2f}s')
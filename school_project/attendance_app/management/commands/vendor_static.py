@@ -0,0 +1,78 @@
+import base64
+import hashlib
+import json
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance_app.static_assets import VENDOR_LOCK, VENDOR_SCRIPTS, vendor_lock
+
+
+def integrity(data):
+    return 'sha384-' + base64.b64encode(hashlib.sha384(data).digest()).decode()
+
+
+class Command(BaseCommand):
+    help = (
+        'Download the pinned third-party scripts (jsQR, html5-qrcode, lucide, tailwind) into '
+        'attendance_app/static/attendance_app/vendor/ and record their SRI hashes in vendor.lock.json'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help=f'Only these scripts ({", ".join(VENDOR_SCRIPTS)})')
+        parser.add_argument('--check', action='store_true',
+                            help='Verify the vendored files against the lock file instead of downloading')
+        parser.add_argument('--update', action='store_true',
+                            help='Accept content that differs from the hash already recorded for a URL')
+
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - set(VENDOR_SCRIPTS)
+        if unknown:
+            raise CommandError(f'Unknown script(s): {", ".join(sorted(unknown))}')
+        names = options['names'] or list(VENDOR_SCRIPTS)
+        lock = vendor_lock()
+
+        if options['check']:
+            return self.check(names, lock)
+
+        VENDOR_LOCK.parent.mkdir(parents=True, exist_ok=True)
+        for name in names:
+            script = VENDOR_SCRIPTS[name]
+            try:
+                with urllib.request.urlopen(script.url, timeout=30) as response:
+                    data = response.read()
+            except OSError as e:
+                raise CommandError(f'{name}: could not download {script.url}: {e}')
+
+            digest = integrity(data)
+            locked = lock.get(name, {})
+            if locked.get('url') == script.url and locked.get('integrity') != digest and not options['update']:
+                raise CommandError(
+                    f'{name}: {script.url} no longer matches the recorded hash; '
+                    'review the change and rerun with --update'
+                )
+            (VENDOR_LOCK.parent / script.filename).write_bytes(data)
+            lock[name] = {'url': script.url, 'file': script.filename, 'integrity': digest}
+            self.stdout.write(f'{name}: {script.filename} ({len(data)} bytes) {digest}')
+
+        VENDOR_LOCK.write_text(json.dumps(lock, indent=2, sort_keys=True) + '\n')
+        self.stdout.write(self.style.SUCCESS(
+            'Vendored; commit the files and vendor.lock.json, then run collectstatic'
+        ))
+
+    def check(self, names, lock):
+        problems = []
+        for name in names:
+            script = VENDOR_SCRIPTS[name]
+            path = VENDOR_LOCK.parent / script.filename
+            locked = lock.get(name)
+            if not path.exists():
+                self.stdout.write(f'{name}: not vendored, the page loads {script.url}')
+            elif locked is None or locked.get('url') != script.url:
+                problems.append(f'{name}: {script.filename} has no lock entry for {script.url}')
+            elif integrity(path.read_bytes()) != locked['integrity']:
+                problems.append(f'{name}: {script.filename} does not match its recorded hash')
+            else:
+                self.stdout.write(f'{name}: {script.filename} ok')
+        if problems:
+            raise CommandError('\n'.join(problems))
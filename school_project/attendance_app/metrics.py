@@ -0,0 +1,171 @@
+"""In-process request and scan metrics, exposed in Prometheus text format.
+
+MetricsMiddleware times every request and records its status and response
+size. A database execute wrapper (installed on each new connection, see
+signals.py) adds the query count and time to the request in progress. It
+finds the request through a context variable, which also covers async views
+whose queries run in a worker thread and writes handed to the single writer.
+Values are per process: with several workers, scrape each one.
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# [query count, query seconds] for the request being handled, if any
+_request_queries = contextvars.ContextVar('attendance_request_queries', default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    """Counters and histograms keyed by (name, labels); one lock, no allocation on the hot path beyond the key"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+
+    def describe(self, name, kind, text):
+        self._help[name] = (kind, text)
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets):
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self, extra=()):
+        """Prometheus text exposition format (version 0.0.4).
+
+        ``extra`` adds ``(name, type, help, value)`` samples read at scrape time.
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (list(h.buckets), list(h.counts), h.sum)) for key, h in self._histograms.items()
+            )
+
+        lines = []
+        described = set()
+
+        def header(name):
+            if name not in described and name in self._help:
+                kind, text = self._help[name]
+                lines.append(f'# HELP {name} {text}')
+                lines.append(f'# TYPE {name} {kind}')
+                described.add(name)
+
+        for (name, labels), value in counters:
+            header(name)
+            lines.append(f'{name}{_labels(labels)} {_number(value)}')
+
+        for (name, labels), (buckets, counts, total) in histograms:
+            header(name)
+            cumulative = 0
+            for bound, count in zip(buckets, counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels + (("le", _number(bound)),))} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(total)}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+
+        for name, kind, text, value in extra:
+            lines.append(f'# HELP {name} {text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.append(f'{name} {_number(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+registry.describe('attendance_http_requests_total', 'counter', 'Requests handled, by view, method and status code')
+registry.describe('attendance_http_request_duration_seconds', 'histogram', 'Time to produce the response, by view')
+registry.describe('attendance_http_response_size_bytes', 'histogram', 'Response body size (non-streaming), by view')
+registry.describe('attendance_db_queries_per_request', 'histogram', 'Database queries issued per request, by view')
+registry.describe('attendance_db_query_seconds_total', 'counter', 'Time spent in database queries, by view')
+registry.describe('attendance_scans_total', 'counter', 'QR scans processed, by result')
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper that charges the query to the current request"""
+    totals = _request_queries.get()
+    if totals is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        totals[0] += 1
+        totals[1] += time.perf_counter() - start
+
+
+def start_request():
+    return time.perf_counter(), _request_queries.set([0, 0.0])
+
+
+def finish_request(request, response, started):
+    start, token = started
+    duration = time.perf_counter() - start
+    queries, query_seconds = _request_queries.get()
+    _request_queries.reset(token)
+
+    match = getattr(request, 'resolver_match', None)
+    view = (match.url_name or match.view_name) if match else 'unmatched'
+    labels = (('view', view),)
+
+    registry.inc('attendance_http_requests_total',
+                 (('view', view), ('method', request.method), ('status', str(response.status_code))))
+    registry.observe('attendance_http_request_duration_seconds', labels, duration, DURATION_BUCKETS)
+    registry.observe('attendance_db_queries_per_request', labels, queries, QUERY_BUCKETS)
+    if query_seconds:
+        registry.inc('attendance_db_query_seconds_total', labels, query_seconds)
+    if not response.streaming:
+        registry.observe('attendance_http_response_size_bytes', labels, len(response.content), SIZE_BUCKETS)
+
+
+def record_scan(result, count=1):
+    """Count scans by result: marked, duplicate, invalid_qr, unknown_student or error"""
+    if count:
+        registry.inc('attendance_scans_total', (('result', result),), count)
@@ -0,0 +1,110 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse
+
+from .db_routing import UnknownCampus, campus_databases, database_for_campus, default_database, set_database
+from .metrics import finish_request, start_request
+
+
+class ASGIURLConfMiddleware:
+    """Route ASGI requests through ASGI_ROOT_URLCONF so they reach the async views"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.urlconf = getattr(settings, 'ASGI_ROOT_URLCONF', None)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.set_urlconf(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self.set_urlconf(request)
+        return await self.get_response(request)
+
+    def set_urlconf(self, request):
+        if self.urlconf and isinstance(request, ASGIRequest):
+            request.urlconf = self.urlconf
+
+
+class MetricsMiddleware:
+    """Record duration, status, response size and DB queries of every request (see metrics.py)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = start_request()
+        response = self.get_response(request)
+        finish_request(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = start_request()
+        response = await self.get_response(request)
+        finish_request(request, response, started)
+        return response
+
+
+class CampusRoutingMiddleware:
+    """Serve each request from the database of its campus (see db_routing.py).
+
+    The campus comes from the X-Campus header, then the ``campus`` query
+    parameter, then the cookie of the same name; a campus picked by query
+    parameter is remembered in the cookie, so the page's API calls follow it.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        error = self.route(request)
+        if error is not None:
+            return error
+        return self.remember(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        error = self.route(request)
+        if error is not None:
+            return error
+        return self.remember(request, await self.get_response(request))
+
+    def route(self, request):
+        request.campus = None
+        if not campus_databases():
+            return None
+        campus = (request.headers.get('X-Campus') or request.GET.get('campus')
+                  or request.COOKIES.get('campus') or None)
+        try:
+            alias = database_for_campus(campus) if campus else default_database()
+        except UnknownCampus as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+        request.campus = campus
+        # Not reset on the way out: streaming responses (exports, the live
+        # feed) run their queries after this middleware has returned
+        set_database(alias)
+        return None
+
+    def remember(self, request, response):
+        campus = request.GET.get('campus')
+        if campus and campus == request.campus and request.COOKIES.get('campus') != campus:
+            response.set_cookie('campus', campus, samesite='Lax')
+        return response
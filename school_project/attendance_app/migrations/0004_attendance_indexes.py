@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance_app', '0003_attendancelog_dailyattendance_student_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendancelog',
+            index=models.Index(fields=['date', 'time_marked'], name='attlog_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancelog',
+            index=models.Index(fields=['student', 'date'], name='attlog_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyattendance',
+            index=models.Index(fields=['date', 'is_present'], name='dailyatt_date_present_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['last_name', 'first_name'], name='student_active_name_idx'),
+        ),
+    ]
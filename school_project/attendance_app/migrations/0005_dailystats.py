@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance_app', '0004_attendance_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('total_active', models.PositiveIntegerField(default=0)),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('qr_count', models.PositiveIntegerField(default=0)),
+                ('manual_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+    ]
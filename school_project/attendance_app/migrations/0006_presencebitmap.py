@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 20:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance_app', '0005_dailystats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PresenceBitmap',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('course', models.CharField(max_length=50)),
+                ('bits', models.BinaryField()),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-date', 'course'],
+                'unique_together': {('date', 'course')},
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations
+
+STUDENT_TABLE = 'attendance_app_student'
+FTS_TABLE = 'attendance_app_student_fts'
+
+# External-content FTS5 index over the student columns; the triggers keep it in
+# step with every write to the table, including bulk_create and queryset updates
+CREATE = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        student_id, first_name, last_name, course,
+        content='{STUDENT_TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON {STUDENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, student_id, first_name, last_name, course)
+        VALUES (new.id, new.student_id, new.first_name, new.last_name, new.course);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON {STUDENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, student_id, first_name, last_name, course)
+        VALUES ('delete', old.id, old.student_id, old.first_name, old.last_name, old.course);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF student_id, first_name, last_name, course
+    ON {STUDENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, student_id, first_name, last_name, course)
+        VALUES ('delete', old.id, old.student_id, old.first_name, old.last_name, old.course);
+        INSERT INTO {FTS_TABLE}(rowid, student_id, first_name, last_name, course)
+        VALUES (new.id, new.student_id, new.first_name, new.last_name, new.course);
+    END""",
+    # Index the students that already exist
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+DROP = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # Other backends, and SQLite builds without FTS5, search with LIKE filters (student_search.py)
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance_app', '0006_presencebitmap'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(CREATE), _run(DROP)),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.utils import timezone
 import datetime
+from .qr_payload import student_qr_data
 
 class Student(models.Model):
     # Matches your frontend requirements
@@ -13,6 +14,15 @@ class Student(models.Model):
     updated_at = models.DateTimeField(default=timezone.now, blank=True)
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            # Active roster in display order (get_students_api, keyset pagination).
+            # Partial rather than leading on is_active: Django renders
+            # filter(is_active=True) as a bare boolean, which SQLite cannot seek on.
+            models.Index(fields=['last_name', 'first_name'], condition=models.Q(is_active=True),
+                         name='student_active_name_idx'),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.student_id})"
     
@@ -20,7 +30,7 @@ class Student(models.Model):
         return f"{self.first_name} {self.last_name}"
     
     def get_qr_data(self):
-        return f"STUDENT:{self.student_id}"
+        return student_qr_data(self.student_id)
 
 class Teacher(models.Model):
     teacher_id = models.CharField(max_length=10, unique=True)
@@ -49,6 +59,10 @@ class DailyAttendance(models.Model):
     class Meta:
         unique_together = ['student', 'date']
         ordering = ['-date', 'student__last_name']
+        indexes = [
+            # Daily dashboard: all records / present records for one date
+            models.Index(fields=['date', 'is_present'], name='dailyatt_date_present_idx'),
+        ]
     
     def __str__(self):
         status = "Present" if self.is_present else "Absent"
@@ -71,6 +85,40 @@ class AttendanceLog(models.Model):
     
     class Meta:
         ordering = ['-date', '-time_marked']
+        indexes = [
+            models.Index(fields=['date', 'time_marked'], name='attlog_date_time_idx'),
+            models.Index(fields=['student', 'date'], name='attlog_student_date_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.student.student_id} - {self.date} - {self.method}"
\ No newline at end of file
+        return f"{self.student.student_id} - {self.date} - {self.method}"
+
+class DailyStats(models.Model):
+    """Per-day attendance counters, updated in the same transaction as each change"""
+    date = models.DateField(unique=True)
+    total_active = models.PositiveIntegerField(default=0)
+    present = models.PositiveIntegerField(default=0)
+    qr_count = models.PositiveIntegerField(default=0)
+    manual_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.date} - {self.present}/{self.total_active}"
+
+class PresenceBitmap(models.Model):
+    """Students present on one date in one course, as a zlib-compressed bitset over Student pk"""
+    date = models.DateField()
+    course = models.CharField(max_length=50)
+    bits = models.BinaryField()
+    present = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['date', 'course']
+        ordering = ['-date', 'course']
+
+    def __str__(self):
+        return f"{self.date} - {self.course} - {self.present} present"
@@ -0,0 +1,52 @@
+"""Sparse presence storage.
+
+With ATTENDANCE_SPARSE_PRESENCE on (the default), DailyAttendance only holds
+presence: registering a student no longer creates an absent row for the day,
+and the first scan creates the present one. Absence is derived instead, as
+the active students with no present row for the date (an anti-join on the
+(student, date) unique index). The read endpoints derive it the same way in
+either mode, so rows left by the dense mode are simply redundant;
+collapse_absences() deletes them.
+"""
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+
+from .db_writer import db_writer
+from .models import DailyAttendance, Student
+
+
+def sparse_presence():
+    return getattr(settings, 'ATTENDANCE_SPARSE_PRESENCE', True)
+
+
+def present_records(date):
+    return DailyAttendance.objects.filter(date=date, is_present=True).select_related('student')
+
+
+def absent_students(date):
+    """Active students without a present row on ``date``, in roster order"""
+    return Student.objects.filter(is_active=True).filter(~Exists(
+        DailyAttendance.objects.filter(student=OuterRef('pk'), date=date, is_present=True)
+    )).order_by('last_name', 'first_name', 'id')
+
+
+def _delete_batch(ids):
+    return DailyAttendance.objects.filter(id__in=ids, is_present=False).delete()[0]
+
+
+def collapse_absences(batch_size=5000, dry_run=False):
+    """Delete stored is_present=False rows in short batches; returns the number deleted (or found)"""
+    absent = DailyAttendance.objects.filter(is_present=False).order_by('id')
+    if dry_run:
+        return absent.count()
+
+    deleted = 0
+    last_id = 0
+    while True:
+        # Walk the primary key so each batch resumes where the last one stopped
+        ids = list(absent.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        last_id = ids[-1]
+        # One short write transaction per batch so scans are never blocked for long
+        deleted += db_writer.run(_delete_batch, ids)
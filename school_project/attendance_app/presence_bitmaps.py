@@ -0,0 +1,232 @@
+"""Per-(date, course) presence bitmaps for historical queries.
+
+Each PresenceBitmap row is the set of students marked present on one date in
+one course, stored as a zlib-compressed bitset in which bit ``pk`` stands for
+the Student with that pk (pks are dense, so the sets stay small). The marking
+code sets bits in the same transaction as the mark; removals are handled by
+the DailyAttendance signals, and rebuild_bitmaps() recomputes a date range
+from DailyAttendance to repair drift (filing students under their current
+course).
+
+Bitsets are Python ints, so AND/OR/NOT and popcount (int.bit_count) run in C
+over a whole roster at once. presence_query() answers range counts, absence
+streaks and cohort comparisons from them without touching DailyAttendance.
+As in reports.py, a school day is a date on which anyone was marked present,
+and a student counts from the day they registered (or were first marked).
+Queries group students by their current course and active status.
+"""
+import zlib
+
+from django.db import IntegrityError, transaction
+
+from .db_routing import current_database, read_database
+from .models import DailyAttendance, PresenceBitmap, Student
+
+MAX_ABSENT_STREAK = 30
+
+
+def encode(bits):
+    return zlib.compress(bits.to_bytes((bits.bit_length() + 7) // 8, 'little'))
+
+
+def decode(data):
+    return int.from_bytes(zlib.decompress(bytes(data)), 'little') if data else 0
+
+
+def bitmap_of(pks):
+    """Bitset with the bit of every pk set"""
+    pks = list(pks)
+    if not pks:
+        return 0
+    buffer = bytearray(max(pks) // 8 + 1)
+    for pk in pks:
+        buffer[pk >> 3] |= 1 << (pk & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def members(bits):
+    """The pks whose bits are set, ascending"""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    return [index * 8 + bit for index, byte in enumerate(data) if byte for bit in range(8) if byte >> bit & 1]
+
+
+def _save(row, bits):
+    row.bits = encode(bits)
+    row.present = bits.bit_count()
+    row.save(update_fields=['bits', 'present', 'updated_at'])
+
+
+def record_present(date, students):
+    """Set the bits of ``students`` ((pk, course) pairs) for ``date``.
+
+    Call inside the marking transaction, after the DailyAttendance write.
+    """
+    by_course = {}
+    for pk, course in students:
+        by_course.setdefault(course, []).append(pk)
+
+    for course, pks in by_course.items():
+        mask = bitmap_of(pks)
+        row = PresenceBitmap.objects.select_for_update().filter(date=date, course=course).first()
+        if row is None:
+            try:
+                with transaction.atomic(using=current_database()):
+                    PresenceBitmap.objects.create(date=date, course=course, bits=encode(mask),
+                                                  present=mask.bit_count())
+                continue
+            except IntegrityError:
+                # Another transaction created it first
+                row = PresenceBitmap.objects.select_for_update().get(date=date, course=course)
+        bits = decode(row.bits)
+        if bits | mask != bits:
+            _save(row, bits | mask)
+
+
+def clear_present(date, pk):
+    """Clear a student's bit for ``date`` in whichever course they were filed under"""
+    bit = 1 << pk
+    for row in PresenceBitmap.objects.select_for_update().filter(date=date):
+        bits = decode(row.bits)
+        if bits & bit:
+            _save(row, bits & ~bit)
+
+
+def rebuild_bitmaps(start, end):
+    """Recompute the bitmaps of a date range from DailyAttendance; returns the rows written"""
+    marks = DailyAttendance.objects.filter(date__range=(start, end), is_present=True).order_by()
+    groups = {}
+    for date, course, pk in marks.values_list('date', 'student__course', 'student_id').iterator():
+        groups.setdefault((date, course), []).append(pk)
+
+    rows = []
+    for (date, course), pks in sorted(groups.items()):
+        bits = bitmap_of(pks)
+        rows.append(PresenceBitmap(date=date, course=course, bits=encode(bits), present=bits.bit_count()))
+    with transaction.atomic(using=current_database()):
+        PresenceBitmap.objects.filter(date__range=(start, end)).delete()
+        PresenceBitmap.objects.bulk_create(rows)
+    return rows
+
+
+def _rate(present, total):
+    return round(present / total * 100, 2) if total else 0.0
+
+
+def _roster():
+    """Active students, keyed by pk"""
+    rows = Student.objects.filter(is_active=True).values_list(
+        'pk', 'student_id', 'first_name', 'last_name', 'course', 'level', 'created_at'
+    )
+    return {row[0]: row for row in rows}
+
+
+def _enrolled_by_day(roster, days):
+    """Bitset per school day of the roster students registered by then"""
+    if not days:
+        return []
+    registered = sorted((row[6].date() if row[6] else days[0], pk) for pk, row in roster.items())
+    enrolled = []
+    bits = 0
+    index = 0
+    for day in days:
+        pks = []
+        while index < len(registered) and registered[index][0] <= day:
+            pks.append(registered[index][1])
+            index += 1
+        bits |= bitmap_of(pks)
+        enrolled.append(bits)
+    return enrolled
+
+
+def _cohort(present, enrolled, mask):
+    """Rates and counts for the students in ``mask``"""
+    daily_present = [(bits & mask).bit_count() for bits in present]
+    daily_enrolled = [(bits & mask).bit_count() for bits in enrolled]
+    every_day = mask
+    for bits in present:
+        every_day &= bits
+    return {
+        'students': mask.bit_count(),
+        'attendance_rate': _rate(sum(daily_present), sum(daily_enrolled)),
+        'present_every_day': every_day.bit_count() if present else 0,
+        'daily_present': daily_present,
+        'daily_rates': [_rate(p, e) for p, e in zip(daily_present, daily_enrolled)],
+    }
+
+
+def _student(row):
+    return {'student_id': row[1], 'name': f'{row[2]} {row[3]}', 'course': row[4], 'level': row[5]}
+
+
+def presence_query(start, end, course=None, compare=(), absent_streak=None):
+    """Range counts, absence streaks and cohort comparisons for ``start``..``end`` (inclusive).
+
+    ``course`` restricts everything to one course; ``compare`` adds a cohort
+    block per listed course; ``absent_streak`` lists the students absent on
+    that many consecutive school days.
+    """
+    # One read transaction so the roster and the bitmaps agree
+    with transaction.atomic(using=read_database()):
+        per_day = {}
+        rows = PresenceBitmap.objects.filter(date__range=(start, end), present__gt=0).order_by()
+        for date, bits in rows.values_list('date', 'bits').iterator():
+            per_day[date] = per_day.get(date, 0) | decode(bits)
+        roster = _roster()
+
+    days = sorted(per_day)
+    cohorts = {}
+    for pk, row in roster.items():
+        cohorts.setdefault(row[4], []).append(pk)
+    active = bitmap_of(roster)
+    scope = bitmap_of(cohorts.get(course, ())) if course else active
+
+    # Marks of students who have since left don't count
+    present = [per_day[day] & active for day in days]
+    enrolled = [bits | marked for bits, marked in zip(_enrolled_by_day(roster, days), present)]
+
+    summary = _cohort(present, enrolled, scope)
+    present_any = 0
+    for bits in present:
+        present_any |= bits & scope
+
+    payload = {
+        'status': 'success',
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'course': course,
+        'days': [day.isoformat() for day in days],
+        'summary': {
+            'students': summary['students'],
+            'school_days': len(days),
+            'attendance_rate': summary['attendance_rate'],
+            'present_any_day': present_any.bit_count(),
+            'present_every_day': summary['present_every_day'],
+        },
+        'daily_present': summary['daily_present'],
+        'daily_rates': summary['daily_rates'],
+    }
+
+    if compare:
+        payload['cohorts'] = [
+            dict(_cohort(present, enrolled, bitmap_of(cohorts.get(name, ()))), course=name)
+            for name in compare
+        ]
+
+    if absent_streak:
+        # Absent on days i..i+k-1 for some i: AND of k consecutive absence sets
+        absent = [(bits & ~marked) & scope for bits, marked in zip(enrolled, present)]
+        streaks = 0
+        for index in range(len(absent) - absent_streak + 1):
+            window = absent[index]
+            for bits in absent[index + 1:index + absent_streak]:
+                window &= bits
+            streaks |= window
+        payload['absent_streak'] = {
+            'days': absent_streak,
+            'students': sorted(
+                (_student(roster[pk]) for pk in members(streaks)),
+                key=lambda student: (student['name'], student['student_id'])
+            ),
+        }
+
+    return payload
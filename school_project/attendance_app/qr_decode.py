@@ -0,0 +1,131 @@
+"""Server-side QR decoding for uploaded photos.
+
+Decoding runs in a bounded process pool so a burst of full-resolution uploads
+cannot starve the request threads. Images are converted to grayscale and
+downscaled before detection, and every QR code in a photo is returned (e.g. a
+row of badges). OpenCV is an optional dependency: without ``opencv-python-headless``
+installed, QRDecoderUnavailable is raised and the browser-side decoder is used.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+
+class QRDecoderUnavailable(Exception):
+    pass
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def decode_image(data, max_dimension):
+    """Decode every QR code in one encoded image (runs inside a pool worker)"""
+    try:
+        import cv2
+        import numpy as np
+    except ImportError:
+        raise QRDecoderUnavailable('Server-side QR decoding requires opencv-python-headless')
+
+    timings = {}
+    start = time.perf_counter()
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    timings['load_ms'] = _elapsed_ms(start)
+    if image is None:
+        raise ValueError('Unreadable image file')
+
+    start = time.perf_counter()
+    height, width = image.shape[:2]
+    scale = min(1.0, max_dimension / max(height, width))
+    if scale < 1.0:
+        image = cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    timings['downscale_ms'] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    detector = cv2.QRCodeDetector()
+    found, texts, _, _ = detector.detectAndDecodeMulti(image)
+    codes = [text for text in texts if text] if found else []
+    if not codes:
+        # detectAndDecodeMulti can miss a lone code that the single detector finds
+        text, _, _ = detector.detectAndDecode(image)
+        if text:
+            codes = [text]
+    timings['detect_ms'] = _elapsed_ms(start)
+
+    return {
+        'codes': list(dict.fromkeys(codes)),
+        'width': width,
+        'height': height,
+        'scale': round(scale, 4),
+        'timings': timings,
+    }
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = getattr(settings, 'QR_DECODE_WORKERS', None) or min(4, os.cpu_count() or 1)
+            _executor = ProcessPoolExecutor(max_workers=workers)
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def decode_images(images):
+    """Decode a list of encoded images in the process pool.
+
+    Returns one dict per image with either ``codes`` or ``error`` plus
+    ``timings``: the worker's load, downscale and detection times for images
+    it decoded, and for every image ``total_ms`` from submission to the pool
+    until it finished, waiting for a worker included. QR_DECODE_TIMEOUT is a
+    single deadline for all the images of the upload, not one per image:
+    images not decoded by then are cancelled and reported as timed out.
+    """
+    max_dimension = getattr(settings, 'QR_DECODE_MAX_DIMENSION', 1600)
+    timeout = getattr(settings, 'QR_DECODE_TIMEOUT', 10)
+    executor = _get_executor()
+
+    submitted = time.perf_counter()
+    futures = [executor.submit(decode_image, data, max_dimension) for data in images]
+    finished = {}
+    for future in futures:
+        future.add_done_callback(lambda done: finished.setdefault(done, time.perf_counter()))
+    wait(futures, timeout=timeout)
+
+    results = []
+    crashed = False
+    for future in futures:
+        if not future.done():
+            future.cancel()
+            result = {'codes': [], 'error': 'Timed out decoding image', 'timings': {}}
+        else:
+            try:
+                result = future.result()
+            except QRDecoderUnavailable:
+                raise
+            except BrokenProcessPool:
+                crashed = True
+                result = {'codes': [], 'error': 'QR decoder worker crashed', 'timings': {}}
+            except Exception as e:
+                # A bad image should not fail the rest of the upload
+                result = {'codes': [], 'error': str(e), 'timings': {}}
+        result['timings']['total_ms'] = round((finished.get(future, time.perf_counter()) - submitted) * 1000, 2)
+        results.append(result)
+    if crashed:
+        _reset_executor()
+    return results
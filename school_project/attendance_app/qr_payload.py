@@ -0,0 +1,73 @@
+"""Student QR payloads.
+
+Badges carry ``STUDENT:v2:<student_id>:<signature>``, where the signature is
+a 48-bit keyed BLAKE2s MAC of the ID under QR_SIGNING_KEY (SECRET_KEY when
+unset). Keyed BLAKE2 is a MAC in its own right and several times faster than
+HMAC-SHA256 here. parse_student_qr() checks a scan with string operations only
+and returns None for anything malformed or forged, so the scan is rejected
+before any query or log row. While QR_ACCEPT_LEGACY is on, the older ``STUDENT:<id>``
+badges and bare numeric IDs are still accepted.
+"""
+import functools
+import hashlib
+import hmac
+
+from django.conf import settings
+
+PREFIX = 'STUDENT:'
+V2_PREFIX = 'STUDENT:v2:'
+SIGNATURE_LENGTH = 12
+# Student.student_id max_length
+MAX_ID_LENGTH = 10
+MAX_PAYLOAD_LENGTH = len(V2_PREFIX) + MAX_ID_LENGTH + 1 + SIGNATURE_LENGTH
+INVALID_ID_MESSAGE = f'Student IDs are 1-{MAX_ID_LENGTH} printable ASCII characters without spaces or colons'
+
+
+@functools.lru_cache(maxsize=8)
+def _signing_key(secret):
+    return hashlib.sha256(b'attendance_app.qr_payload:' + secret.encode()).digest()
+
+
+def _signature(student_id):
+    secret = getattr(settings, 'QR_SIGNING_KEY', None) or settings.SECRET_KEY
+    mac = hashlib.blake2s(student_id.encode(), key=_signing_key(secret), digest_size=SIGNATURE_LENGTH // 2)
+    return mac.hexdigest()
+
+
+def valid_student_id(student_id):
+    """Whether a badge can carry ``student_id``; registration and import refuse other IDs"""
+    return (
+        0 < len(student_id) <= MAX_ID_LENGTH
+        and student_id.isascii()
+        and student_id.isprintable()
+        and ' ' not in student_id
+        and ':' not in student_id
+    )
+
+
+def student_qr_data(student_id):
+    """The v2 payload printed on a student's badge"""
+    return f'{V2_PREFIX}{student_id}:{_signature(student_id)}'
+
+
+def parse_student_qr(qr_data):
+    """Student ID from a scanned payload, or None if it is not a valid badge"""
+    if not isinstance(qr_data, str) or len(qr_data) > MAX_PAYLOAD_LENGTH:
+        return None
+
+    if qr_data.startswith(V2_PREFIX):
+        student_id, _, signature = qr_data[len(V2_PREFIX):].partition(':')
+        if len(signature) != SIGNATURE_LENGTH or not valid_student_id(student_id):
+            return None
+        return student_id if hmac.compare_digest(signature, _signature(student_id)) else None
+
+    if qr_data.startswith(PREFIX):
+        student_id = qr_data[len(PREFIX):]
+        if not valid_student_id(student_id):
+            return None
+    # Bare numeric ID, as some early badges were printed
+    elif qr_data.isascii() and qr_data.isdigit() and len(qr_data) <= MAX_ID_LENGTH:
+        student_id = qr_data
+    else:
+        return None
+    return student_id if getattr(settings, 'QR_ACCEPT_LEGACY', True) else None
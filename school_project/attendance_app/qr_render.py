@@ -0,0 +1,177 @@
+"""Server-side QR images for student badges.
+
+The module matrix comes from the ``qrcode`` package; PNG (1-bit grayscale)
+and SVG are encoded here with the standard library, so Pillow is not needed.
+qrcode is an optional dependency: without it QRGeneratorUnavailable is raised.
+
+Images are kept in a content-addressed disk cache under QR_IMAGE_CACHE_DIR:
+the file name is a hash of the payload and rendering options, so a changed
+student_id (or signing key) gives a new payload and a new file, and a stale
+image can never be served. Each image is generated once per cache directory.
+"""
+import hashlib
+import html
+import os
+import struct
+import tempfile
+import zlib
+from pathlib import Path
+
+from django.conf import settings
+
+FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+# Bump when the rendering changes so cached files are regenerated
+RENDER_VERSION = 1
+MAX_SCALE = 32
+
+
+class QRGeneratorUnavailable(Exception):
+    pass
+
+
+def qr_matrix(data):
+    """Rows of booleans (True = dark module), without the quiet zone"""
+    try:
+        import qrcode
+    except ImportError:
+        raise QRGeneratorUnavailable('QR image generation requires qrcode (pip install qrcode)')
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=0)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def _png_chunk(kind, payload):
+    return struct.pack('>I', len(payload)) + kind + payload + struct.pack('>I', zlib.crc32(kind + payload))
+
+
+def encode_png(matrix, scale=8, border=4):
+    size = (len(matrix) + 2 * border) * scale
+    quiet = '1' * (border * scale)
+    padding = '1' * (-size % 8)
+    blank = b'\x00' + int(quiet * 2 + '1' * len(matrix) * scale + padding, 2).to_bytes((size + 7) // 8, 'big')
+
+    rows = [blank] * (border * scale)
+    for modules in matrix:
+        # One bit per pixel, 0 = black; each row of modules is repeated ``scale`` times
+        bits = quiet + ''.join('0' * scale if dark else '1' * scale for dark in modules) + quiet + padding
+        rows.extend([b'\x00' + int(bits, 2).to_bytes((size + 7) // 8, 'big')] * scale)
+    rows.extend([blank] * (border * scale))
+
+    header = struct.pack('>IIBBBBB', size, size, 1, 0, 0, 0, 0)
+    return b''.join((
+        b'\x89PNG\r\n\x1a\n',
+        _png_chunk(b'IHDR', header),
+        _png_chunk(b'IDAT', zlib.compress(b''.join(rows), 9)),
+        _png_chunk(b'IEND', b''),
+    ))
+
+
+def svg_path(matrix, border=0):
+    """Path data drawing the dark modules, one subpath per horizontal run"""
+    parts = []
+    for y, modules in enumerate(matrix, border):
+        x = 0
+        width = len(modules)
+        while x < width:
+            if not modules[x]:
+                x += 1
+                continue
+            start = x
+            while x < width and modules[x]:
+                x += 1
+            parts.append(f'M{start + border} {y}h{x - start}v1h{start - x}z')
+    return ''.join(parts)
+
+
+def encode_svg(matrix, scale=8, border=4):
+    modules = len(matrix) + 2 * border
+    size = modules * scale
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+        f'viewBox="0 0 {modules} {modules}" shape-rendering="crispEdges">'
+        f'<rect width="{modules}" height="{modules}" fill="#fff"/>'
+        f'<path fill="#000" d="{svg_path(matrix, border)}"/></svg>'
+    ).encode()
+
+
+ENCODERS = {'png': encode_png, 'svg': encode_svg}
+
+
+def cache_dir():
+    return Path(getattr(settings, 'QR_IMAGE_CACHE_DIR', settings.BASE_DIR / 'cache' / 'qr'))
+
+
+def image_key(data, format, scale, border):
+    return hashlib.sha256(f'{RENDER_VERSION}:{format}:{scale}:{border}:{data}'.encode()).hexdigest()
+
+
+def qr_image(data, format='png', scale=8, border=4):
+    """Return ``(key, image bytes)``, rendering into the disk cache on first use"""
+    if format not in FORMATS:
+        raise ValueError(f'Unsupported format: {format} (expected png or svg)')
+    if not 1 <= scale <= MAX_SCALE or not 0 <= border <= 16:
+        raise ValueError(f'scale must be 1-{MAX_SCALE} and border 0-16')
+
+    key = image_key(data, format, scale, border)
+    path = cache_dir() / key[:2] / f'{key}.{format}'
+    try:
+        return key, path.read_bytes()
+    except FileNotFoundError:
+        pass
+
+    image = ENCODERS[format](qr_matrix(data), scale, border)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Rename into place so a concurrent reader never sees half a file
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            output.write(image)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return key, image
+
+
+# ---- Printable badge sheets (see the render_badges command) ----
+
+A4_MM = (210, 297)
+
+
+def render_sheet(badges, columns=3, rows=4, margin=10):
+    """One A4 SVG page of badges; ``badges`` holds (qr_data, name, student_id, course_level) tuples.
+
+    Runs in the render_badges process pool, so it only uses its arguments.
+    """
+    page_width, page_height = A4_MM
+    cell_width = (page_width - 2 * margin) / columns
+    cell_height = (page_height - 2 * margin) / rows
+    qr_size = min(cell_width, cell_height) * 0.62
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{page_width}mm" height="{page_height}mm" '
+        f'viewBox="0 0 {page_width} {page_height}" font-family="Helvetica, Arial, sans-serif">'
+    ]
+    for index, (qr_data, name, student_id, course_level) in enumerate(badges):
+        x = margin + (index % columns) * cell_width
+        y = margin + (index // columns) * cell_height
+        matrix = qr_matrix(qr_data)
+        modules = len(matrix) + 4
+        center = x + cell_width / 2
+        text_top = y + 4 + qr_size
+        parts.append(
+            f'<rect x="{x + 1:.2f}" y="{y + 1:.2f}" width="{cell_width - 2:.2f}" height="{cell_height - 2:.2f}" '
+            f'rx="3" fill="none" stroke="#999" stroke-width="0.3" stroke-dasharray="2 1"/>'
+            f'<svg x="{center - qr_size / 2:.2f}" y="{y + 4:.2f}" width="{qr_size:.2f}" height="{qr_size:.2f}" '
+            f'viewBox="0 0 {modules} {modules}" shape-rendering="crispEdges">'
+            f'<path d="{svg_path(matrix, 2)}"/></svg>'
+            f'<text x="{center:.2f}" y="{text_top + 5:.2f}" font-size="4.2" font-weight="bold" '
+            f'text-anchor="middle">{html.escape(name)}</text>'
+            f'<text x="{center:.2f}" y="{text_top + 10:.2f}" font-size="3.4" '
+            f'text-anchor="middle">ID {html.escape(student_id)}</text>'
+            f'<text x="{center:.2f}" y="{text_top + 14.5:.2f}" font-size="3" fill="#555" '
+            f'text-anchor="middle">{html.escape(course_level)}</text>'
+        )
+    parts.append('</svg>')
+    return ''.join(parts)
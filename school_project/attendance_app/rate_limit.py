@@ -0,0 +1,221 @@
+"""Per-device rate limits and load shedding for the attendance write endpoints.
+
+Rate limits: every scan endpoint has a token bucket per client. A bucket holds
+up to ``burst`` tokens and refills at ``rate`` tokens per second; each request
+takes one, and a request that finds the bucket empty gets 429 with a
+Retry-After of the time until the next token. The client is the X-Device-ID
+header the page sends (a random ID kept in localStorage), else the request's
+teacher_id, else its IP address; that throttles a misbehaving phone, not a
+hostile client, which can send any ID it likes. Buckets are kept per worker
+in an LRU-bounded dict.
+
+Load shedding: views wrapped in shed_load() are refused with 503 and
+Retry-After while ATTENDANCE_MAX_WRITES_IN_FLIGHT of them are already running
+in this process, or while more than ATTENDANCE_WRITE_QUEUE_LIMIT writes wait
+for the single writer (db_writer.py), so a burst turns into quick retries
+instead of requests timing out in the queue.
+"""
+import functools
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+
+from .db_writer import db_writer
+
+
+class TokenBuckets:
+    """Token buckets per client; rate and burst are read from the named settings on every request"""
+
+    def __init__(self, rate_setting, default_rate, burst_setting, default_burst):
+        self.rate_setting = rate_setting
+        self.default_rate = default_rate
+        self.burst_setting = burst_setting
+        self.default_burst = default_burst
+        self._lock = threading.Lock()
+        # client key -> (tokens, last update), least recently seen first
+        self._buckets = OrderedDict()
+        self.allowed = 0
+        self.limited = 0
+
+    def take(self, key, now=None):
+        """Take a token for ``key``; returns 0 when allowed, else the seconds until a token is available"""
+        rate = self.rate
+        if not rate:
+            return 0
+        burst = self.burst
+        max_clients = getattr(settings, 'RATE_LIMIT_MAX_CLIENTS', 10000)
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+                self.allowed += 1
+            else:
+                wait = (1 - tokens) / rate
+                self.limited += 1
+            # A client evicted here comes back with a full bucket; busy clients are never the oldest
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+    @property
+    def rate(self):
+        return getattr(settings, self.rate_setting, self.default_rate)
+
+    @property
+    def burst(self):
+        return getattr(settings, self.burst_setting, self.default_burst)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self):
+        return {
+            'clients': len(self._buckets),
+            'rate': self.rate,
+            'burst': self.burst,
+            'allowed': self.allowed,
+            'limited': self.limited,
+        }
+
+
+scan_limiter = TokenBuckets('SCAN_RATE_LIMIT', 5, 'SCAN_RATE_BURST', 20)
+upload_limiter = TokenBuckets('UPLOAD_RATE_LIMIT', 0.5, 'UPLOAD_RATE_BURST', 5)
+
+
+def client_ip(request):
+    if getattr(settings, 'RATE_LIMIT_TRUST_FORWARDED_FOR', False):
+        forwarded = request.headers.get('X-Forwarded-For', '').split(',')[0].strip()
+        if forwarded:
+            return forwarded
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _teacher_id(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return None
+        return data.get('teacher_id') if isinstance(data, dict) else None
+    return request.POST.get('teacher_id')
+
+
+def client_key(request):
+    """Who a request is charged to: its device, else its teacher, else its address"""
+    device = request.headers.get('X-Device-ID', '').strip()
+    if device:
+        return 'device:' + device[:64]
+    teacher_id = _teacher_id(request)
+    if teacher_id and isinstance(teacher_id, str):
+        return 'teacher:' + teacher_id[:64]
+    return 'ip:' + client_ip(request)
+
+
+def _retry_response(status, message, wait):
+    response = JsonResponse({'status': 'error', 'message': message}, status=status)
+    response['Retry-After'] = str(max(1, math.ceil(wait)))
+    return response
+
+
+def _throttle(limiter, request):
+    if request.method != 'POST':
+        return None
+    wait = limiter.take(client_key(request))
+    if not wait:
+        return None
+    return _retry_response(429, f'Too many requests from this device. Retry in {max(1, math.ceil(wait))}s.', wait)
+
+
+def rate_limited(limiter):
+    """Apply ``limiter`` (a TokenBuckets) to the POSTs of a sync or async view"""
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                response = _throttle(limiter, request)
+                if response is not None:
+                    return response
+                return await view(request, *args, **kwargs)
+        else:
+            @functools.wraps(view)
+            def wrapper(request, *args, **kwargs):
+                response = _throttle(limiter, request)
+                if response is not None:
+                    return response
+                return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class WriteGate:
+    """Counts the write views running in this process and refuses new ones past the limits"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.shed = 0
+
+    def enter(self):
+        """True when a write may start now; call leave() when it is done"""
+        max_in_flight = getattr(settings, 'ATTENDANCE_MAX_WRITES_IN_FLIGHT', 32)
+        queue_limit = getattr(settings, 'ATTENDANCE_WRITE_QUEUE_LIMIT', 100)
+        with self._lock:
+            if (max_in_flight and self.in_flight >= max_in_flight) or (
+                queue_limit and db_writer.depth() > queue_limit
+            ):
+                self.shed += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self):
+        return {'in_flight': self.in_flight, 'shed': self.shed}
+
+
+write_gate = WriteGate()
+
+
+def _overloaded():
+    return _retry_response(503, 'The server is busy recording other scans. Please retry.', 1)
+
+
+def shed_load(view):
+    """Refuse a sync or async write view with 503 while the write path is saturated"""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != 'POST':
+                return await view(request, *args, **kwargs)
+            if not write_gate.enter():
+                return _overloaded()
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                write_gate.leave()
+    else:
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'POST':
+                return view(request, *args, **kwargs)
+            if not write_gate.enter():
+                return _overloaded()
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                write_gate.leave()
+    return wrapper
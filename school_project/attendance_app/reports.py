@@ -0,0 +1,187 @@
+"""Date-range attendance reports.
+
+Counts come from GROUP BY queries over DailyAttendance, and per-student figures
+come from a students x school-days presence matrix built with NumPy. A school
+day is a date on which anyone was marked present. Absence has no row of its
+own: a student who was enrolled on a school day and was not marked present
+counts as absent. Days before a student's registration are not counted.
+
+NumPy is an optional dependency; without it ReportsUnavailable is raised.
+"""
+import datetime
+
+from django.db import transaction
+from django.db.models import Count
+
+from .db_routing import read_database
+from .models import DailyAttendance, Student
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+
+class ReportsUnavailable(Exception):
+    pass
+
+
+def _rate(present, total):
+    return round(float(present) / float(total) * 100, 2) if total else 0.0
+
+
+def _streaks(matrix):
+    """Length of the present run ending at each cell, per row"""
+    counts = np.cumsum(matrix, axis=1, dtype=np.int32)
+    # Count at the most recent absence, carried forward along the row
+    resets = np.maximum.accumulate(np.where(matrix, 0, counts), axis=1)
+    return counts - resets
+
+
+def _trends(matrix, enrolled):
+    """Least-squares change in attendance rate across the range, in points.
+
+    Fitted per student over the days they were enrolled for.
+    """
+    weights = enrolled.astype(np.float64)
+    x = np.arange(matrix.shape[1], dtype=np.float64)
+    n = weights.sum(axis=1)
+    safe_n = np.where(n > 0, n, 1)
+    x_mean = (weights * x).sum(axis=1) / safe_n
+    y_mean = (weights * matrix).sum(axis=1) / safe_n
+    dx = x - x_mean[:, None]
+    variance = (weights * dx * dx).sum(axis=1)
+    covariance = (weights * dx * (matrix - y_mean[:, None])).sum(axis=1)
+    slope = np.divide(covariance, variance, out=np.zeros_like(covariance), where=variance > 0)
+    return slope * 100 * max(matrix.shape[1] - 1, 1)
+
+
+def attendance_report(start, end, course=None, level=None, include_matrix=False):
+    """Build the report payload for ``start``..``end`` (inclusive)"""
+    if np is None:
+        raise ReportsUnavailable('Attendance reports require numpy (pip install numpy)')
+
+    # One read transaction so every query sees the same marks
+    with transaction.atomic(using=read_database()):
+        present = DailyAttendance.objects.filter(date__range=(start, end), is_present=True)
+        days = list(present.order_by('date').values_list('date', flat=True).distinct())
+
+        students = Student.objects.filter(is_active=True)
+        if course:
+            students = students.filter(course=course)
+        if level:
+            students = students.filter(level=level)
+        students = list(students.order_by('last_name', 'first_name', 'id').values_list(
+            'id', 'student_id', 'first_name', 'last_name', 'course', 'level', 'created_at'
+        ))
+
+        marks = present.filter(student__is_active=True)
+        if course:
+            marks = marks.filter(student__course=course)
+        if level:
+            marks = marks.filter(student__level=level)
+
+        # Present counts per (day, course, level) straight from SQL
+        group_counts = list(marks.order_by('date').values('date', 'student__course', 'student__level').annotate(
+            present=Count('id')
+        ))
+        # Only the student pks of the marks, in date order; their columns follow
+        # from the per-day counts, so no per-row dates are converted in Python
+        mark_pks = np.fromiter(marks.order_by('date').values_list('student_id', flat=True), dtype=np.int64)
+
+    day_index = {day: index for index, day in enumerate(days)}
+    per_day = {}
+    for row in group_counts:
+        per_day[row['date']] = per_day.get(row['date'], 0) + row['present']
+
+    # Presence matrix (students x school days)
+    matrix = np.zeros((len(students), len(days)), dtype=bool)
+    if len(mark_pks) and students:
+        pks = np.fromiter((row[0] for row in students), dtype=np.int64, count=len(students))
+        order = np.argsort(pks)
+        rows = order[np.searchsorted(pks, mark_pks, sorter=order)]
+        columns = np.repeat([day_index[day] for day in per_day], list(per_day.values()))
+        matrix[rows, columns] = True
+
+    # A student counts from the day they registered (or the first day they were marked)
+    day_numbers = np.array([day.toordinal() for day in days], dtype=np.int64)
+    registered = np.fromiter(
+        (row[6].date().toordinal() if row[6] else 0 for row in students), dtype=np.int64, count=len(students)
+    )
+    enrolled = (day_numbers[None, :] >= registered[:, None]) | matrix
+
+    present_days = matrix.sum(axis=1)
+    enrolled_days = enrolled.sum(axis=1)
+    streaks = _streaks(matrix)
+    trends = _trends(matrix, enrolled)
+
+    # Daily rates overall and per (course, level); denominators from the enrolment mask
+    groups = {}
+    for index, row in enumerate(students):
+        groups.setdefault((row[4], row[5]), []).append(index)
+    present_by_group = {}
+    for row in group_counts:
+        key = (row['student__course'], row['student__level'])
+        present_by_group.setdefault(key, np.zeros(len(days), dtype=np.int64))[day_index[row['date']]] = row['present']
+
+    courses = []
+    for (group_course, group_level), indexes in sorted(groups.items()):
+        group_enrolled = enrolled[indexes].sum(axis=0)
+        group_present = present_by_group.get((group_course, group_level), np.zeros(len(days), dtype=np.int64))
+        courses.append({
+            'course': group_course,
+            'level': group_level,
+            'students': len(indexes),
+            'attendance_rate': _rate(group_present.sum(), group_enrolled.sum()),
+            'daily_rates': [_rate(p, e) for p, e in zip(group_present.tolist(), group_enrolled.tolist())],
+        })
+
+    daily_present = matrix.sum(axis=0)
+    daily_enrolled = enrolled.sum(axis=0)
+
+    payload = {
+        'status': 'success',
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'days': [day.isoformat() for day in days],
+        'summary': {
+            'students': len(students),
+            'school_days': len(days),
+            'attendance_rate': _rate(present_days.sum(), enrolled_days.sum()),
+        },
+        'daily_rates': [_rate(p, e) for p, e in zip(daily_present.tolist(), daily_enrolled.tolist())],
+        'courses': courses,
+        'students': [
+            {
+                'student_id': row[1],
+                'name': f'{row[2]} {row[3]}',
+                'course': row[4],
+                'level': row[5],
+                'present': present,
+                'school_days': total,
+                'attendance_rate': _rate(present, total),
+                'current_streak': current,
+                'longest_streak': longest,
+                'trend': round(trend, 2),
+            }
+            for row, present, total, current, longest, trend in zip(
+                students,
+                present_days.tolist(),
+                enrolled_days.tolist(),
+                (streaks[:, -1] if len(days) else np.zeros(len(students), dtype=np.int32)).tolist(),
+                (streaks.max(axis=1) if len(days) else np.zeros(len(students), dtype=np.int32)).tolist(),
+                trends.tolist(),
+            )
+        ],
+    }
+
+    if include_matrix:
+        # One string per student, aligned with ``days``: 1 present, 0 absent, - not yet registered
+        cells = np.where(matrix, ord('1'), np.where(enrolled, ord('0'), ord('-'))).astype(np.uint8)
+        payload['matrix'] = [row.tobytes().decode() for row in cells]
+
+    return payload
+
+
+def default_range(today, days=90):
+    return today - datetime.timedelta(days=days - 1), today
@@ -0,0 +1,125 @@
+"""Conditional GET support and a per-worker cache of encoded JSON responses.
+
+Cacheable endpoints derive their ETag from the shared version counters in
+versions.py, so a matching If-None-Match is answered with 304 after a cache
+lookup and no query against the attendance tables. The first full response for
+an ETag is serialized and gzipped once and kept in an LRU-bounded dict; repeat
+fetches in the same worker reuse those bytes.
+"""
+import gzip
+import json
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+from .db_routing import current_database
+from .versions import get_version
+
+# Same test GZipMiddleware uses
+_ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+EncodedResponse = namedtuple('EncodedResponse', ['etag', 'body', 'gzipped'])
+
+
+def make_etag(resource, *version_names, extra=()):
+    """Weak ETag built from the current versions of ``version_names``.
+
+    ``extra`` adds anything else the representation depends on (e.g. the date).
+    The tag is weak because the same content is served gzipped or not.
+    """
+    parts = [resource, *(str(part) for part in extra)]
+    database = current_database()
+    if database != DEFAULT_DB_ALIAS:
+        # Campus shards number their versions independently
+        parts.append(database)
+    parts += [str(get_version(name)) for name in version_names]
+    return 'W/"%s"' % '-'.join(parts)
+
+
+def etag_matches(request, etag):
+    """True when the request's If-None-Match covers ``etag`` (weak comparison)"""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(tag.removeprefix('W/') == opaque for tag in parse_etags(header))
+
+
+def not_modified(etag):
+    response = HttpResponseNotModified()
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+class ResponseCache:
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or getattr(settings, 'RESPONSE_CACHE_SIZE', 64)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, etag, payload):
+        """Serialize ``payload`` once, keep both encodings and return them"""
+        body = json.dumps(payload, cls=DjangoJSONEncoder).encode()
+        entry = EncodedResponse(etag, body, gzip.compress(body, compresslevel=6))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+response_cache = ResponseCache()
+
+
+def cache_key(request, etag):
+    """Entries are per query string as well as per version"""
+    return (request.path, request.GET.urlencode(), etag)
+
+
+def encoded_response(request, entry, content_type='application/json'):
+    """HttpResponse for a cached entry, gzipped when the client accepts it"""
+    if _ACCEPTS_GZIP.search(request.headers.get('Accept-Encoding', '')):
+        response = HttpResponse(entry.gzipped, content_type=content_type)
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(entry.body, content_type=content_type)
+    response['ETag'] = entry.etag
+    # Let browsers keep the body but revalidate on every fetch
+    response['Cache-Control'] = 'no-cache'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,210 @@
+"""In-process roster cache for QR scan lookups.
+
+Each worker lazily loads the set of active student IDs and the active teachers
+in one query apiece, and keeps the student details needed to answer a scan in
+an LRU-bounded dict. Scans for unknown or inactive IDs are rejected from the ID
+set without touching the database, so a deactivated student holding a badge
+to the camera, or a stream of made-up legacy IDs, costs no queries. Student/
+Teacher signals (see signals.py) clear the local cache and bump a shared
+version so other workers reload too; a worker checks the version every
+ROSTER_CACHE_VERSION_CHECK_INTERVAL seconds, which bounds how long it can
+refuse a student registered through another worker. That needs the version
+cache shared between workers (see versions.py and the W001 deploy check).
+Each database (campus shard, see db_routing.py) has a roster of its own.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .db_routing import current_database, using_database
+from .models import Student, Teacher
+from .versions import bump_version, get_version
+
+ROSTER_VERSION = 'roster'
+
+_MISSING = object()
+
+STUDENT_FIELDS = ('pk', 'student_id', 'first_name', 'last_name', 'course', 'level')
+
+
+class CachedStudent(namedtuple('CachedStudent', STUDENT_FIELDS)):
+    """Read-only stand-in for the Student fields used when marking attendance"""
+    __slots__ = ()
+
+    def get_full_name(self):
+        return f"{self.first_name} {self.last_name}"
+
+
+class _RosterState:
+    """What one worker has cached from one database"""
+    __slots__ = ('students', 'student_ids', 'teachers', 'version', 'version_checked_at')
+
+    def __init__(self):
+        self.students = OrderedDict()
+        self.student_ids = None
+        self.teachers = None
+        self.version = None
+        self.version_checked_at = 0.0
+
+
+class RosterCache:
+    def __init__(self, max_size=None, version_check_interval=None):
+        self.max_size = max_size or getattr(settings, 'ROSTER_CACHE_SIZE', 10000)
+        self.version_check_interval = (
+            version_check_interval if version_check_interval is not None
+            else getattr(settings, 'ROSTER_CACHE_VERSION_CHECK_INTERVAL', 1.0)
+        )
+        self._lock = threading.Lock()
+        # Database alias -> _RosterState; campus shards have separate rosters
+        self._states = {}
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.loads = 0
+
+    def get_student(self, student_id):
+        """Return the active student for a scanned ID, or None if there is none"""
+        state = self._state()
+        if self._needs_load(state):
+            self._load(state)
+        student = self._lookup(state, student_id)
+        if student is _MISSING:
+            student = self._fetch(state, student_id)
+        return student
+
+    async def aget_student(self, student_id):
+        """Async get_student; only hops to a thread when the database is needed"""
+        state = self._state()
+        if self._needs_load(state):
+            await sync_to_async(self._load)(state)
+        student = self._lookup(state, student_id)
+        if student is _MISSING:
+            student = await sync_to_async(self._fetch)(state, student_id)
+        return student
+
+    def get_teacher_pk(self, teacher_id):
+        """Return the pk of an active teacher, or None if the ID is unknown"""
+        state = self._state()
+        if self._needs_load(state):
+            self._load(state)
+        teacher_pk = self._lookup_teacher(state, teacher_id)
+        if teacher_pk is _MISSING:
+            teacher_pk = self._fetch_teacher_pk(teacher_id)
+        return teacher_pk
+
+    async def aget_teacher_pk(self, teacher_id):
+        state = self._state()
+        if self._needs_load(state):
+            await sync_to_async(self._load)(state)
+        teacher_pk = self._lookup_teacher(state, teacher_id)
+        if teacher_pk is _MISSING:
+            teacher_pk = await sync_to_async(self._fetch_teacher_pk)(teacher_id)
+        return teacher_pk
+
+    def invalidate(self):
+        """Drop everything this worker has cached from the current database; the next lookup reloads"""
+        state = self._state()
+        with self._lock:
+            state.students.clear()
+            state.student_ids = None
+            state.teachers = None
+            state.version = None
+
+    def stats(self):
+        states = list(self._states.values())
+        return {
+            'size': sum(len(state.students) for state in states),
+            'max_size': self.max_size,
+            'known_students': sum(len(state.student_ids or ()) for state in states),
+            'hits': self.hits,
+            'misses': self.misses,
+            'rejected': self.rejected,
+            'loads': self.loads,
+        }
+
+    def _state(self):
+        database = current_database()
+        state = self._states.get(database)
+        if state is None:
+            with self._lock:
+                state = self._states.setdefault(database, _RosterState())
+        return state
+
+    def _lookup(self, state, student_id):
+        with self._lock:
+            if state.student_ids is None:
+                # Invalidated since the load check; fall back to the database
+                self.misses += 1
+                return _MISSING
+            if student_id not in state.student_ids:
+                self.rejected += 1
+                return None
+            student = state.students.get(student_id)
+            if student is None:
+                self.misses += 1
+                return _MISSING
+            state.students.move_to_end(student_id)
+            self.hits += 1
+            return student
+
+    def _fetch(self, state, student_id):
+        row = Student.objects.filter(student_id=student_id, is_active=True).values_list(*STUDENT_FIELDS).first()
+        if row is None:
+            with self._lock:
+                self.rejected += 1
+            return None
+        student = CachedStudent(*row)
+        with self._lock:
+            state.students[student_id] = student
+            while len(state.students) > self.max_size:
+                state.students.popitem(last=False)
+        return student
+
+    def _lookup_teacher(self, state, teacher_id):
+        teachers = state.teachers
+        if teachers is None:
+            return _MISSING
+        return teachers.get(teacher_id)
+
+    def _fetch_teacher_pk(self, teacher_id):
+        return Teacher.objects.filter(teacher_id=teacher_id, is_active=True).values_list('pk', flat=True).first()
+
+    def _needs_load(self, state):
+        now = time.monotonic()
+        if state.student_ids is not None and now - state.version_checked_at < self.version_check_interval:
+            return False
+
+        version = get_version(ROSTER_VERSION)
+        state.version_checked_at = now
+        return state.student_ids is None or version != state.version
+
+    def _load(self, state):
+        version = get_version(ROSTER_VERSION)
+        student_ids = set()
+        students = OrderedDict()
+        rows = Student.objects.filter(is_active=True).order_by().values_list(*STUDENT_FIELDS)
+        for row in rows.iterator():
+            student_ids.add(row[1])
+            if len(students) < self.max_size:
+                students[row[1]] = CachedStudent(*row)
+        teachers = dict(Teacher.objects.filter(is_active=True).values_list('teacher_id', 'pk'))
+
+        with self._lock:
+            state.student_ids = frozenset(student_ids)
+            state.students = students
+            state.teachers = teachers
+            state.version = version
+            self.loads += 1
+
+
+roster_cache = RosterCache()
+
+
+def invalidate_roster(database=None):
+    """Invalidate the roster of ``database`` (the current one by default) in every worker"""
+    with using_database(database or current_database()):
+        roster_cache.invalidate()
+        bump_version(ROSTER_VERSION)
@@ -0,0 +1,77 @@
+"""Per-worker memory of students already marked present, for repeat scans.
+
+The scanner decodes a badge held in front of the camera many times a second.
+Once a (student, date) pair is known to be present, further scans of it are
+answered from this dict for SCAN_DEDUPE_TTL seconds instead of going through
+the single writer to find the row already present. Entries are dropped when
+this worker sees the row deleted or set absent (signals.py); changes made by
+other workers are picked up when the entry expires.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .db_routing import current_database
+
+
+class ScanDedupe:
+    def __init__(self, ttl=None, max_entries=None):
+        self.ttl = ttl if ttl is not None else getattr(settings, 'SCAN_DEDUPE_TTL', 300)
+        self.max_entries = max_entries or getattr(settings, 'SCAN_DEDUPE_SIZE', 20000)
+        self._lock = threading.Lock()
+        # (database, student pk, date) -> (expires at, time_marked), oldest first
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, student_pk, date):
+        """time_marked of a student known to be present on ``date``, or None"""
+        if not self.ttl:
+            return None
+        key = (current_database(), student_pk, date)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def add(self, student_pk, date, time_marked):
+        if not self.ttl:
+            return
+        key = (current_database(), student_pk, date)
+        now = time.monotonic()
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (now + self.ttl, time_marked)
+            # Same TTL for every entry, so the oldest ones expire first
+            while self._entries:
+                oldest = next(iter(self._entries.values()))
+                if oldest[0] > now and len(self._entries) <= self.max_entries:
+                    break
+                self._entries.popitem(last=False)
+
+    def discard(self, student_pk, date):
+        with self._lock:
+            self._entries.pop((current_database(), student_pk, date), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+scan_dedupe = ScanDedupe()
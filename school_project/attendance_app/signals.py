@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .metrics import record_query
+from .presence_bitmaps import clear_present
+from .models import DailyAttendance, Student, Teacher
+from .roster_cache import invalidate_roster
+from .scan_dedupe import scan_dedupe
+from .stats import invalidate_attendance
+
+
+@receiver([post_save, post_delete], sender=Student)
+@receiver([post_save, post_delete], sender=Teacher)
+def roster_changed(sender, using, **kwargs):
+    # After commit, so no worker can cache the old rows under the new version
+    transaction.on_commit(lambda: invalidate_roster(using), using=using)
+
+
+@receiver([post_save, post_delete], sender=DailyAttendance)
+def attendance_changed(sender, instance, signal, **kwargs):
+    # Bulk upserts and conditional updates skip these signals and call
+    # stats.record_marks() instead, which bumps the same version
+    invalidate_attendance()
+    if signal is post_delete or not instance.is_present:
+        scan_dedupe.discard(instance.student_id, instance.date)
+    # A present row that goes away (or is set absent) leaves the presence bitmaps;
+    # new marks are added by the marking code, like the DailyStats counts
+    if (signal is post_delete and instance.is_present) or (
+        signal is post_save and not kwargs.get('created') and not instance.is_present
+    ):
+        clear_present(instance.date, instance.student_id)
+
+
+@receiver(connection_created)
+def install_query_metrics(sender, connection, **kwargs):
+    """Charge every query on this connection to the request that issued it"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Apply SQLITE_PRAGMAS (the production profile) to every new SQLite connection"""
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,734 @@
+// Dark mode setup
+function initDarkMode() {
+    const savedMode = localStorage.getItem('darkMode');
+    const prefersDark = window.matchMedia('(prefers-color-scheme: dark)').matches;
+    const isDark = savedMode ? savedMode === 'true' : prefersDark;
+
+    if (isDark) {
+        document.documentElement.classList.add('dark-mode');
+        document.getElementById('theme-icon').setAttribute('data-lucide', 'sun');
+    } else {
+        document.documentElement.classList.remove('dark-mode');
+        document.getElementById('theme-icon').setAttribute('data-lucide', 'moon');
+    }
+    lucide.createIcons();
+}
+
+function toggleDarkMode() {
+    const isDark = document.documentElement.classList.toggle('dark-mode');
+    localStorage.setItem('darkMode', isDark);
+    const icon = document.getElementById('theme-icon');
+    icon.setAttribute('data-lucide', isDark ? 'sun' : 'moon');
+    lucide.createIcons();
+}
+
+window.addEventListener('load', () => {
+    initDarkMode();
+    document.getElementById('dark-mode-toggle').addEventListener('click', toggleDarkMode);
+});
+let html5QrcodeScanner = null;
+
+// The scanner libraries are only fetched the first time they are needed;
+// the page lists their URLs (vendored copies when present, see static_assets.py)
+const lazyScripts = JSON.parse(document.getElementById('lazy-scripts').textContent);
+const loadedScripts = {};
+
+function loadScript(name) {
+    if (!loadedScripts[name]) {
+        loadedScripts[name] = new Promise((resolve, reject) => {
+            const script = document.createElement('script');
+            script.src = lazyScripts[name].src;
+            if (lazyScripts[name].integrity) {
+                script.integrity = lazyScripts[name].integrity;
+                script.crossOrigin = 'anonymous';
+            }
+            script.onload = resolve;
+            script.onerror = () => {
+                delete loadedScripts[name];
+                reject(new Error(`Could not load ${name}`));
+            };
+            document.head.appendChild(script);
+        });
+    }
+    return loadedScripts[name];
+}
+let presentCount = 0;
+
+
+
+async function handleStudentLogin(e) {
+    e.preventDefault();
+    const payload = {
+        firstname: document.getElementById('s-firstname').value,
+        lastname: document.getElementById('s-lastname').value,
+        id: document.getElementById('s-id').value,
+        course: document.getElementById('s-course').value,
+        level: document.getElementById('s-level').value,
+    };
+
+    try {
+        const response = await fetch('/api/login/student/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-Device-ID': deviceId(),
+            },
+            body: JSON.stringify(payload)
+        });
+        const data = await response.json();
+
+        if(data.status === 'success') {
+            // Render Dashboard
+            document.getElementById('card-name').innerText = payload.firstname + ' ' + payload.lastname;
+            document.getElementById('card-course-level').innerText = `${payload.course} • Year ${payload.level}`;
+            document.getElementById('card-id').innerText = payload.id;
+
+            // Badge image rendered (and cached) by the server from the signed payload
+            const qrData = data.student.qr_data;
+            const cardQr = document.getElementById('card-qr');
+            cardQr.onerror = () => {
+                // Server without the qrcode package: fall back to the public generator
+                cardQr.onerror = null;
+                cardQr.src = `https://api.qrserver.com/v1/create-qr-code/?size=200x200&data=${encodeURIComponent(qrData)}`;
+            };
+            cardQr.src = `/api/students/qr/?id=${encodeURIComponent(data.student.id)}&scale=6`;
+
+            showPage('student');
+
+            // Show success message
+            setTimeout(() => {
+                alert(`✅ ${data.message}`);
+            }, 500);
+        } else {
+            alert(`❌ ${data.message}`);
+        }
+    } catch (error) {
+        console.error('Error:', error);
+        alert('❌ Network error. Please try again.');
+    }
+}
+
+async function handleTeacherLogin(e) {
+    e.preventDefault();
+    const payload = {
+        firstname: document.getElementById('t-firstname').value,
+        lastname: document.getElementById('t-lastname').value,
+        id: document.getElementById('t-id').value,
+        subject: document.getElementById('t-subject').value,
+    };
+
+    try {
+        const response = await fetch('/api/login/teacher/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-Device-ID': deviceId(),
+            },
+            body: JSON.stringify(payload)
+        });
+        const data = await response.json();
+
+        if(data.status === 'success') {
+            currentTeacher = data.teacher;
+            document.getElementById('teacher-name').innerText = payload.firstname + ' ' + payload.lastname;
+            document.getElementById('teacher-subject').innerText = payload.subject;
+
+            // Load initial data, then follow new scans live
+            await loadDashboardStats();
+            startLiveFeed();
+            showPage('teacher');
+
+            setTimeout(() => {
+                alert(`✅ ${data.message}`);
+            }, 500);
+        } else {
+            alert(`❌ ${data.message}`);
+        }
+    } catch (error) {
+        console.error('Error:', error);
+        alert('❌ Network error. Please try again.');
+    }
+}
+
+// Prepend a marked/already-present scan to the attendance list
+function addScanResultRow(data) {
+    const s = data.student;
+    if (data.status === 'success') shownMarks.add(s.id);
+    const tbody = document.getElementById('attendance-list');
+    const empty = document.getElementById('empty-state');
+    if(empty) empty.remove();
+
+    const time = s.time_marked || new Date().toLocaleTimeString();
+    const statusClass = data.status === 'warning' ? 'bg-yellow-100 text-yellow-800' : 'bg-green-100 text-green-800';
+    const statusText = data.status === 'warning' ? 'Already Present' : 'Present';
+
+    const row = `
+        <tr class="hover:bg-green-50 transition ${statusClass}">
+            <td class="px-6 py-4 text-gray-500 font-mono text-sm">${time}</td>
+            <td class="px-6 py-4 font-medium text-gray-900">
+                ${s.name} <div class="text-xs text-gray-400">${s.course_level}</div>
+            </td>
+            <td class="px-6 py-4"><span class="${statusClass} px-2 py-1 rounded-full text-xs">${statusText}</span></td>
+        </tr>`;
+    tbody.innerHTML = row + tbody.innerHTML;
+
+    // Update stats
+    if (data.status === 'success') {
+        presentCount++;
+        document.getElementById('present-count').innerText = presentCount;
+    }
+}
+
+function newIdempotencyKey() {
+    // randomUUID needs a secure context (HTTPS or localhost)
+    return window.crypto && crypto.randomUUID
+        ? crypto.randomUUID()
+        : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+}
+
+function deviceId() {
+    // The server rate-limits scans per device
+    let id = localStorage.getItem('deviceId');
+    if (!id) {
+        id = newIdempotencyKey();
+        localStorage.setItem('deviceId', id);
+    }
+    return id;
+}
+
+function retryDelay(response, attempt) {
+    const seconds = parseInt(response.headers.get('Retry-After'), 10);
+    return Number.isFinite(seconds) ? seconds * 1000 : 500 * attempt;
+}
+
+async function postScan(body, idempotencyKey, attempts = 3) {
+    // Retries reuse the key, so a scan that did reach the server is not marked twice
+    for (let attempt = 1; ; attempt++) {
+        let response;
+        try {
+            response = await fetch('/api/attendance/mark/', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Idempotency-Key': idempotencyKey,
+                    'X-Device-ID': deviceId(),
+                },
+                body: body
+            });
+        } catch (error) {
+            if (attempt >= attempts) throw error;
+            await new Promise(resolve => setTimeout(resolve, 500 * attempt));
+            continue;
+        }
+        // Throttled (429) or shed under load (503): wait as long as the server asks
+        if ((response.status !== 429 && response.status !== 503) || attempt >= attempts) {
+            return response;
+        }
+        await new Promise(resolve => setTimeout(resolve, retryDelay(response, attempt)));
+    }
+}
+
+async function sendScanToBackend(qrData) {
+    try {
+        const response = await postScan(JSON.stringify({ 
+            qr_data: qrData,
+            teacher_id: currentTeacher ? currentTeacher.id : ''
+        }), newIdempotencyKey());
+        const data = await response.json();
+
+        if (data.status === 'success' || data.status === 'warning') {
+            addScanResultRow(data);
+            if (data.status === 'success') {
+                await updateAttendanceRate();
+            }
+
+            alert(data.message);
+        } else {
+            alert(`❌ ${data.message}`);
+        }
+    } catch (error) {
+        console.error('Error:', error);
+        alert('❌ Network error. Please try again.');
+    }
+}
+
+// --- STANDARD UTILS ---
+function showPage(pageId) {
+    document.querySelectorAll('section').forEach(el => el.classList.add('hidden'));
+    document.getElementById('page-' + pageId).classList.remove('hidden');
+    if(pageId !== 'teacher' && html5QrcodeScanner) {
+        html5QrcodeScanner.clear();
+        document.getElementById('scanner-wrapper').classList.add('hidden');
+    }
+}
+
+async function toggleScanner() {
+    const wrapper = document.getElementById('scanner-wrapper');
+    if (wrapper.classList.contains('hidden')) {
+        try {
+            await loadScript('html5-qrcode');
+        } catch (error) {
+            alert('❌ Could not load the scanner. Please check your connection.');
+            return;
+        }
+        wrapper.classList.remove('hidden');
+        html5QrcodeScanner = new Html5QrcodeScanner("reader", { fps: 10, qrbox: {width: 250, height: 250} }, false);
+        html5QrcodeScanner.render(onScanSuccess, (err) => {});
+    } else {
+        wrapper.classList.add('hidden');
+        if(html5QrcodeScanner) html5QrcodeScanner.clear();
+    }
+}
+
+function onScanSuccess(decodedText) {
+    toggleScanner();
+    console.log('QR Code scanned:', decodedText);
+    sendScanToBackend(decodedText);
+}
+
+// ============ STUDENT MANAGEMENT FUNCTIONS ============
+async function showStudentsManagement() {
+    showPage('students');
+    await loadStudentsList();
+}
+
+async function loadStudentsList() {
+    try {
+        const tbody = document.getElementById('students-table-body');
+        tbody.innerHTML = '<tr id="students-loading"><td colspan="5" class="px-6 py-12 text-center text-gray-400">Loading students...</td></tr>';
+
+        const response = await fetch('/api/students/');
+        const data = await response.json();
+
+        if (data.status === 'success') {
+            currentStudents = data.students;
+            renderStudentsTable(data.students);
+        } else {
+            tbody.innerHTML = '<tr><td colspan="5" class="px-6 py-12 text-center text-red-400">Error loading students</td></tr>';
+        }
+    } catch (error) {
+        console.error('Error:', error);
+        const tbody = document.getElementById('students-table-body');
+        tbody.innerHTML = '<tr><td colspan="5" class="px-6 py-12 text-center text-red-400">Network error</td></tr>';
+    }
+}
+
+function renderStudentsTable(students) {
+    const tbody = document.getElementById('students-table-body');
+
+    if (students.length === 0) {
+        tbody.innerHTML = '<tr><td colspan="5" class="px-6 py-12 text-center text-gray-400">No students found</td></tr>';
+        return;
+    }
+
+    tbody.innerHTML = students.map(student => `
+        <tr class="hover:bg-gray-50">
+            <td class="px-6 py-4 font-mono text-sm">${student.id}</td>
+            <td class="px-6 py-4 font-medium">${student.name}</td>
+            <td class="px-6 py-4 text-gray-600">${student.course} - Year ${student.level}</td>
+            <td class="px-6 py-4">
+                <span class="${student.is_present_today ? 'bg-green-100 text-green-800' : 'bg-gray-100 text-gray-800'} px-2 py-1 rounded-full text-xs">
+                    ${student.is_present_today ? 'Present Today' : 'Absent'}
+                </span>
+            </td>
+            <td class="px-6 py-4">
+                <div class="flex space-x-2">
+                    <button onclick="editStudent('${student.id}')" class="text-blue-600 hover:text-blue-800 text-sm font-medium">
+                        <i data-lucide="edit" class="w-4 h-4"></i>
+                    </button>
+                    <button onclick="downloadStudentQR('${student.id}')" class="text-green-600 hover:text-green-800 text-sm font-medium">
+                        <i data-lucide="download" class="w-4 h-4"></i>
+                    </button>
+                    <button onclick="deleteStudent('${student.id}')" class="text-red-600 hover:text-red-800 text-sm font-medium">
+                        <i data-lucide="trash-2" class="w-4 h-4"></i>
+                    </button>
+                </div>
+            </td>
+        </tr>
+    `).join('');
+
+    lucide.createIcons();
+}
+
+function refreshStudentsList() {
+    loadStudentsList();
+}
+
+let searchTimer = null;
+let searchSequence = 0;
+
+function searchStudents() {
+    const searchTerm = document.getElementById('student-search').value.trim();
+    clearTimeout(searchTimer);
+    const sequence = ++searchSequence;
+    if (!searchTerm) {
+        renderStudentsTable(currentStudents);
+        return;
+    }
+    // Searched on the server (indexed), once typing pauses
+    searchTimer = setTimeout(async () => {
+        try {
+            const response = await fetch(`/api/students/search/?q=${encodeURIComponent(searchTerm)}&limit=50`);
+            const data = await response.json();
+            // A slower response to an earlier keystroke must not replace newer results
+            if (sequence === searchSequence && data.status === 'success') {
+                renderStudentsTable(data.students);
+            }
+        } catch (error) {
+            console.error('Search error:', error);
+        }
+    }, 150);
+}
+
+function editStudent(studentId) {
+    const student = currentStudents.find(s => s.id === studentId);
+    if (!student) return;
+
+    // Simple prompt-based editing (in a real app, you'd use a modal)
+    const newName = prompt('Enter new name (First Last):', student.name);
+    if (!newName) return;
+
+    const [firstName, ...lastNameParts] = newName.split(' ');
+    const lastName = lastNameParts.join(' ');
+
+    const newCourse = prompt('Enter new course:', student.course);
+    if (!newCourse) return;
+
+    const newLevel = prompt('Enter new level (1-5):', student.level);
+    if (!newLevel) return;
+
+    updateStudent(studentId, {
+        firstname: firstName,
+        lastname: lastName,
+        course: newCourse,
+        level: newLevel
+    });
+}
+
+async function updateStudent(studentId, data) {
+    try {
+        const response = await fetch('/api/students/update/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                student_id: studentId,
+                ...data
+            })
+        });
+        const result = await response.json();
+
+        if (result.status === 'success') {
+            alert('✅ Student updated successfully!');
+            await loadStudentsList();
+        } else {
+            alert(`❌ ${result.message}`);
+        }
+    } catch (error) {
+        console.error('Error:', error);
+        alert('❌ Network error. Please try again.');
+    }
+}
+
+async function deleteStudent(studentId) {
+    if (!confirm('Are you sure you want to deactivate this student?')) return;
+
+    try {
+        const response = await fetch('/api/students/delete/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                student_id: studentId
+            })
+        });
+        const result = await response.json();
+
+        if (result.status === 'success') {
+            alert('✅ Student deactivated successfully!');
+            await loadStudentsList();
+        } else {
+            alert(`❌ ${result.message}`);
+        }
+    } catch (error) {
+        console.error('Error:', error);
+        alert('❌ Network error. Please try again.');
+    }
+}
+
+function downloadStudentQR(studentId) {
+    const student = currentStudents.find(s => s.id === studentId);
+    if (!student) return;
+
+    const qrUrl = `/api/students/qr/?id=${encodeURIComponent(studentId)}&scale=10`;
+
+    // Create a temporary link to download the QR code
+    const link = document.createElement('a');
+    link.href = qrUrl;
+    link.download = `${student.name.replace(' ', '_')}_QR.png`;
+    document.body.appendChild(link);
+    link.click();
+    document.body.removeChild(link);
+}
+
+// ============ DASHBOARD STATS ============
+async function loadDashboardStats() {
+    try {
+        const response = await fetch('/api/attendance/daily/');
+        const data = await response.json();
+
+        if (data.status === 'success') {
+            currentDate = data.date;
+            renderStatistics(data.statistics);
+        }
+    } catch (error) {
+        console.error('Error loading stats:', error);
+    }
+}
+
+function renderStatistics(stats) {
+    presentCount = stats.present;
+    document.getElementById('present-count').innerText = stats.present;
+    document.getElementById('total-students').innerText = stats.total_students;
+    document.getElementById('attendance-rate').innerText = `${stats.attendance_rate}%`;
+}
+
+async function updateAttendanceRate() {
+    // The live feed already pushes updated counts
+    if (liveFeed && liveFeed.readyState === EventSource.OPEN) return;
+    await loadDashboardStats();
+}
+
+// ============ LIVE FEED (Server-Sent Events) ============
+let liveFeed = null;
+let statsPoller = null;
+let currentDate = null;
+const shownMarks = new Set();
+
+function startLiveFeed() {
+    if (liveFeed || !window.EventSource) return;
+
+    // EventSource reconnects on its own and sends Last-Event-ID,
+    // so only the scans missed while disconnected are replayed
+    liveFeed = new EventSource('/api/attendance/stream/');
+
+    liveFeed.addEventListener('mark', (e) => {
+        const mark = JSON.parse(e.data);
+        if (mark.date !== currentDate) return;
+        if (!shownMarks.has(mark.student_id)) {
+            addScanResultRow({
+                status: 'success',
+                student: {
+                    id: mark.student_id,
+                    name: mark.student_name,
+                    course_level: mark.course_level,
+                    time_marked: mark.time_marked
+                }
+            });
+        }
+        renderStatistics(mark.statistics);
+    });
+
+    liveFeed.addEventListener('statistics', (e) => {
+        const update = JSON.parse(e.data);
+        if (update.date === currentDate) renderStatistics(update.statistics);
+    });
+
+    // Missed more than the server remembers: refetch the snapshot
+    liveFeed.addEventListener('resync', () => loadDashboardStats());
+
+    liveFeed.onerror = () => {
+        // Not served through ASGI (501) or gone for good: fall back to polling
+        if (liveFeed.readyState === EventSource.CLOSED) {
+            liveFeed = null;
+            if (!statsPoller) statsPoller = setInterval(loadDashboardStats, 15000);
+        }
+    };
+}
+
+// ============ QR SCANNING FUNCTIONS ============
+function openImageUpload() {
+    document.getElementById('qr-image-input').click();
+}
+
+async function handleImageUpload(event) {
+    const files = Array.from(event.target.files);
+    event.target.value = '';
+    if (files.length === 0) return;
+
+    for (const file of files) {
+        // Validate file type
+        if (!file.type.startsWith('image/')) {
+            alert('❌ Please select a valid image file.');
+            return;
+        }
+
+        // Validate file size (max 5MB)
+        if (file.size > 5 * 1024 * 1024) {
+            alert('❌ Image file is too large. Please select an image smaller than 5MB.');
+            return;
+        }
+    }
+
+    // Let the server decode the photos (every QR code in each one)
+    const formData = new FormData();
+    files.forEach(file => formData.append('images', file));
+    formData.append('teacher_id', currentTeacher ? currentTeacher.id : '');
+
+    try {
+        const response = await fetch('/api/attendance/upload/', {
+            method: 'POST',
+            headers: { 'X-Device-ID': deviceId() },
+            body: formData
+        });
+
+        if (response.status === 501) {
+            // No server-side decoder installed; decode in the browser instead
+            files.forEach(decodeImageInBrowser);
+            return;
+        }
+
+        const data = await response.json();
+        if (data.status === 'success') {
+            data.results.filter(r => r.status !== 'error').forEach(addScanResultRow);
+            await updateAttendanceRate();
+            alert(data.results.map(r => r.status === 'error' ? `❌ ${r.message}` : r.message).join('\n'));
+        } else {
+            alert(`❌ ${data.message}`);
+        }
+    } catch (error) {
+        console.error('Error uploading image:', error);
+        alert('❌ Network error. Please try again.');
+    }
+}
+
+function decodeImageInBrowser(file) {
+    alert('📱 QR Image uploaded! Decoding...');
+
+    try {
+        // Create an image element to load the file
+        const img = new Image();
+        const canvas = document.createElement('canvas');
+        const ctx = canvas.getContext('2d');
+
+        img.onload = async function() {
+            try {
+                await loadScript('jsqr');
+
+                // Set canvas size to image size
+                canvas.width = img.width;
+                canvas.height = img.height;
+
+                // Draw image on canvas
+                ctx.drawImage(img, 0, 0);
+
+                // Get image data
+                const imageData = ctx.getImageData(0, 0, canvas.width, canvas.height);
+
+                // Decode QR code with better options
+                const code = jsQR(imageData.data, imageData.width, imageData.height, {
+                    inversionAttempts: "dontInvert", // Optional: performance optimization
+                });
+
+                if (code) {
+                    // QR code found!
+                    console.log('QR Code decoded from image:', code.data);
+
+                    // Send the decoded QR data to the upload API
+                    sendDecodedQrToBackend(code.data);
+                } else {
+                    // No QR code found, show error with suggestions
+                    alert('❌ No QR code found in the image. Please ensure:\n' +
+                          '• The image is clear and well-lit\n' +
+                          '• The QR code is not blurry or distorted\n' +
+                          '• The QR code is fully visible in the image\n' +
+                          '• Try a different QR code if available');
+                }
+            } catch (decodeError) {
+                console.error('Error decoding QR code:', decodeError);
+                alert('❌ Error processing QR code. Please try a different image.');
+            }
+        };
+
+        img.onerror = function() {
+            alert('❌ Error loading image. Please try a different image.');
+        };
+
+        // Load the image file
+        const reader = new FileReader();
+        reader.onload = function(e) {
+            img.src = e.target.result;
+        };
+        reader.onerror = function() {
+            alert('❌ Error reading file. Please try again.');
+        };
+        reader.readAsDataURL(file);
+
+    } catch (error) {
+        console.error('Error processing image:', error);
+        alert('❌ Error processing image. Please try again.');
+    }
+}
+
+function sendDecodedQrToBackend(qrData) {
+    console.log('[DEBUG] sendDecodedQrToBackend called with qrData:', qrData);
+    console.log('[DEBUG] currentTeacher:', currentTeacher);
+
+    const payload = { 
+        qr_data: qrData,
+        teacher_id: currentTeacher ? currentTeacher.id : ''
+    };
+
+    console.log('[DEBUG] Sending payload:', payload);
+
+    try {
+        fetch('/api/attendance/upload/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-Device-ID': deviceId(),
+            },
+            body: JSON.stringify(payload)
+        })
+        .then(response => {
+            console.log('[DEBUG] Response status:', response.status);
+            console.log('[DEBUG] Response headers:', response.headers);
+            return response.json();
+        })
+        .then(data => {
+            console.log('[DEBUG] Response data:', data);
+
+            if (data.status === 'success' || data.status === 'warning') {
+                addScanResultRow(data);
+                if (data.status === 'success') {
+                    updateAttendanceRate();
+                }
+
+                alert(data.message);
+            } else {
+                alert(`❌ ${data.message}`);
+            }
+        })
+        .catch(error => {
+            console.error('[ERROR] Fetch error:', error);
+            alert('❌ Network error. Please try again.');
+        });
+    } catch (error) {
+        console.error('[ERROR] General error:', error);
+        alert('❌ Network error. Please try again.');
+    }
+}
+
+// Update the initialization to include search functionality
+window.addEventListener('load', () => {
+    initDarkMode();
+    document.getElementById('dark-mode-toggle').addEventListener('click', toggleDarkMode);
+    document.getElementById('student-search').addEventListener('input', searchStudents);
+});
+
+// Keep the scanner shell available offline (see service_worker in views.py)
+if ('serviceWorker' in navigator) {
+    navigator.serviceWorker.register('/sw.js').catch(error => console.error('Service worker registration failed:', error));
+}
@@ -0,0 +1,227 @@
+"""Static bundle of the single-page app: hashed assets, precompression, vendored scripts.
+
+The page's CSS and JS live in static/attendance_app/ and are referenced with
+{% static %}, so collectstatic (PrecompressedManifestStaticFilesStorage)
+writes content-hashed copies such as app.3f2a9c1b.js, plus .gz and, with the
+optional brotli package, .br variants of every text asset. serve_asset()
+answers from STATIC_ROOT with the variant the client accepts, and gives hashed
+names a year-long immutable Cache-Control: a changed file gets a new name.
+
+Third-party scripts are pinned in VENDOR_SCRIPTS. The vendor_static command
+downloads them into static/attendance_app/vendor/ and records their SRI hashes
+in vendor.lock.json; until a script is vendored the page uses its pinned CDN
+URL (with the recorded hash, if any). html5-qrcode and jsQR are only fetched
+when the camera scanner or the in-browser decoder is first used.
+
+The index page has no per-request content, so it is rendered once per process
+(on every request with DEBUG) and kept gzipped with an ETag. The service
+worker precaches it with the assets, keeping the scanner shell usable offline.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.contrib.staticfiles.views import serve as serve_from_finders
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.template.loader import render_to_string
+from django.templatetags.static import static
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .response_cache import EncodedResponse
+
+VendorScript = namedtuple('VendorScript', ['url', 'filename', 'in_head'])
+
+VENDOR_DIR = 'attendance_app/vendor'
+VENDOR_SCRIPTS = {
+    'tailwind': VendorScript('https://cdn.tailwindcss.com/3.4.17', 'tailwind-3.4.17.js', True),
+    'lucide': VendorScript('https://unpkg.com/lucide@0.460.0/dist/umd/lucide.min.js', 'lucide-0.460.0.min.js', True),
+    'html5-qrcode': VendorScript('https://unpkg.com/html5-qrcode@2.3.8/html5-qrcode.min.js',
+                                 'html5-qrcode-2.3.8.min.js', False),
+    'jsqr': VendorScript('https://cdn.jsdelivr.net/npm/jsqr@1.4.0/dist/jsQR.js', 'jsQR-1.4.0.js', False),
+}
+VENDOR_LOCK = Path(__file__).resolve().parent / 'static' / VENDOR_DIR / 'vendor.lock.json'
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=0, must-revalidate'
+
+# Encoding -> file suffix, preferred first
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+
+def vendor_lock():
+    """name -> {'url', 'integrity'} recorded by the vendor_static command"""
+    try:
+        return json.loads(VENDOR_LOCK.read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def is_vendored(name):
+    return finders.find(f'{VENDOR_DIR}/{VENDOR_SCRIPTS[name].filename}') is not None
+
+
+def unvendored_scripts():
+    """Names of the vendor scripts the page still loads from their CDN"""
+    return [name for name in VENDOR_SCRIPTS if not is_vendored(name)]
+
+
+def script_source(name, lock=None):
+    """``{'name', 'src', 'integrity', 'vendored'}`` of a vendor script: the vendored copy if present,
+    else the pinned URL"""
+    script = VENDOR_SCRIPTS[name]
+    if is_vendored(name):
+        return {'name': name, 'src': static(f'{VENDOR_DIR}/{script.filename}'), 'integrity': None, 'vendored': True}
+    locked = (lock if lock is not None else vendor_lock()).get(name, {})
+    # A hash recorded for another version doesn't apply
+    integrity = locked.get('integrity') if locked.get('url') == script.url else None
+    return {'name': name, 'src': script.url, 'integrity': integrity, 'vendored': False}
+
+
+# ---- Collecting ----
+
+def _compressors():
+    compressors = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        compressors.insert(0, ('.br', lambda data: brotli.compress(data, quality=11)))
+    return compressors
+
+
+class PrecompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also writes .gz/.br files next to each hashed text asset"""
+    # Without a manifest (DEBUG, tests) fall back to the unhashed names
+    manifest_strict = False
+    compressible = ('.css', '.js', '.json', '.svg', '.html', '.txt', '.map')
+    min_size = 256
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        compressors = _compressors()
+        for name in sorted(set(self.hashed_files.values())):
+            if name.endswith(self.compressible):
+                for compressed_name in self.precompress(name, compressors):
+                    yield name, compressed_name, True
+
+    def precompress(self, name, compressors):
+        path = self.path(name)
+        data = None
+        for suffix, compress in compressors:
+            # Hashed names never change content, so an existing variant is current
+            if os.path.exists(path + suffix):
+                continue
+            if data is None:
+                with open(path, 'rb') as source:
+                    data = source.read()
+                if len(data) < self.min_size:
+                    return
+            compressed = compress(data)
+            if len(compressed) < len(data):
+                with open(path + suffix, 'wb') as output:
+                    output.write(compressed)
+                yield name + suffix
+
+
+# ---- Serving ----
+
+@lru_cache(maxsize=None)
+def hashed_names():
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def _accepted(request, encoding):
+    return re.search(rf'\b{encoding}\b', request.headers.get('Accept-Encoding', '')) is not None
+
+
+def serve_asset(request, path):
+    """A file collected into STATIC_ROOT, as the smallest precompressed variant the client accepts"""
+    try:
+        original = Path(safe_join(settings.STATIC_ROOT, path)) if settings.STATIC_ROOT else None
+    except SuspiciousFileOperation:
+        raise Http404(path)
+    if original is None or not original.is_file():
+        if settings.DEBUG:
+            # Not collected yet: serve from the app directories like runserver does
+            return serve_from_finders(request, path, insecure=True)
+        raise Http404(path)
+
+    served, encoding = original, None
+    for candidate, suffix in PRECOMPRESSED:
+        variant = original.with_name(original.name + suffix)
+        if _accepted(request, candidate) and variant.is_file():
+            served, encoding = variant, candidate
+            break
+
+    mtime = served.stat().st_mtime
+    if not was_modified_since(request.headers.get('If-Modified-Since'), mtime):
+        response = HttpResponseNotModified()
+    else:
+        content_type, _ = mimetypes.guess_type(original.name)
+        response = FileResponse(served.open('rb'), content_type=content_type or 'application/octet-stream')
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(mtime)
+    response['Cache-Control'] = IMMUTABLE if path in hashed_names() else REVALIDATE
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+# ---- Rendered pages ----
+
+_pages = {}
+
+
+def _encode(text):
+    body = text.encode()
+    return EncodedResponse('W/"%s"' % hashlib.sha256(body).hexdigest()[:20], body, gzip.compress(body, compresslevel=9))
+
+
+def index_page():
+    """The rendered index.html as an EncodedResponse"""
+    page = _pages.get('index')
+    if page is None or settings.DEBUG:
+        lock = vendor_lock()
+        page = _pages['index'] = _encode(render_to_string('attendance_app/index.html', {
+            'head_scripts': [script_source(name, lock) for name, script in VENDOR_SCRIPTS.items() if script.in_head],
+            'lazy_scripts': {
+                name: script_source(name, lock) for name, script in VENDOR_SCRIPTS.items() if not script.in_head
+            },
+        }))
+    return page
+
+
+def precache_urls():
+    lock = vendor_lock()
+    return ['/', static('attendance_app/css/app.css'), static('attendance_app/js/app.js')] + [
+        script_source(name, lock)['src'] for name in VENDOR_SCRIPTS
+    ]
+
+
+def service_worker_page():
+    """The service worker script; its cache name changes with the page and every asset URL"""
+    page = _pages.get('sw')
+    if page is None or settings.DEBUG:
+        urls = precache_urls()
+        version = hashlib.sha256('\n'.join([index_page().etag] + urls).encode()).hexdigest()[:12]
+        page = _pages['sw'] = _encode(render_to_string('attendance_app/sw.js', {
+            'cache_name': f'smartattend-{version}',
+            'precache': json.dumps(urls),
+        }))
+    return page
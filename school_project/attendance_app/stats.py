@@ -0,0 +1,129 @@
+"""Incrementally maintained DailyStats rows.
+
+Every mark, registration and (de)activation adjusts the counters for its date
+inside the transaction that made the change, so the dashboard statistics are a
+single-row read. A missing row is computed from DailyAttendance the first time
+it is touched; rebuild_stats() recomputes a date range to repair drift.
+Each change also bumps the shared 'attendance' version once it commits, which
+the ETags of the roster and daily endpoints are built from.
+"""
+import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .db_routing import current_database
+from .models import DailyAttendance, DailyStats, Student
+from .versions import bump_version
+
+ATTENDANCE_VERSION = 'attendance'
+
+
+def _counts_by_date(start, end):
+    rows = DailyAttendance.objects.filter(date__range=(start, end)).order_by().values('date').annotate(
+        present=Count('id', filter=Q(is_present=True)),
+        qr_count=Count('id', filter=Q(is_present=True, qr_scanned=True)),
+    )
+    return {
+        row['date']: {
+            'present': row['present'],
+            'qr_count': row['qr_count'],
+            'manual_count': row['present'] - row['qr_count'],
+        }
+        for row in rows
+    }
+
+
+def _active_count():
+    return Student.objects.filter(is_active=True).count()
+
+
+def _create_stats(date):
+    """Create the row for ``date`` from the current table state (changes already included)"""
+    counts = _counts_by_date(date, date).get(date, {})
+    try:
+        with transaction.atomic(using=current_database()):
+            return DailyStats.objects.create(date=date, total_active=_active_count(), **counts)
+    except IntegrityError:
+        # Another request created it first (read from the primary, a replica may not have it yet)
+        return DailyStats.objects.using(current_database()).get(date=date)
+
+
+def _apply(date, **deltas):
+    updated = DailyStats.objects.filter(date=date).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    if not updated:
+        _create_stats(date)
+
+
+def invalidate_attendance():
+    """Bump the attendance version after the current transaction commits"""
+    transaction.on_commit(lambda: bump_version(ATTENDANCE_VERSION), using=current_database())
+
+
+def get_daily_stats(date):
+    """Return the DailyStats row for ``date``, creating it on first use"""
+    stats = DailyStats.objects.filter(date=date).first()
+    return stats if stats is not None else _create_stats(date)
+
+
+def summarize(stats):
+    """Statistics block returned by the daily endpoint and pushed to live dashboards"""
+    total_students = stats.total_active
+    present_count = stats.present
+    absent_count = total_students - present_count
+    
+    return {
+        'total_students': total_students,
+        'present': present_count,
+        'absent': absent_count,
+        'attendance_rate': round((present_count / total_students * 100) if total_students > 0 else 0, 2)
+    }
+
+
+def record_marks(date, qr=0, manual=0):
+    """Count newly present students (call inside the marking transaction)"""
+    if qr or manual:
+        _apply(date, present=qr + manual, qr_count=qr, manual_count=manual)
+        invalidate_attendance()
+
+
+def record_roster_change(delta):
+    """Adjust today's active-student total after a registration or (de)activation"""
+    if delta:
+        _apply(timezone.now().date(), total_active=delta)
+        invalidate_attendance()
+
+
+def rebuild_stats(start, end):
+    """Recompute present/QR/manual counts for a date range from DailyAttendance.
+
+    total_active is recounted for today only; past days keep their stored value
+    (the roster of a past day cannot be reconstructed), or get today's count if
+    they have no row yet.
+    """
+    today = timezone.now().date()
+    counts = _counts_by_date(start, end)
+    existing = {stats.date: stats for stats in DailyStats.objects.filter(date__range=(start, end))}
+    active = _active_count()
+    empty = {'present': 0, 'qr_count': 0, 'manual_count': 0}
+
+    rows = []
+    date = start
+    while date <= end:
+        if date in counts or date in existing:
+            stored = existing.get(date)
+            total_active = active if date == today or stored is None else stored.total_active
+            rows.append(DailyStats(date=date, total_active=total_active, **counts.get(date, empty)))
+        date += datetime.timedelta(days=1)
+
+    DailyStats.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['date'],
+        update_fields=['total_active', 'present', 'qr_count', 'manual_count', 'updated_at'],
+    )
+    invalidate_attendance()
+    return rows
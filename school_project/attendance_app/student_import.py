@@ -0,0 +1,174 @@
+"""Bulk student import from CSV or JSONL.
+
+Rows are parsed one at a time from any iterable of byte lines (an uploaded
+file, the request body, a file on disk), validated like student_login_api
+(required fields, IDs a badge can carry), and upserted in chunks with one
+bulk statement per table. Invalid rows are reported with their line number and
+skipped; the rest of the file is still imported. Memory use is bounded by the
+chunk size.
+"""
+import codecs
+import csv
+import json
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .db_routing import current_database
+from .db_writer import db_writer
+from .models import DailyAttendance, Student
+from .presence import sparse_presence
+from .qr_payload import INVALID_ID_MESSAGE, valid_student_id
+from .roster_cache import invalidate_roster
+from . import events, stats
+
+FORMATS = ('csv', 'jsonl')
+
+# Import column -> Student field; the column names are the student_login_api keys
+IMPORT_FIELDS = {
+    'id': 'student_id',
+    'firstname': 'first_name',
+    'lastname': 'last_name',
+    'course': 'course',
+    'level': 'level',
+}
+
+# Rows beyond this many failures are counted but not listed
+MAX_REPORTED_ERRORS = 100
+
+
+def guess_format(filename='', content_type=''):
+    if filename.lower().endswith(('.jsonl', '.ndjson')) or content_type in (
+        'application/jsonl', 'application/x-ndjson', 'application/x-jsonlines'
+    ):
+        return 'jsonl'
+    return 'csv'
+
+
+def read_rows(lines, format='csv'):
+    """Yield ``(line_number, row)`` pairs from an iterable of byte lines"""
+    if format not in FORMATS:
+        raise ValueError(f'Unsupported format: {format} (expected csv or jsonl)')
+    text = codecs.iterdecode(lines, 'utf-8-sig')
+
+    if format == 'jsonl':
+        for number, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, None
+        return
+
+    reader = csv.DictReader(text)
+    missing = [field for field in IMPORT_FIELDS if field not in (reader.fieldnames or ())]
+    if missing:
+        raise ValueError(f'CSV header is missing column(s): {", ".join(missing)}')
+    for row in reader:
+        yield reader.line_num, row
+
+
+def clean_row(row):
+    """Return Student field values for one import row, or raise ValueError"""
+    if not isinstance(row, dict):
+        raise ValueError('Expected one JSON object per line')
+
+    values = {}
+    for column, field in IMPORT_FIELDS.items():
+        value = row.get(column)
+        value = '' if value is None else str(value).strip()
+        if not value:
+            raise ValueError(f'Missing field: {column}')
+        max_length = Student._meta.get_field(field).max_length
+        if len(value) > max_length:
+            raise ValueError(f'{column} is longer than {max_length} characters')
+        values[field] = value
+    if not valid_student_id(values['student_id']):
+        raise ValueError(INVALID_ID_MESSAGE)
+    return values
+
+
+def _upsert_chunk(chunk):
+    """Upsert one chunk of ``{student_id: values}``; returns the number created"""
+    now = timezone.now()
+    today = now.date()
+
+    with transaction.atomic(using=current_database()):
+        was_active = dict(
+            Student.objects.filter(student_id__in=chunk).values_list('student_id', 'is_active')
+        )
+        Student.objects.bulk_create(
+            [Student(**values, is_active=True, created_at=now, updated_at=now) for values in chunk.values()],
+            update_conflicts=True,
+            unique_fields=['student_id'],
+            update_fields=['first_name', 'last_name', 'course', 'level', 'is_active', 'updated_at'],
+        )
+
+        # Today's (absent) attendance rows, as registration creates them in dense mode
+        if not sparse_presence():
+            pks = Student.objects.filter(student_id__in=chunk).values_list('pk', flat=True)
+            DailyAttendance.objects.bulk_create(
+                [DailyAttendance(student_id=pk, date=today) for pk in pks],
+                ignore_conflicts=True,
+            )
+
+        # bulk_create sends no signals, so do what they and the views would
+        activated = sum(1 for student_id in chunk if not was_active.get(student_id))
+        stats.record_roster_change(activated)
+        stats.invalidate_attendance()
+        transaction.on_commit(invalidate_roster, using=current_database())
+        if activated:
+            events.publish_statistics(today)
+
+    return sum(1 for student_id in chunk if student_id not in was_active)
+
+
+def _add_error(summary, line, student_id, message):
+    summary['failed'] += 1
+    if len(summary['errors']) < MAX_REPORTED_ERRORS:
+        summary['errors'].append({'line': line, 'student_id': student_id, 'message': message})
+
+
+def import_students(rows, chunk_size=None):
+    """Validate and upsert ``(line_number, row)`` pairs; returns a summary dict.
+
+    A student ID repeated within the file keeps the values of its last row.
+    """
+    chunk_size = chunk_size or getattr(settings, 'STUDENT_IMPORT_CHUNK_SIZE', 1000)
+    summary = {'rows': 0, 'created': 0, 'updated': 0, 'failed': 0, 'errors': []}
+    chunk = {}
+    lines = {}
+
+    def flush():
+        if not chunk:
+            return
+        try:
+            created = db_writer.run(_upsert_chunk, chunk)
+        except DatabaseError as e:
+            for student_id, line in lines.items():
+                _add_error(summary, line, student_id, f'Database error: {e}')
+        else:
+            summary['created'] += created
+            summary['updated'] += len(chunk) - created
+        chunk.clear()
+        lines.clear()
+
+    for line, row in rows:
+        summary['rows'] += 1
+        try:
+            values = clean_row(row)
+        except ValueError as e:
+            student_id = row.get('id') if isinstance(row, dict) else None
+            _add_error(summary, line, student_id, str(e))
+            continue
+
+        student_id = values['student_id']
+        chunk[student_id] = values
+        lines[student_id] = line
+        if len(chunk) >= chunk_size:
+            flush()
+
+    flush()
+    return summary
@@ -0,0 +1,57 @@
+// Service worker of the attendance page, rendered by views.service_worker.
+// The page shell and its assets are precached so the scanner opens offline;
+// API requests always go to the network.
+const CACHE_PREFIX = 'smartattend-';
+const CACHE_NAME = '{{ cache_name }}';
+const PRECACHE = {{ precache|safe }};
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(CACHE_NAME).then(cache => Promise.all(PRECACHE.map(url =>
+            fetch(url).then(response => {
+                if (!response.ok) {
+                    throw new Error(`${url}: ${response.status}`);
+                }
+                return cache.put(url, response);
+            }).catch(error => {
+                // A CDN script that can't be fetched is loaded from the network later
+                if (new URL(url, self.location).origin === self.location.origin) {
+                    throw error;
+                }
+            })
+        ))).then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys().then(names => Promise.all(
+            names.filter(name => name.startsWith(CACHE_PREFIX) && name !== CACHE_NAME).map(name => caches.delete(name))
+        )).then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (request.method !== 'GET' || url.pathname.startsWith('/api/') || url.pathname === '/sw.js') {
+        return;
+    }
+
+    if (request.mode === 'navigate') {
+        // Network first so a new deploy shows up at once; the cached shell when offline
+        event.respondWith(
+            fetch(request).then(response => {
+                if (response.ok && url.pathname === '/') {
+                    const copy = response.clone();
+                    caches.open(CACHE_NAME).then(cache => cache.put('/', copy));
+                }
+                return response;
+            }).catch(() => caches.match('/'))
+        );
+        return;
+    }
+
+    // Hashed assets never change under the same URL
+    event.respondWith(caches.match(request).then(cached => cached || fetch(request)));
+});
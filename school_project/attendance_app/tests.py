@@ -1,3 +1,272 @@
-from django.test import TestCase
+import datetime
+import json
 
-# Create your tests here.
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .models import AttendanceLog, DailyAttendance, DailyStats, Student, Teacher
+from .qr_payload import MAX_ID_LENGTH, SIGNATURE_LENGTH, V2_PREFIX, parse_student_qr, student_qr_data
+from .rate_limit import scan_limiter, upload_limiter
+from .roster_cache import ROSTER_VERSION, RosterCache, invalidate_roster
+from .scan_dedupe import scan_dedupe
+from .versions import bump_version
+
+
+class AttendanceTestCase(TestCase):
+    """Resets the per-process caches that outlive the rolled-back test transaction"""
+
+    def setUp(self):
+        invalidate_roster()
+        scan_dedupe.clear()
+        scan_limiter.clear()
+        upload_limiter.clear()
+
+    def post_json(self, path, payload):
+        return self.client.post(path, json.dumps(payload), content_type='application/json')
+
+
+# ============ QR PAYLOADS ============
+
+class ParseStudentQRTests(SimpleTestCase):
+    def test_signed_payload_round_trips(self):
+        for student_id in ('1', '2024-0001', 'A' * MAX_ID_LENGTH):
+            self.assertEqual(parse_student_qr(student_qr_data(student_id)), student_id)
+
+    def test_forged_signature_is_rejected(self):
+        payload = student_qr_data('2024-0001')
+        last = payload[-1]
+        forged = payload[:-1] + ('0' if last != '0' else '1')
+        self.assertIsNone(parse_student_qr(forged))
+
+    def test_truncated_or_extended_signature_is_rejected(self):
+        payload = student_qr_data('2024-0001')
+        self.assertIsNone(parse_student_qr(payload[:-1]))
+        self.assertIsNone(parse_student_qr(payload + '0'))
+        self.assertIsNone(parse_student_qr(payload.rpartition(':')[0] + ':'))
+        self.assertIsNone(parse_student_qr(payload.rpartition(':')[0]))
+
+    def test_signature_of_another_student_is_rejected(self):
+        signature = student_qr_data('2024-0001').rpartition(':')[2]
+        self.assertIsNone(parse_student_qr(f'{V2_PREFIX}2024-0002:{signature}'))
+
+    def test_signature_under_another_key_is_rejected(self):
+        with override_settings(QR_SIGNING_KEY='another key'):
+            payload = student_qr_data('2024-0001')
+        self.assertIsNone(parse_student_qr(payload))
+
+    def test_ids_longer_than_max_id_length_are_rejected(self):
+        too_long = 'A' * (MAX_ID_LENGTH + 1)
+        self.assertIsNone(parse_student_qr(student_qr_data(too_long)))
+        self.assertIsNone(parse_student_qr(f'STUDENT:{too_long}'))
+        self.assertIsNone(parse_student_qr('1' * (MAX_ID_LENGTH + 1)))
+
+    def test_ids_with_separators_or_non_ascii_are_rejected(self):
+        for student_id in ('a b', 'a:b', 'é1', 'a\tb', ''):
+            self.assertIsNone(parse_student_qr(f'STUDENT:{student_id}'), student_id)
+            self.assertIsNone(parse_student_qr(f'{V2_PREFIX}{student_id}:{"0" * SIGNATURE_LENGTH}'), student_id)
+
+    def test_legacy_and_bare_numeric_payloads(self):
+        self.assertEqual(parse_student_qr('STUDENT:2024-0001'), '2024-0001')
+        self.assertEqual(parse_student_qr('12345'), '12345')
+        self.assertIsNone(parse_student_qr('ABC123'))
+        with override_settings(QR_ACCEPT_LEGACY=False):
+            self.assertIsNone(parse_student_qr('STUDENT:2024-0001'))
+            self.assertIsNone(parse_student_qr('12345'))
+            self.assertEqual(parse_student_qr(student_qr_data('2024-0001')), '2024-0001')
+
+    def test_non_string_payloads_are_rejected(self):
+        for payload in (None, 12345, ['STUDENT:1'], {'id': '1'}):
+            self.assertIsNone(parse_student_qr(payload))
+
+
+class StudentIdValidationTests(AttendanceTestCase):
+    def register(self, student_id):
+        return self.post_json('/api/login/student/', {
+            'id': student_id, 'firstname': 'Ada', 'lastname': 'Lovelace', 'course': 'CS', 'level': '1',
+        })
+
+    def test_registration_refuses_ids_a_badge_cannot_carry(self):
+        for student_id in ('A' * (MAX_ID_LENGTH + 1), 'a b', 'a:b', 'é1'):
+            response = self.register(student_id)
+            self.assertEqual(response.status_code, 400, student_id)
+        self.assertFalse(Student.objects.exists())
+
+    def test_registered_badge_can_be_scanned(self):
+        response = self.register('2024-0001')
+        self.assertEqual(response.status_code, 200)
+        qr_data = response.json()['student']['qr_data']
+        response = self.post_json('/api/attendance/mark/', {'qr_data': qr_data})
+        self.assertEqual(response.json()['status'], 'success')
+
+    def test_teacher_ids_are_not_held_to_the_badge_rule(self):
+        response = self.post_json('/api/login/teacher/', {
+            'id': 'T: 01', 'firstname': 'Grace', 'lastname': 'Hopper', 'subject': 'CS',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Teacher.objects.filter(teacher_id='T: 01').exists())
+
+    def test_import_reports_rows_with_invalid_ids(self):
+        body = 'id,firstname,lastname,course,level\n2024-0001,Ada,Lovelace,CS,1\nbad id,Alan,Turing,CS,1\n'
+        response = self.client.post('/api/students/import/?format=csv', body, content_type='text/csv')
+        summary = response.json()['summary']
+        self.assertEqual((summary['created'], summary['failed']), (1, 1))
+        self.assertEqual(summary['errors'][0]['line'], 3)
+        self.assertEqual(list(Student.objects.values_list('student_id', flat=True)), ['2024-0001'])
+
+
+# ============ ROSTER CACHE ============
+
+class RosterCacheTests(AttendanceTestCase):
+    def setUp(self):
+        super().setUp()
+        Student.objects.create(student_id='R1', first_name='Ada', last_name='Lovelace', course='CS', level='1')
+        Student.objects.create(student_id='R2', first_name='Alan', last_name='Turing', course='CS', level='1',
+                               is_active=False)
+        self.cache = RosterCache(version_check_interval=0)
+        self.assertEqual(self.cache.get_student('R1').student_id, 'R1')
+
+    def test_unknown_and_inactive_ids_are_rejected_without_a_query(self):
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                self.assertIsNone(self.cache.get_student('R2'))
+                self.assertIsNone(self.cache.get_student('NOPE'))
+            self.assertEqual(self.cache.get_student('R1').first_name, 'Ada')
+        self.assertEqual(self.cache.stats()['rejected'], 6)
+
+    def test_students_added_elsewhere_are_found_after_a_version_bump(self):
+        # bulk_create sends no signals, like a registration through another worker before its bump arrives
+        Student.objects.bulk_create([Student(student_id='R3', first_name='Grace', last_name='Hopper',
+                                             course='CS', level='1')])
+        self.assertIsNone(self.cache.get_student('R3'))
+        bump_version(ROSTER_VERSION)
+        self.assertEqual(self.cache.get_student('R3').first_name, 'Grace')
+
+
+# ============ BATCH MARKING ============
+
+class MarkAttendanceBatchTests(AttendanceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.students = [
+            Student.objects.create(student_id=f'B{number}', first_name='Student', last_name=str(number),
+                                   course='CS', level='1')
+            for number in range(3)
+        ]
+        self.teacher = Teacher.objects.create(teacher_id='T1', first_name='Grace', last_name='Hopper', subject='CS')
+
+    def mark(self, scans):
+        response = self.post_json('/api/attendance/mark/batch/', {'scans': scans})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def scan(self, student_id, **extra):
+        return {'qr_data': student_qr_data(student_id), **extra}
+
+    def test_results_follow_the_order_of_the_scans(self):
+        data = self.mark([
+            self.scan('B0', teacher_id='T1'),
+            {'qr_data': 'not a badge'},
+            self.scan('UNKNOWN'),
+            'not an object',
+            self.scan('B1'),
+        ])
+        self.assertEqual([result['index'] for result in data['results']], [0, 1, 2, 3, 4])
+        self.assertEqual([result['status'] for result in data['results']],
+                         ['success', 'error', 'error', 'error', 'success'])
+        self.assertEqual([result.get('code') for result in data['results']], [None, 400, 404, 400, None])
+        self.assertEqual(data['summary'], {'total': 5, 'success': 2, 'warning': 0, 'error': 3})
+        self.assertEqual(data['results'][0]['student']['id'], 'B0')
+
+        today = timezone.now().date()
+        record = DailyAttendance.objects.get(student=self.students[0], date=today)
+        self.assertTrue(record.is_present and record.qr_scanned)
+        self.assertEqual(record.marked_by_teacher, self.teacher)
+        self.assertEqual(AttendanceLog.objects.filter(success=True).count(), 2)
+
+    def test_unknown_and_inactive_students_are_not_marked(self):
+        Student.objects.filter(student_id='B2').update(is_active=False)
+        data = self.mark([self.scan('UNKNOWN'), self.scan('B2')])
+        self.assertEqual([result['code'] for result in data['results']], [404, 404])
+        self.assertIn('UNKNOWN', data['results'][0]['message'])
+        self.assertFalse(DailyAttendance.objects.exists())
+        self.assertFalse(AttendanceLog.objects.exists())
+
+    def test_duplicates_within_one_batch_are_marked_once(self):
+        data = self.mark([self.scan('B0'), self.scan('B0'), self.scan('B1'), self.scan('B0')])
+        self.assertEqual([result['status'] for result in data['results']],
+                         ['success', 'warning', 'success', 'warning'])
+        self.assertEqual(DailyAttendance.objects.filter(is_present=True).count(), 2)
+        self.assertEqual(AttendanceLog.objects.count(), 2)
+
+    def test_students_marked_earlier_get_a_warning(self):
+        self.mark([self.scan('B0')])
+        data = self.mark([self.scan('B0'), self.scan('B1')])
+        self.assertEqual([result['status'] for result in data['results']], ['warning', 'success'])
+        self.assertIn('already marked present today', data['results'][0]['message'])
+        self.assertEqual(data['results'][0]['student']['id'], 'B0')
+
+    def test_absent_rows_are_flipped_to_present(self):
+        today = timezone.now().date()
+        DailyAttendance.objects.create(student=self.students[0], date=today, is_present=False)
+        data = self.mark([self.scan('B0')])
+        self.assertEqual(data['results'][0]['status'], 'success')
+        self.assertEqual(DailyAttendance.objects.filter(student=self.students[0]).count(), 1)
+        self.assertTrue(DailyAttendance.objects.get(student=self.students[0]).is_present)
+
+    def test_absent_rows_report_their_stored_time_marked(self):
+        today = timezone.now().date()
+        DailyAttendance.objects.create(student=self.students[0], date=today, is_present=False)
+        DailyAttendance.objects.filter(student=self.students[0]).update(time_marked=datetime.time(7, 30))
+        data = self.mark([self.scan('B0')])
+        self.assertEqual(data['results'][0]['student']['time_marked'], '07:30:00')
+        self.assertEqual(DailyAttendance.objects.get(student=self.students[0]).time_marked, datetime.time(7, 30))
+
+    def test_scans_marked_by_another_request_are_not_counted_again(self):
+        response = self.post_json('/api/attendance/mark/', {'qr_data': student_qr_data('B0')})
+        self.assertEqual(response.json()['status'], 'success')
+        # A batch that got past the in-memory duplicate check, as one racing the scan above would
+        scan_dedupe.clear()
+        data = self.mark([self.scan('B0'), self.scan('B1')])
+        self.assertEqual([result['status'] for result in data['results']], ['warning', 'success'])
+        self.assertEqual(AttendanceLog.objects.count(), 2)
+        self.assertEqual(DailyStats.objects.get(date=timezone.now().date()).present, 2)
+
+    def test_scanned_at_back_dates_the_mark(self):
+        today = timezone.now().date()
+        day = today - datetime.timedelta(days=3)
+        data = self.mark([
+            self.scan('B0', scanned_at=day.isoformat()),
+            self.scan('B0', scanned_at=f'{day.isoformat()}T08:15:00Z'),
+            self.scan('B0'),
+        ])
+        self.assertEqual([result['status'] for result in data['results']], ['success', 'warning', 'success'])
+        self.assertIn(f'already marked present on {day.isoformat()}', data['results'][1]['message'])
+        self.assertEqual(
+            sorted(DailyAttendance.objects.filter(student=self.students[0]).values_list('date', flat=True)),
+            [day, today],
+        )
+        self.assertEqual(AttendanceLog.objects.get(date=day).student, self.students[0])
+
+    def test_invalid_scanned_at_only_fails_its_scan(self):
+        data = self.mark([self.scan('B0', scanned_at='yesterday'), self.scan('B1')])
+        self.assertEqual([result['status'] for result in data['results']], ['error', 'success'])
+        self.assertEqual(data['results'][0]['code'], 400)
+
+    def test_queries_do_not_grow_with_the_batch(self):
+        # Both batches are all duplicates, the case that once loaded every student again
+        self.mark([self.scan(student.student_id) for student in self.students])
+        scan_dedupe.clear()
+        with CaptureQueriesContext(connection) as small:
+            self.mark([self.scan('B0')])
+        with CaptureQueriesContext(connection) as large:
+            self.mark([self.scan(student.student_id) for student in self.students] * 10)
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+
+    def test_rejects_bodies_that_are_not_a_list_of_scans(self):
+        response = self.post_json('/api/attendance/mark/batch/', {'scans': 'B0'})
+        self.assertEqual(response.status_code, 400)
+        response = self.post_json('/api/attendance/mark/batch/', {'scans': [self.scan('B0')] * 501})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(DailyAttendance.objects.exists())
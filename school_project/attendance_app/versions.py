@@ -0,0 +1,44 @@
+"""Shared version counters used to invalidate per-worker caches.
+
+Counters are per database: each campus shard (see db_routing.py) has its own.
+They only reach other workers through a cache backend those workers share
+(ATTENDANCE_CACHE in settings; checks.py warns under ``check --deploy`` when
+it is per process). incr() is not atomic on every backend, but writers bump
+after their transaction commits, so two bumps that collapse into one still
+change the version after both writes are visible.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .db_routing import current_database
+
+VERSION_KEY_PREFIX = 'attendance_app:version:'
+
+
+def version_key(name):
+    database = current_database()
+    return VERSION_KEY_PREFIX + name if database == DEFAULT_DB_ALIAS else f'{VERSION_KEY_PREFIX}{database}:{name}'
+
+
+def get_version(name):
+    """Return the current version of a resource, shared through Django's cache"""
+    key = version_key(name)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted counter never comes back with an old value
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    """Mark a resource as changed for every worker sharing the cache backend"""
+    key = version_key(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = int(time.time() * 1000)
+        cache.set(key, version, None)
+        return version
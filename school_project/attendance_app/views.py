@@ -1,20 +1,66 @@
-from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
-from django.db import transaction
+from django.db import connections, transaction
+from django.db.models import Exists, OuterRef, Q
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .attendance_export import build_export, export_filename, iter_export
+from .db_routing import (
+    campus_databases, current_database, database_health, database_roles, default_database, read_database,
+    replica_reads,
+)
+from .db_writer import db_writer
+from .events import broker
+from .idempotency import idempotency_store, idempotent
+from .log_archive import read_logs
+from .presence import absent_students, present_records, sparse_presence
 from .models import Student, Teacher, DailyAttendance, AttendanceLog
+from .qr_decode import QRDecoderUnavailable, decode_images
+from .qr_payload import INVALID_ID_MESSAGE, parse_student_qr, student_qr_data, valid_student_id
+from .qr_render import FORMATS as QR_IMAGE_FORMATS, QRGeneratorUnavailable, qr_image
+from .rate_limit import rate_limited, scan_limiter, shed_load, upload_limiter, write_gate
+from .reports import ReportsUnavailable, attendance_report, default_range
+from .response_cache import cache_key, encoded_response, etag_matches, make_etag, not_modified, response_cache
+from .roster_cache import ROSTER_VERSION, roster_cache
+from .scan_dedupe import scan_dedupe
+from .static_assets import index_page, serve_asset, service_worker_page
+from .student_import import guess_format, import_students, read_rows
+from .student_search import search_students
+from . import events, metrics, presence_bitmaps, stats
+import base64
 import json
 import datetime
-import re
+import time
+from collections import Counter
 
 def index(request):
-    return render(request, 'attendance_app/index.html')
+    """The single-page app, rendered once per process (see static_assets.py)"""
+    page = index_page()
+    if etag_matches(request, page.etag):
+        return not_modified(page.etag)
+    return encoded_response(request, page, content_type='text/html; charset=utf-8')
+
+def service_worker(request):
+    """Service worker for the page; served from the root so its scope covers the whole site"""
+    page = service_worker_page()
+    if etag_matches(request, page.etag):
+        return not_modified(page.etag)
+    return encoded_response(request, page, content_type='application/javascript; charset=utf-8')
+
+def static_asset(request, path):
+    """Collected static files, precompressed and with far-future caching for hashed names"""
+    return serve_asset(request, path)
 
 # ============ STUDENT API ENDPOINTS ============
 
+def _record_roster_change(delta):
+    """Adjust today's active total and push the new counts to live dashboards"""
+    stats.record_roster_change(delta)
+    events.publish_statistics(timezone.now().date())
+
 @csrf_exempt
+@shed_load
 def student_login_api(request):
     """Enhanced student registration with auto-DB save and QR generation"""
     if request.method == 'POST':
@@ -27,8 +73,13 @@ def student_login_api(request):
                 if not data.get(field):
                     return JsonResponse({'status': 'error', 'message': f'Missing field: {field}'}, status=400)
             
+            # An ID the badge parser would refuse could never be scanned
+            if not valid_student_id(str(data['id'])):
+                return JsonResponse({'status': 'error', 'message': INVALID_ID_MESSAGE}, status=400)
+            
             # Create or Update the student in the Real DB
-            with transaction.atomic():
+            with transaction.atomic(using=current_database()):
+                was_active = Student.objects.filter(student_id=data['id']).values_list('is_active', flat=True).first()
                 student, created = Student.objects.update_or_create(
                     student_id=data['id'],
                     defaults={
@@ -40,12 +91,16 @@ def student_login_api(request):
                     }
                 )
                 
-                # Create today's attendance record if it doesn't exist
-                today = timezone.now().date()
-                daily_attendance, _ = DailyAttendance.objects.get_or_create(
-                    student=student,
-                    date=today
-                )
+                if not was_active:
+                    _record_roster_change(1)
+                
+                # Dense mode keeps an (absent) attendance row per student per day;
+                # in sparse mode only the first scan creates one
+                if not sparse_presence():
+                    DailyAttendance.objects.get_or_create(
+                        student=student,
+                        date=timezone.now().date()
+                    )
                 
                 action = 'Registered' if created else 'Updated'
                 return JsonResponse({
@@ -68,6 +123,45 @@ def student_login_api(request):
     
     return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
 
+@csrf_exempt
+@shed_load
+def import_students_api(request):
+    """Bulk register/update students from a CSV or JSONL upload.
+    
+    Send the file as multipart field ``file`` or as the raw request body.
+    Columns/keys are the student_login_api fields (id, firstname, lastname,
+    course, level); ``?format=csv|jsonl`` overrides the guess from the file
+    name or content type. Invalid rows are reported and skipped.
+    """
+    if request.method == 'POST':
+        try:
+            upload = request.FILES.get('file') if request.content_type == 'multipart/form-data' else None
+            if upload is not None:
+                source = upload
+                file_format = request.GET.get('format') or guess_format(upload.name, upload.content_type)
+            else:
+                # Read the body as a stream instead of loading it into request.body
+                source = request
+                file_format = request.GET.get('format') or guess_format(content_type=request.content_type)
+            
+            try:
+                summary = import_students(read_rows(source, file_format))
+            except (ValueError, UnicodeDecodeError) as e:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+            
+            imported = summary['created'] + summary['updated']
+            return JsonResponse({
+                'status': 'success' if not summary['failed'] else 'warning',
+                'message': f"Imported {imported} students ({summary['created']} new, {summary['updated']} updated), "
+                           f"{summary['failed']} rows failed",
+                'summary': summary
+            })
+            
+        except Exception as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+    
+    return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
+
 # ============ TEACHER API ENDPOINTS ============
 
 @csrf_exempt
@@ -112,33 +206,195 @@ def teacher_login_api(request):
 
 # ============ STUDENT MANAGEMENT ENDPOINTS ============
 
+MAX_STUDENTS_PAGE_SIZE = 1000
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+STUDENT_STREAM_CHUNK_SIZE = 2000
+
+def _encode_student_cursor(row):
+    """Opaque keyset cursor for the (last_name, first_name, id) ordering"""
+    key = json.dumps([row['last_name'], row['first_name'], row['id']])
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii')
+
+def _decode_student_cursor(cursor):
+    try:
+        last_name, first_name, pk = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(last_name), str(first_name), int(pk)
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError('Invalid cursor')
+
+def _student_row(row):
+    return {
+        'id': row['student_id'],
+        'name': f"{row['first_name']} {row['last_name']}",
+        'course': row['course'],
+        'level': row['level'],
+        'created_at': row['created_at'].isoformat(),
+        'is_present_today': row['is_present_today'],
+        'qr_data': student_qr_data(row['student_id'])
+    }
+
+def _stream_students(rows):
+    """Yield the students payload as JSON chunks so memory stays flat"""
+    yield '{"status": "success", "students": ['
+    total = 0
+    for row in rows:
+        yield (', ' if total else '') + json.dumps(_student_row(row))
+        total += 1
+    yield f'], "total": {total}}}'
+
+def _active_students():
+    """Active students with today's presence, as the rows _student_row() takes"""
+    today = timezone.now().date()
+    return Student.objects.filter(is_active=True).annotate(
+        is_present_today=Exists(DailyAttendance.objects.filter(
+            student=OuterRef('pk'), date=today, is_present=True
+        ))
+    ).values(
+        'id', 'student_id', 'first_name', 'last_name', 'course', 'level',
+        'created_at', 'is_present_today'
+    )
+
+def _students_queryset(request):
+    """Active students with today's presence, ordered and filtered by ``cursor``"""
+    students = _active_students().order_by('last_name', 'first_name', 'id')
+    
+    cursor = request.GET.get('cursor')
+    if cursor:
+        last_name, first_name, pk = _decode_student_cursor(cursor)
+        students = students.filter(
+            Q(last_name__gt=last_name)
+            | Q(last_name=last_name, first_name__gt=first_name)
+            | Q(last_name=last_name, first_name=first_name, id__gt=pk)
+        )
+    return students
+
+def _parse_page_size(request):
+    """Return the requested page size, or None when the full roster was asked for"""
+    page_size = request.GET.get('page_size')
+    if page_size is None:
+        return None
+    try:
+        page_size = int(page_size)
+    except ValueError:
+        page_size = 0
+    if not 0 < page_size <= MAX_STUDENTS_PAGE_SIZE:
+        raise ValueError(f'page_size must be between 1 and {MAX_STUDENTS_PAGE_SIZE}')
+    return page_size
+
+def _students_etag():
+    # is_present_today depends on the date and on the day's attendance
+    return make_etag('students', ROSTER_VERSION, stats.ATTENDANCE_VERSION, extra=[timezone.now().date()])
+
+def _students_page(rows, page_size):
+    """Payload for one keyset page; ``rows`` holds up to page_size + 1 rows"""
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    return {
+        'status': 'success',
+        'students': [_student_row(row) for row in rows],
+        'total': len(rows),
+        'next_cursor': _encode_student_cursor(rows[-1]) if has_more else None
+    }
+
 @csrf_exempt
+@replica_reads
 def get_students_api(request):
-    """Get all students for teacher management"""
+    """Get active students for teacher management.
+    
+    Query parameters:
+      page_size -- return at most this many students plus a ``next_cursor``
+      cursor    -- continue after the page that returned this cursor
+      stream=1  -- stream the whole roster instead of building it in memory
+    
+    Responses carry an ETag; If-None-Match gets a 304 while nothing changed.
+    """
     if request.method == 'GET':
         try:
-            students = Student.objects.filter(is_active=True).order_by('last_name', 'first_name')
-            students_data = []
+            try:
+                students = _students_queryset(request)
+                page_size = _parse_page_size(request)
+            except ValueError as e:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
             
-            for student in students:
-                # Get today's attendance status
-                today = timezone.now().date()
-                daily_attendance = DailyAttendance.objects.filter(student=student, date=today).first()
-                
-                students_data.append({
-                    'id': student.student_id,
-                    'name': student.get_full_name(),
-                    'course': student.course,
-                    'level': student.level,
-                    'created_at': student.created_at.isoformat(),
-                    'is_present_today': daily_attendance.is_present if daily_attendance else False
-                })
+            etag = _students_etag()
+            if etag_matches(request, etag):
+                return not_modified(etag)
             
-            return JsonResponse({
-                'status': 'success',
-                'students': students_data,
-                'total': len(students_data)
-            })
+            if request.GET.get('stream') in ('1', 'true'):
+                # Pinned now: the stream is read after the view (and replica_reads) has returned
+                rows = students.using(read_database()).iterator(chunk_size=STUDENT_STREAM_CHUNK_SIZE)
+                response = StreamingHttpResponse(
+                    _stream_students(rows),
+                    content_type='application/json'
+                )
+                response['ETag'] = etag
+                return response
+            
+            key = cache_key(request, etag)
+            entry = response_cache.get(key)
+            if entry is None:
+                if page_size is None:
+                    students_data = [_student_row(row) for row in students]
+                    payload = {
+                        'status': 'success',
+                        'students': students_data,
+                        'total': len(students_data)
+                    }
+                else:
+                    # Fetch one extra row to know whether another page exists
+                    payload = _students_page(list(students[:page_size + 1]), page_size)
+                entry = response_cache.set(key, etag, payload)
+            
+            return encoded_response(request, entry)
+            
+        except Exception as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+    
+    return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
+
+@csrf_exempt
+@replica_reads
+def search_students_api(request):
+    """Autocomplete for the management tab: active students matching ``q``, best match first.
+    
+    Every word of ``q`` must prefix-match the student ID, first name, last name
+    or course (see student_search.py). ``limit`` caps the results (default
+    20). Responses carry an ETag and are cached like the roster.
+    """
+    if request.method == 'GET':
+        try:
+            query = request.GET.get('q', '')
+            try:
+                limit = int(request.GET.get('limit') or DEFAULT_SEARCH_LIMIT)
+            except ValueError:
+                limit = 0
+            if not 0 < limit <= MAX_SEARCH_LIMIT:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': f'limit must be between 1 and {MAX_SEARCH_LIMIT}'
+                }, status=400)
+            
+            etag = _students_etag()
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            
+            key = cache_key(request, etag)
+            entry = response_cache.get(key)
+            if entry is None:
+                database = read_database()
+                pks = search_students(query, limit, database)
+                rows = {row['id']: row for row in _active_students().using(database).filter(id__in=pks)}
+                students_data = [_student_row(rows[pk]) for pk in pks if pk in rows]
+                payload = {
+                    'status': 'success',
+                    'query': query,
+                    'students': students_data,
+                    'total': len(students_data)
+                }
+                entry = response_cache.set(key, etag, payload)
+            
+            return encoded_response(request, entry)
             
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
@@ -167,10 +423,14 @@ def update_student_api(request):
                 student.course = data['course']
             if 'level' in data:
                 student.level = data['level']
+            was_active = student.is_active
             if 'is_active' in data:
                 student.is_active = data['is_active']
             
-            student.save()
+            with transaction.atomic(using=current_database()):
+                student.save()
+                if student.is_active != was_active:
+                    _record_roster_change(1 if student.is_active else -1)
             
             return JsonResponse({
                 'status': 'success',
@@ -202,8 +462,13 @@ def delete_student_api(request):
                 return JsonResponse({'status': 'error', 'message': 'Student ID is required'}, status=400)
             
             student = get_object_or_404(Student, student_id=student_id)
+            was_active = student.is_active
             student.is_active = False
-            student.save()
+            with transaction.atomic(using=current_database()):
+                # After the save: a stats row created by the change counts the table as it is then
+                student.save()
+                if was_active:
+                    _record_roster_change(-1)
             
             return JsonResponse({
                 'status': 'success',
@@ -217,27 +482,112 @@ def delete_student_api(request):
     
     return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
 
+@csrf_exempt
+def student_qr_image_api(request):
+    """Badge QR code of an active student as PNG or SVG (?id=&format=png|svg&scale=)"""
+    if request.method == 'GET':
+        try:
+            student_id = request.GET.get('id', '')
+            image_format = request.GET.get('format', 'png')
+            try:
+                scale = int(request.GET.get('scale', 8))
+            except ValueError:
+                return JsonResponse({'status': 'error', 'message': 'scale must be an integer'}, status=400)
+            if image_format not in QR_IMAGE_FORMATS:
+                return JsonResponse({'status': 'error', 'message': 'format must be png or svg'}, status=400)
+            
+            student = roster_cache.get_student(student_id) if student_id else None
+            if student is None:
+                return JsonResponse({'status': 'error', 'message': 'Student not found'}, status=404)
+            
+            try:
+                key, image = qr_image(student_qr_data(student.student_id), image_format, scale)
+            except ValueError as e:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+            except QRGeneratorUnavailable as e:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=501)
+            
+            # The key hashes the payload, so the same URL only changes with the student's ID or signing key
+            etag = f'"{key}"'
+            response = HttpResponseNotModified() if etag_matches(request, etag) else HttpResponse(
+                image, content_type=QR_IMAGE_FORMATS[image_format]
+            )
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, max-age=86400'
+            return response
+            
+        except Exception as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+    
+    return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
+
 # ============ ATTENDANCE ENDPOINTS ============
 
 def extract_student_id_from_qr(qr_data):
-    """Extract student ID from QR code data"""
-    if not qr_data:
-        return None
-    
-    # Try to extract from "STUDENT:ID" format
-    if qr_data.startswith('STUDENT:'):
-        return qr_data.split('STUDENT:')[1]
-    
-    # Try to extract numeric ID directly
-    numeric_match = re.search(r'\d+', qr_data)
-    if numeric_match:
-        return numeric_match.group()
+    """Extract student ID from QR code data (None for malformed or forged codes, see qr_payload.py)"""
+    return parse_student_qr(qr_data)
+
+def _student_summary(student, time_marked):
+    """Student block returned by the attendance marking endpoints"""
+    return {
+        'name': student.get_full_name(),
+        'id': student.student_id,
+        'course_level': f"{student.course} - Year {student.level}",
+        'time_marked': time_marked.strftime('%H:%M:%S')
+    }
+
+def _already_present(student, time_marked):
+    return JsonResponse({
+        'status': 'warning',
+        'message': f'{student.get_full_name()} is already marked present today.',
+        'student': _student_summary(student, time_marked)
+    })
+
+def _record_scan(student, teacher_pk, today, qr_data):
+    """Mark a scanned student present; returns (marked, daily_attendance).
     
-    return None
+    ``marked`` is False when the student was already present. Only an absent
+    row is flipped to present, so concurrent scans of the same badge cannot
+    both report success.
 
-@csrf_exempt
-def mark_attendance_api(request):
-    """Enhanced attendance marking with QR scanning"""
+    The transaction writes before it reads: SQLite takes the write lock on the
+    first write, and a transaction that already holds a read lock gets
+    "database is locked" at once instead of waiting out the busy timeout.
+    """
+    with transaction.atomic(using=current_database()):
+        flipped = DailyAttendance.objects.filter(
+            student_id=student.pk, date=today, is_present=False
+        ).update(is_present=True, marked_by_teacher_id=teacher_pk, qr_scanned=True)
+        if flipped:
+            daily_attendance, marked = DailyAttendance.objects.get(student_id=student.pk, date=today), True
+        else:
+            daily_attendance, marked = DailyAttendance.objects.get_or_create(
+                student_id=student.pk,
+                date=today,
+                defaults={'is_present': True, 'marked_by_teacher_id': teacher_pk, 'qr_scanned': True}
+            )
+
+        if marked:
+            AttendanceLog.objects.create(
+                student_id=student.pk,
+                teacher_id=teacher_pk,
+                date=today,
+                method='QR_SCAN',
+                qr_data=qr_data,
+                success=True,
+                message='Attendance marked via QR scan'
+            )
+            stats.record_marks(today, qr=1)
+            presence_bitmaps.record_present(today, [(student.pk, student.course)])
+            events.publish_marks(today, [(student, daily_attendance)])
+    return marked, daily_attendance
+
+def _mark_attendance(request):
+    """mark_attendance_api without its rate limit, idempotency and load shedding.
+    
+    Other views that accept a scan call this, so one request is only
+    throttled (and holds a write slot) once.
+    """
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
@@ -248,85 +598,56 @@ def mark_attendance_api(request):
             student_id = extract_student_id_from_qr(qr_data)
             
             if not student_id:
+                metrics.record_scan('invalid_qr')
                 return JsonResponse({
                     'status': 'error', 
                     'message': 'Invalid QR code format. Expected STUDENT:ID format.'
                 }, status=400)
             
-            # Find the student
-            try:
-                student = Student.objects.get(student_id=student_id, is_active=True)
-            except Student.DoesNotExist:
+            # Find the student (unknown or inactive IDs are rejected without a query)
+            student = roster_cache.get_student(student_id)
+            if student is None:
+                metrics.record_scan('unknown_student')
                 return JsonResponse({
                     'status': 'error', 
                     'message': f'Student ID {student_id} not found in database.'
                 }, status=404)
             
-            # Get or create teacher
-            teacher = None
-            if teacher_id:
-                try:
-                    teacher = Teacher.objects.get(teacher_id=teacher_id, is_active=True)
-                except Teacher.DoesNotExist:
-                    pass
-            
             # Get today's date
             today = timezone.now().date()
             
-            # Get or create daily attendance record
-            daily_attendance, created = DailyAttendance.objects.get_or_create(
-                student=student,
-                date=today,
-                defaults={'marked_by_teacher': teacher, 'qr_scanned': True}
-            )
+            # Repeat scans of a badge already marked present are answered from memory
+            time_marked = scan_dedupe.get(student.pk, today)
+            if time_marked is not None:
+                metrics.record_scan('duplicate')
+                return _already_present(student, time_marked)
             
-            # Check if already marked present
-            if daily_attendance.is_present:
-                return JsonResponse({
-                    'status': 'warning',
-                    'message': f'{student.get_full_name()} is already marked present today.',
-                    'student': {
-                        'name': student.get_full_name(),
-                        'id': student.student_id,
-                        'course_level': f"{student.course} - Year {student.level}",
-                        'time_marked': daily_attendance.time_marked.strftime('%H:%M:%S')
-                    }
-                })
+            # Look up the teacher
+            teacher_pk = roster_cache.get_teacher_pk(teacher_id) if teacher_id else None
             
-            # Mark as present
-            daily_attendance.is_present = True
-            daily_attendance.marked_by_teacher = teacher
-            daily_attendance.qr_scanned = True
-            daily_attendance.save()
+            # Mark present (through the single writer when it is enabled)
+            marked, daily_attendance = db_writer.run(_record_scan, student, teacher_pk, today, qr_data)
+            scan_dedupe.add(student.pk, today, daily_attendance.time_marked)
             
-            # Log the attendance
-            AttendanceLog.objects.create(
-                student=student,
-                teacher=teacher,
-                date=today,
-                method='QR_SCAN',
-                qr_data=qr_data,
-                success=True,
-                message='Attendance marked via QR scan'
-            )
+            # Check if already marked present
+            if not marked:
+                metrics.record_scan('duplicate')
+                return _already_present(student, daily_attendance.time_marked)
             
+            metrics.record_scan('marked')
             return JsonResponse({
                 'status': 'success',
                 'message': f'✅ {student.get_full_name()} marked present!',
-                'student': {
-                    'name': student.get_full_name(),
-                    'id': student.student_id,
-                    'course_level': f"{student.course} - Year {student.level}",
-                    'time_marked': daily_attendance.time_marked.strftime('%H:%M:%S')
-                }
+                'student': _student_summary(student, daily_attendance.time_marked)
             })
             
         except Exception as e:
+            metrics.record_scan('error')
             # Log the failed attempt
             try:
                 if 'student' in locals() and student:
                     AttendanceLog.objects.create(
-                        student=student,
+                        student_id=student.pk,
                         date=timezone.now().date(),
                         method='QR_SCAN',
                         qr_data=data.get('qr_data', ''),
@@ -341,39 +662,372 @@ def mark_attendance_api(request):
     return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
 
 @csrf_exempt
+@rate_limited(scan_limiter)
+@idempotent
+@shed_load
+def mark_attendance_api(request):
+    """Enhanced attendance marking with QR scanning"""
+    return _mark_attendance(request)
+
+MAX_BATCH_SCANS = 500
+
+def _parse_scan_date(scanned_at):
+    """Return the attendance date for a buffered scan timestamp (defaults to today)"""
+    if not scanned_at:
+        return timezone.now().date()
+    
+    scanned = parse_datetime(str(scanned_at))
+    if scanned is None:
+        scanned_date = parse_date(str(scanned_at))
+        if scanned_date is None:
+            raise ValueError(f'Invalid scanned_at value: {scanned_at}')
+        return scanned_date
+    
+    if timezone.is_naive(scanned):
+        scanned = timezone.make_aware(scanned)
+    return scanned.astimezone(datetime.timezone.utc).date()
+
+def _count_scan_results(results):
+    """Add a batch's results to the scan counters mark_attendance_api keeps"""
+    for result, count in Counter(
+        'marked' if item['status'] == 'success'
+        else 'duplicate' if item['status'] == 'warning'
+        else 'unknown_student' if item.get('code') == 404
+        else 'invalid_qr'
+        for item in results
+    ).items():
+        metrics.record_scan(result, count)
+    return results
+
+def _mark_scans(scans, method='QR_SCAN'):
+    """Mark a batch of scans with one lookup per table and bulk writes.
+    
+    Returns one result per scan, in order, with the same success/warning/error
+    semantics as mark_attendance_api.
+    """
+    results = [None] * len(scans)
+    parsed = []
+    
+    for index, scan in enumerate(scans):
+        if not isinstance(scan, dict):
+            results[index] = {'index': index, 'status': 'error', 'code': 400,
+                              'message': 'Each scan must be an object.'}
+            continue
+        
+        qr_data = scan.get('qr_data', '')
+        student_id = extract_student_id_from_qr(qr_data)
+        if not student_id:
+            results[index] = {'index': index, 'status': 'error', 'code': 400,
+                              'message': 'Invalid QR code format. Expected STUDENT:ID format.'}
+            continue
+        
+        try:
+            scan_date = _parse_scan_date(scan.get('scanned_at'))
+        except ValueError as e:
+            results[index] = {'index': index, 'status': 'error', 'code': 400, 'message': str(e)}
+            continue
+        
+        parsed.append((index, qr_data, student_id, scan.get('teacher_id', ''), scan_date))
+    
+    if not parsed:
+        return _count_scan_results(results)
+    
+    # One IN query per table for the whole batch
+    students = {
+        student.student_id: student
+        for student in Student.objects.filter(
+            student_id__in={item[2] for item in parsed}, is_active=True
+        )
+    }
+    teacher_ids = {item[3] for item in parsed if item[3]}
+    teachers = {
+        teacher.teacher_id: teacher
+        for teacher in Teacher.objects.filter(teacher_id__in=teacher_ids, is_active=True)
+    } if teacher_ids else {}
+    
+    marks = []
+    for index, qr_data, student_id, teacher_id, scan_date in parsed:
+        student = students.get(student_id)
+        if student is None:
+            results[index] = {'index': index, 'status': 'error', 'code': 404,
+                              'message': f'Student ID {student_id} not found in database.'}
+            continue
+        marks.append((index, qr_data, student, teachers.get(teacher_id), scan_date))
+    
+    if not marks:
+        return _count_scan_results(results)
+    
+    today = timezone.now().date()
+    marked = {}
+    logs = []
+    with transaction.atomic(using=current_database()):
+        # Write first, like _record_scan: rows that don't exist yet are inserted
+        # absent, which takes SQLite's write lock before anything is read. The
+        # read below then sees every row of the batch as it stands and, on
+        # backends with row locks, holds them until the flips are committed,
+        # so a badge scanned by two requests at once is only marked by one.
+        placeholders = {
+            (student.pk, scan_date): DailyAttendance(student=student, date=scan_date, is_present=False)
+            for _, _, student, _, scan_date in marks
+        }
+        DailyAttendance.objects.bulk_create(list(placeholders.values()), ignore_conflicts=True)
+        existing = {
+            (record.student_id, record.date): record
+            for record in DailyAttendance.objects.select_for_update().filter(
+                student__in={student.pk for _, _, student, _, _ in marks},
+                date__in={scan_date for *_, scan_date in marks},
+            )
+        }
+        
+        for index, qr_data, student, teacher, scan_date in marks:
+            key = (student.pk, scan_date)
+            record = existing[key]
+            # The student loaded above; record.student would be one more query per scan
+            record.student = student
+            if record.is_present:
+                day = 'today' if scan_date == today else f'on {scan_date.isoformat()}'
+                results[index] = {
+                    'index': index,
+                    'status': 'warning',
+                    'message': f'{student.get_full_name()} is already marked present {day}.',
+                    'record': record,
+                }
+                continue
+            
+            record.is_present = True
+            record.marked_by_teacher = teacher
+            record.qr_scanned = True
+            marked[key] = record
+            logs.append(AttendanceLog(
+                student=student,
+                teacher=teacher,
+                date=scan_date,
+                method=method,
+                qr_data=qr_data,
+                success=True,
+                message='Attendance marked via QR scan'
+            ))
+            results[index] = {
+                'index': index,
+                'status': 'success',
+                'message': f'✅ {student.get_full_name()} marked present!',
+                'record': record,
+            }
+        
+        if marked:
+            # time_marked is left alone, so rows that were absent keep the time they were created
+            DailyAttendance.objects.bulk_update(
+                list(marked.values()), ['is_present', 'marked_by_teacher', 'qr_scanned']
+            )
+        if logs:
+            AttendanceLog.objects.bulk_create(logs)
+        for scan_date, count in Counter(date for _, date in marked).items():
+            records = [record for record in marked.values() if record.date == scan_date]
+            stats.record_marks(scan_date, qr=count)
+            presence_bitmaps.record_present(scan_date, [(record.student.pk, record.student.course) for record in records])
+            events.publish_marks(scan_date, [(record.student, record) for record in records])
+    
+    for result in results:
+        if 'record' in result:
+            record = result.pop('record')
+            result['student'] = _student_summary(record.student, record.time_marked)
+            scan_dedupe.add(record.student_id, record.date, record.time_marked)
+    
+    return _count_scan_results(results)
+
+@csrf_exempt
+@rate_limited(scan_limiter)
+@idempotent
+@shed_load
+def mark_attendance_batch_api(request):
+    """Mark attendance for a burst of buffered scans in a single request"""
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            scans = data.get('scans') if isinstance(data, dict) else data
+            
+            if not isinstance(scans, list):
+                return JsonResponse({'status': 'error', 'message': 'Expected a list of scans'}, status=400)
+            
+            if len(scans) > MAX_BATCH_SCANS:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': f'Too many scans in one batch (max {MAX_BATCH_SCANS}).'
+                }, status=400)
+            
+            results = db_writer.run(_mark_scans, scans)
+            
+            return JsonResponse({
+                'status': 'success',
+                'results': results,
+                'summary': {
+                    'total': len(results),
+                    'success': sum(1 for result in results if result['status'] == 'success'),
+                    'warning': sum(1 for result in results if result['status'] == 'warning'),
+                    'error': sum(1 for result in results if result['status'] == 'error'),
+                }
+            })
+            
+        except json.JSONDecodeError:
+            return JsonResponse({'status': 'error', 'message': 'Invalid JSON data'}, status=400)
+        except Exception as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+    
+    return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
+
+def _daily_record(record):
+    return {
+        'student_id': record.student.student_id,
+        'student_name': record.student.get_full_name(),
+        'course_level': f"{record.student.course} - Year {record.student.level}",
+        'is_present': record.is_present,
+        'time_marked': record.time_marked.strftime('%H:%M:%S'),
+        'method': 'QR Scan' if record.qr_scanned else 'Manual'
+    }
+
+def _absent_record(student):
+    """Record for an active student with no presence today (absence is not stored)"""
+    return {
+        'student_id': student.student_id,
+        'student_name': student.get_full_name(),
+        'course_level': f"{student.course} - Year {student.level}",
+        'is_present': False,
+        'time_marked': None,
+        'method': None
+    }
+
+def _daily_payload(today, records, daily_stats):
+    return {
+        'status': 'success',
+        'date': today.isoformat(),
+        'records': records,
+        'statistics': stats.summarize(daily_stats)
+    }
+
+def _daily_etag(today):
+    # Records include student names and the totals include the roster size
+    return make_etag('daily', stats.ATTENDANCE_VERSION, ROSTER_VERSION, extra=[today])
+
+@csrf_exempt
+@replica_reads
 def get_daily_attendance_api(request):
-    """Get today's attendance records"""
+    """Get today's attendance records (ETag/If-None-Match aware)"""
     if request.method == 'GET':
         try:
             today = timezone.now().date()
-            attendance_records = DailyAttendance.objects.filter(date=today).select_related('student')
-            
-            records = []
-            for record in attendance_records:
-                records.append({
-                    'student_id': record.student.student_id,
-                    'student_name': record.student.get_full_name(),
-                    'course_level': f"{record.student.course} - Year {record.student.level}",
-                    'is_present': record.is_present,
-                    'time_marked': record.time_marked.strftime('%H:%M:%S'),
-                    'method': 'QR Scan' if record.qr_scanned else 'Manual'
-                })
+            etag = _daily_etag(today)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            
+            key = cache_key(request, etag)
+            entry = response_cache.get(key)
+            if entry is None:
+                # Present rows, then everyone else on the active roster
+                records = [_daily_record(record) for record in present_records(today)]
+                records += [_absent_record(student) for student in absent_students(today)]
+                
+                # Get statistics (single-row read, maintained by each change)
+                daily_stats = stats.get_daily_stats(today)
+                
+                entry = response_cache.set(key, etag, _daily_payload(today, records, daily_stats))
+            
+            return encoded_response(request, entry)
+            
+        except Exception as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+    
+    return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
+
+@csrf_exempt
+def attendance_stream_api(request):
+    """Live attendance feed; only available through the ASGI server (see async_views)"""
+    return JsonResponse({
+        'status': 'error',
+        'message': 'The live attendance feed requires the ASGI server (uvicorn school_project.asgi:application).'
+    }, status=501)
+
+def _export_request(request):
+    """Parse the export query parameters; returns (build_export result, filename, content type)"""
+    today = timezone.now().date()
+    start = parse_date(request.GET.get('start', '') or today.isoformat())
+    end = parse_date(request.GET.get('end', '') or (start or today).isoformat())
+    if start is None or end is None:
+        raise ValueError('start and end must be dates (YYYY-MM-DD)')
+    
+    source = request.GET.get('source', 'daily')
+    file_format = request.GET.get('format', 'csv')
+    compress = request.GET.get('gzip') in ('1', 'true')
+    export = build_export(
+        source, start, end,
+        course=request.GET.get('course'), level=request.GET.get('level'),
+        format=file_format, compress=compress,
+    )
+    
+    if compress:
+        content_type = 'application/gzip'
+    else:
+        content_type = 'text/csv' if file_format == 'csv' else 'application/x-ndjson'
+    return export, export_filename(source, start, end, file_format, compress), content_type
+
+@csrf_exempt
+def export_attendance_api(request):
+    """Stream attendance history as a CSV/JSONL download.
+    
+    Query parameters:
+      start, end    -- date range (YYYY-MM-DD), both default to today
+      course, level -- only students in this course / year level
+      source        -- ``daily`` (one row per student per day) or ``log`` (every scan)
+      format        -- ``csv`` or ``jsonl``
+      gzip=1        -- compress on the fly (.gz download)
+    """
+    if request.method == 'GET':
+        try:
+            try:
+                export, filename, content_type = _export_request(request)
+            except ValueError as e:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
             
-            # Get statistics
-            total_students = Student.objects.filter(is_active=True).count()
-            present_count = sum(1 for record in records if record['is_present'])
-            absent_count = total_students - present_count
+            response = StreamingHttpResponse(iter_export(*export), content_type=content_type)
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
+            
+        except Exception as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+    
+    return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
+
+MAX_LOGS_LIMIT = 1000
+
+@csrf_exempt
+def attendance_logs_api(request):
+    """Scan log entries, including months moved to the archive.
+    
+    Query parameters: start, end (YYYY-MM-DD, default the last 30 days),
+    student_id, limit (default 100). Newest first; archived entries are
+    flagged with ``archived``.
+    """
+    if request.method == 'GET':
+        try:
+            today = timezone.now().date()
+            try:
+                end = parse_date(request.GET['end']) if request.GET.get('end') else today
+                if end is None:
+                    raise ValueError('end must be a date (YYYY-MM-DD)')
+                start = parse_date(request.GET['start']) if request.GET.get('start') else end - datetime.timedelta(days=29)
+                if start is None:
+                    raise ValueError('start must be a date (YYYY-MM-DD)')
+                limit = int(request.GET.get('limit', 100))
+                if not 0 < limit <= MAX_LOGS_LIMIT:
+                    raise ValueError(f'limit must be between 1 and {MAX_LOGS_LIMIT}')
+            except ValueError as e:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
             
+            logs = read_logs(start, end, student_id=request.GET.get('student_id'), limit=limit)
             return JsonResponse({
                 'status': 'success',
-                'date': today.isoformat(),
-                'records': records,
-                'statistics': {
-                    'total_students': total_students,
-                    'present': present_count,
-                    'absent': absent_count,
-                    'attendance_rate': round((present_count / total_students * 100) if total_students > 0 else 0, 2)
-                }
+                'logs': logs,
+                'total': len(logs),
+                'archived': sum(1 for log in logs if log['archived'])
             })
             
         except Exception as e:
@@ -381,40 +1035,256 @@ def get_daily_attendance_api(request):
     
     return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
 
+MAX_UPLOAD_IMAGES = 10
+MAX_UPLOAD_IMAGE_SIZE = 5 * 1024 * 1024
+
 @csrf_exempt
+@rate_limited(upload_limiter)
+@shed_load
 def upload_qr_image_api(request):
-    """Upload and process QR image for attendance - This is now handled client-side by jsQR"""
+    """Decode uploaded QR images server-side and mark attendance for every code found.
+    
+    Accepts multipart uploads (``images``/``image`` files plus ``teacher_id``).
+    JSON bodies with already-decoded ``qr_data`` are still accepted for clients
+    that decode in the browser.
+    """
     if request.method == 'POST':
         try:
-            # Debug logging
-            print(f"[DEBUG] upload_qr_image_api called with method: {request.method}")
-            print(f"[DEBUG] Content-Type: {request.META.get('CONTENT_TYPE', 'Not set')}")
-            print(f"[DEBUG] Request body: {request.body}")
+            if not request.content_type.startswith('multipart/form-data'):
+                data = json.loads(request.body)
+                if not data.get('qr_data'):
+                    return JsonResponse({'status': 'error', 'message': 'No QR data provided. Please ensure the image contains a valid QR code.'}, status=400)
+                return _mark_attendance(request)
             
-            data = json.loads(request.body)
-            qr_data = data.get('qr_data', '')
-            teacher_id = data.get('teacher_id', '')
+            uploads = request.FILES.getlist('images') + request.FILES.getlist('image')
+            teacher_id = request.POST.get('teacher_id', '')
+            
+            if not uploads:
+                return JsonResponse({'status': 'error', 'message': 'No image uploaded.'}, status=400)
+            if len(uploads) > MAX_UPLOAD_IMAGES:
+                return JsonResponse({'status': 'error', 'message': f'Too many images (max {MAX_UPLOAD_IMAGES}).'}, status=400)
+            for upload in uploads:
+                if upload.size > MAX_UPLOAD_IMAGE_SIZE:
+                    return JsonResponse({'status': 'error', 'message': f'{upload.name} is larger than 5MB.'}, status=400)
             
-            print(f"[DEBUG] Parsed data - qr_data: {qr_data}, teacher_id: {teacher_id}")
+            images = []
+            read_times = []
+            for upload in uploads:
+                start = time.perf_counter()
+                images.append(upload.read())
+                read_times.append(round((time.perf_counter() - start) * 1000, 2))
             
-            if not qr_data:
-                return JsonResponse({'status': 'error', 'message': 'No QR data provided. Please ensure the image contains a valid QR code.'}, status=400)
+            try:
+                decoded = decode_images(images)
+            except QRDecoderUnavailable as e:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=501)
+            
+            # Mark every decoded code in one transaction
+            scans = [
+                {'qr_data': code, 'teacher_id': teacher_id}
+                for result in decoded for code in result['codes']
+            ]
+            start = time.perf_counter()
+            scan_results = db_writer.run(_mark_scans, scans) if scans else []
+            mark_ms = round((time.perf_counter() - start) * 1000, 2)
+            
+            image_results = []
+            offset = 0
+            for upload, read_ms, result in zip(uploads, read_times, decoded):
+                count = len(result['codes'])
+                image_result = {
+                    'name': upload.name,
+                    'codes': result['codes'],
+                    'results': scan_results[offset:offset + count],
+                    'timings': {'read_ms': read_ms, **result['timings']},
+                }
+                if 'error' in result:
+                    image_result['error'] = result['error']
+                image_results.append(image_result)
+                offset += count
             
-            # Create a mock request object for the mark_attendance_api
-            class MockRequest:
-                def __init__(self, qr_data, teacher_id):
-                    self.method = 'POST'
-                    self.body = json.dumps({'qr_data': qr_data, 'teacher_id': teacher_id}).encode('utf-8')
+            if not scans:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'No QR code found in the uploaded image.',
+                    'images': image_results
+                }, status=400)
             
-            mock_request = MockRequest(qr_data, teacher_id)
-            return mark_attendance_api(mock_request)
+            return JsonResponse({
+                'status': 'success',
+                'results': scan_results,
+                'images': image_results,
+                'timings': {'mark_ms': mark_ms}
+            })
             
-        except json.JSONDecodeError as e:
-            print(f"[ERROR] JSON Decode Error: {str(e)}")
-            print(f"[ERROR] Raw body content: {request.body}")
+        except json.JSONDecodeError:
             return JsonResponse({'status': 'error', 'message': 'Invalid JSON data'}, status=400)
         except Exception as e:
-            print(f"[ERROR] General Error: {str(e)}")
             return JsonResponse({'status': 'error', 'message': f'Error processing QR image: {str(e)}'}, status=500)
     
-    return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
\ No newline at end of file
+    return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
+
+# ============ REPORT ENDPOINTS ============
+
+MAX_REPORT_DAYS = 366
+
+@csrf_exempt
+@replica_reads
+def attendance_report_api(request):
+    """Attendance analytics for a date range (defaults to the last 90 days).
+    
+    Query parameters: start, end (YYYY-MM-DD), course, level, and matrix=1 to
+    include the student x day presence matrix. Responses are cached per ETag.
+    """
+    if request.method == 'GET':
+        try:
+            today = timezone.now().date()
+            start, end = default_range(today)
+            try:
+                if request.GET.get('end'):
+                    end = parse_date(request.GET['end'])
+                if request.GET.get('start'):
+                    start = parse_date(request.GET['start'])
+                if start is None or end is None:
+                    raise ValueError('start and end must be dates (YYYY-MM-DD)')
+            except ValueError as e:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+            
+            if end < start or (end - start).days >= MAX_REPORT_DAYS:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': f'end must be on or after start and the range at most {MAX_REPORT_DAYS} days'
+                }, status=400)
+            
+            # The default range moves with the date
+            etag = make_etag('report', stats.ATTENDANCE_VERSION, ROSTER_VERSION, extra=[today])
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            
+            key = cache_key(request, etag)
+            entry = response_cache.get(key)
+            if entry is None:
+                try:
+                    payload = attendance_report(
+                        start, end,
+                        course=request.GET.get('course'), level=request.GET.get('level'),
+                        include_matrix=request.GET.get('matrix') in ('1', 'true'),
+                    )
+                except ReportsUnavailable as e:
+                    return JsonResponse({'status': 'error', 'message': str(e)}, status=501)
+                entry = response_cache.set(key, etag, payload)
+            
+            return encoded_response(request, entry)
+            
+        except Exception as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+    
+    return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
+
+@csrf_exempt
+@replica_reads
+def presence_query_api(request):
+    """Range counts, absence streaks and cohort comparisons from the presence bitmaps.
+    
+    Query parameters: start, end (YYYY-MM-DD, default the last 90 days), course,
+    compare=COURSE,COURSE for side-by-side cohorts, and absent_streak=N to list
+    students absent on N consecutive school days. Responses are cached per ETag.
+    """
+    if request.method == 'GET':
+        try:
+            today = timezone.now().date()
+            start, end = default_range(today)
+            try:
+                if request.GET.get('end'):
+                    end = parse_date(request.GET['end'])
+                if request.GET.get('start'):
+                    start = parse_date(request.GET['start'])
+                if start is None or end is None:
+                    raise ValueError('start and end must be dates (YYYY-MM-DD)')
+                absent_streak = request.GET.get('absent_streak')
+                absent_streak = int(absent_streak) if absent_streak else None
+                if absent_streak is not None and not 1 <= absent_streak <= presence_bitmaps.MAX_ABSENT_STREAK:
+                    raise ValueError(f'absent_streak must be between 1 and {presence_bitmaps.MAX_ABSENT_STREAK}')
+            except ValueError as e:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+            
+            if end < start or (end - start).days >= MAX_REPORT_DAYS:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': f'end must be on or after start and the range at most {MAX_REPORT_DAYS} days'
+                }, status=400)
+            
+            etag = make_etag('presence', stats.ATTENDANCE_VERSION, ROSTER_VERSION, extra=[today])
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            
+            key = cache_key(request, etag)
+            entry = response_cache.get(key)
+            if entry is None:
+                compare = [name for name in request.GET.get('compare', '').split(',') if name]
+                payload = presence_bitmaps.presence_query(
+                    start, end, course=request.GET.get('course') or None,
+                    compare=compare, absent_streak=absent_streak,
+                )
+                entry = response_cache.set(key, etag, payload)
+            
+            return encoded_response(request, entry)
+            
+        except Exception as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+    
+    return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
+
+# ============ MONITORING ENDPOINTS ============
+
+def metrics_api(request):
+    """Request, database and scan metrics of this process in Prometheus text format"""
+    if request.method != 'GET':
+        return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
+    
+    roster = roster_cache.stats()
+    responses = response_cache.stats()
+    dedupe = scan_dedupe.stats()
+    samples = [
+        ('attendance_db_writer_queue_depth', 'gauge', 'Writes waiting for the single writer thread', db_writer.depth()),
+        ('attendance_live_feed_subscribers', 'gauge', 'Open Server-Sent Events connections', broker.subscriber_count()),
+        ('attendance_roster_cache_students', 'gauge', 'Students held in the roster cache', roster['size']),
+        ('attendance_roster_cache_hits_total', 'counter', 'Roster cache hits', roster['hits']),
+        ('attendance_roster_cache_misses_total', 'counter', 'Roster cache misses', roster['misses']),
+        ('attendance_response_cache_entries', 'gauge', 'Encoded responses held in the response cache', responses['size']),
+        ('attendance_response_cache_hits_total', 'counter', 'Response cache hits', responses['hits']),
+        ('attendance_scan_dedupe_entries', 'gauge', 'Students remembered as present for repeat scans', dedupe['size']),
+        ('attendance_scan_dedupe_hits_total', 'counter', 'Repeat scans answered from memory', dedupe['hits']),
+        ('attendance_idempotent_replays_total', 'counter', 'Responses replayed for a repeated Idempotency-Key',
+         idempotency_store.stats()['replays']),
+        ('attendance_scan_rate_limited_total', 'counter', 'Scan requests refused with 429 by the per-device limit',
+         scan_limiter.stats()['limited']),
+        ('attendance_upload_rate_limited_total', 'counter', 'Upload requests refused with 429 by the per-device limit',
+         upload_limiter.stats()['limited']),
+        ('attendance_rate_limit_clients', 'gauge', 'Devices with a scan rate-limit bucket',
+         scan_limiter.stats()['clients']),
+        ('attendance_write_views_in_flight', 'gauge', 'Write requests being handled', write_gate.stats()['in_flight']),
+        ('attendance_load_shed_total', 'counter', 'Write requests refused with 503 while the write path was saturated',
+         write_gate.stats()['shed']),
+    ]
+    return HttpResponse(metrics.registry.render(samples), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def database_health_api(request):
+    """Probe every configured database; 503 when a primary is down (replicas only degrade)"""
+    if request.method != 'GET':
+        return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
+    
+    databases = {}
+    primaries_ok = True
+    for alias, role in database_roles().items():
+        databases[alias] = dict(database_health.check(alias), role=role, vendor=connections[alias].vendor)
+        if role == 'primary' and not databases[alias]['ok']:
+            primaries_ok = False
+    
+    return JsonResponse({
+        'status': 'success' if primaries_ok else 'error',
+        'degraded': not all(database['ok'] for database in databases.values()),
+        'databases': databases,
+        'campuses': campus_databases(),
+        'default_database': default_database(),
+    }, status=200 if primaries_ok else 503)
@@ -0,0 +1,17 @@
+"""
+URLconf used for requests served through school_project/asgi.py.
+
+The hot attendance APIs resolve to their async versions; everything else falls
+through to the regular (WSGI) URLconf.
+"""
+from django.urls import path
+from attendance_app import async_views
+from school_project.urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/students/', async_views.get_students_api, name='api_get_students'),
+    path('api/attendance/mark/', async_views.mark_attendance_api, name='api_mark_attendance'),
+    path('api/attendance/daily/', async_views.get_daily_attendance_api, name='api_daily_attendance'),
+    path('api/attendance/stream/', async_views.attendance_stream_api, name='api_attendance_stream'),
+    path('api/attendance/export/', async_views.export_attendance_api, name='api_export_attendance'),
+] + sync_urlpatterns
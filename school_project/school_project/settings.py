@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -37,6 +38,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so it times the whole stack (exposed at /api/metrics/)
+    'attendance_app.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -44,9 +47,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'attendance_app.middleware.ASGIURLConfMiddleware',
+    # After the auth/session middleware, which stay on the default database
+    'attendance_app.middleware.CampusRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'school_project.urls'
+# Requests served by asgi.py use the async attendance views
+ASGI_ROOT_URLCONF = 'school_project.asgi_urls'
 
 TEMPLATES = [
     {
@@ -76,6 +84,93 @@ DATABASES = {
     }
 }
 
+# Opt-in SQLite production profile: run with ATTENDANCE_DB_PROFILE=production.
+# WAL lets dashboards read while scans are written, a busy timeout makes writers
+# wait instead of failing with "database is locked", and attendance writes are
+# serialized through a single writer thread (attendance_app/db_writer.py).
+# Compare with: python manage.py benchmark_sqlite_profile
+ATTENDANCE_DB_PROFILE = os.environ.get('ATTENDANCE_DB_PROFILE', 'default')
+
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,  # milliseconds
+    'mmap_size': 268435456,  # 256 MB
+    'cache_size': -65536,  # 64 MB
+    'temp_store': 'MEMORY',
+}
+
+SQLITE_PRAGMAS = {}
+ATTENDANCE_SINGLE_WRITER = False
+ATTENDANCE_WRITE_TIMEOUT = 30
+
+# Campus shards and read replicas (see attendance_app/db_routing.py). Each
+# campus has a database of its own, picked per request by the X-Campus header
+# (or ?campus=). ATTENDANCE_CAMPUSES=north,south adds db_campus_north.sqlite3
+# and db_campus_south.sqlite3 for local testing; create their tables with
+# python manage.py migrate --database campus_north. ATTENDANCE_CAMPUS sets the
+# campus of management commands and of requests that name none.
+# ATTENDANCE_READ_REPLICA=1 adds a <alias>_replica database next to every
+# primary, which roster, daily and report reads use while it is healthy;
+# python manage.py sync_replica refreshes the SQLite copies.
+ATTENDANCE_CAMPUS_DATABASES = {}
+for campus in filter(None, (name.strip() for name in os.environ.get('ATTENDANCE_CAMPUSES', '').split(','))):
+    ATTENDANCE_CAMPUS_DATABASES[campus] = f'campus_{campus}'
+    DATABASES[f'campus_{campus}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'db_campus_{campus}.sqlite3',
+    }
+ATTENDANCE_DEFAULT_CAMPUS = os.environ.get('ATTENDANCE_CAMPUS') or None
+
+ATTENDANCE_READ_REPLICAS = {}
+if os.environ.get('ATTENDANCE_READ_REPLICA') == '1':
+    for alias, database in list(DATABASES.items()):
+        ATTENDANCE_READ_REPLICAS[alias] = f'{alias}_replica'
+        DATABASES[f'{alias}_replica'] = dict(
+            database, NAME=database['NAME'].with_name(f"{database['NAME'].stem}_replica.sqlite3")
+        )
+# Seconds between liveness probes of a replica; an unhealthy one is skipped
+ATTENDANCE_DB_HEALTH_INTERVAL = 5.0
+
+DATABASE_ROUTERS = ['attendance_app.db_routing.AttendanceRouter']
+
+# Persistent connections (0 closes them after every request). Reused
+# connections are checked before each request, so a dropped one is replaced.
+ATTENDANCE_CONN_MAX_AGE = int(os.environ.get(
+    'ATTENDANCE_CONN_MAX_AGE', 600 if ATTENDANCE_DB_PROFILE == 'production' else 0
+))
+
+if ATTENDANCE_DB_PROFILE == 'production':
+    for database in DATABASES.values():
+        database['OPTIONS'] = {'timeout': 20}
+    SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS
+    ATTENDANCE_SINGLE_WRITER = True
+
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = ATTENDANCE_CONN_MAX_AGE
+    database['CONN_HEALTH_CHECKS'] = ATTENDANCE_CONN_MAX_AGE > 0
+
+# The version counters behind the roster cache, ETags and cached responses
+# (attendance_app/versions.py) must be shared by every worker, or a write in
+# one worker leaves the others serving stale data. The per-process memory
+# cache only suits a single process such as runserver. ATTENDANCE_CACHE=file
+# shares them between the workers of one host (files in ATTENDANCE_CACHE_DIR),
+# and ATTENDANCE_CACHE=redis://host:6379/0 between hosts (needs the redis
+# package). The production profile defaults to file.
+ATTENDANCE_CACHE = os.environ.get('ATTENDANCE_CACHE', 'file' if ATTENDANCE_DB_PROFILE == 'production' else 'locmem')
+if ATTENDANCE_CACHE == 'file':
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('ATTENDANCE_CACHE_DIR', BASE_DIR / 'cache' / 'versions'),
+    }}
+elif ATTENDANCE_CACHE.startswith(('redis://', 'rediss://')):
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': ATTENDANCE_CACHE,
+    }}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -112,3 +207,62 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# collectstatic writes content-hashed names plus .gz (and, with brotli
+# installed, .br) variants; see attendance_app/static_assets.py
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'attendance_app.static_assets.PrecompressedManifestStaticFilesStorage'},
+}
+
+
+# Attendance app
+# Upper bound on student records kept in each worker's in-memory roster cache
+ROSTER_CACHE_SIZE = 10000
+# Seconds between checks of the shared roster version (see attendance_app/versions.py)
+ROSTER_CACHE_VERSION_CHECK_INTERVAL = 1.0
+# Encoded /api/students/ and /api/attendance/daily/ responses kept per worker, keyed by ETag
+RESPONSE_CACHE_SIZE = 64
+# Repeat scans of a student already present are answered from memory for this many seconds (0 disables)
+SCAN_DEDUPE_TTL = 300
+SCAN_DEDUPE_SIZE = 20000
+# Token bucket per device (X-Device-ID header, else teacher_id, else IP) on the scan
+# endpoints: sustained requests per second and burst; beyond that 429 + Retry-After.
+# A rate of 0 disables the limit. Buckets are kept per worker.
+SCAN_RATE_LIMIT = 5
+SCAN_RATE_BURST = 20
+UPLOAD_RATE_LIMIT = 0.5
+UPLOAD_RATE_BURST = 5
+RATE_LIMIT_MAX_CLIENTS = 10000
+# Only behind a proxy that sets it: take the client IP from X-Forwarded-For
+RATE_LIMIT_TRUST_FORWARDED_FOR = False
+# Write endpoints answer 503 + Retry-After while this many are running in the worker
+# or more than ATTENDANCE_WRITE_QUEUE_LIMIT writes wait for the single writer (0 disables)
+ATTENDANCE_MAX_WRITES_IN_FLIGHT = 32
+ATTENDANCE_WRITE_QUEUE_LIMIT = 100
+# Responses replayed for a repeated Idempotency-Key header on the scan endpoints
+IDEMPOTENCY_KEY_TTL = 86400
+IDEMPOTENCY_CACHE_SIZE = 10000
+# Badge QR payloads (STUDENT:v2:<id>:<hmac>); the key defaults to SECRET_KEY.
+# Changing it invalidates printed badges. Legacy STUDENT:<id> codes are accepted
+# while QR_ACCEPT_LEGACY is True.
+QR_SIGNING_KEY = None
+QR_ACCEPT_LEGACY = True
+# Content-addressed cache of rendered badge QR images (/api/students/qr/, needs qrcode)
+QR_IMAGE_CACHE_DIR = BASE_DIR / 'cache' / 'qr'
+# Server-side QR decoding for /api/attendance/upload/ (needs opencv-python-headless)
+QR_DECODE_WORKERS = None  # defaults to min(4, CPU count)
+QR_DECODE_MAX_DIMENSION = 1600  # photos are downscaled to this longest side before detection
+QR_DECODE_TIMEOUT = 10  # seconds for all the images of one upload together
+# Store presence only; absence is derived from the active roster (see attendance_app/presence.py).
+# False restores the dense mode that creates an absent row per registered student per day.
+ATTENDANCE_SPARSE_PRESENCE = True
+# Rows per bulk upsert for /api/students/import/ and the import_students command
+STUDENT_IMPORT_CHUNK_SIZE = 1000
+# Rows fetched and encoded per chunk by /api/attendance/export/ and export_attendance
+EXPORT_CHUNK_SIZE = 2000
+# AttendanceLog retention (python manage.py archive_attendance_logs)
+ATTENDANCE_LOG_RETENTION_DAYS = 180
+ATTENDANCE_LOG_ARCHIVE_DIR = BASE_DIR / 'archive' / 'attendance_logs'
+ATTENDANCE_LOG_DELETE_BATCH = 5000
@@ -1,8 +1,14 @@
-from django.urls import path
+import re
+
+from django.conf import settings
+from django.urls import path, re_path
 from attendance_app import views
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('sw.js', views.service_worker, name='service_worker'),
+    # Collected assets when no web server in front serves STATIC_ROOT (runserver serves them itself with DEBUG)
+    re_path(r'^%s(?P<path>.+)$' % re.escape(settings.STATIC_URL.lstrip('/')), views.static_asset, name='static_asset'),
     
     # API Paths - Authentication
     path('api/login/student/', views.student_login_api, name='api_student_login'),
@@ -10,11 +16,26 @@ urlpatterns = [
     
     # API Paths - Student Management
     path('api/students/', views.get_students_api, name='api_get_students'),
+    path('api/students/search/', views.search_students_api, name='api_search_students'),
     path('api/students/update/', views.update_student_api, name='api_update_student'),
     path('api/students/delete/', views.delete_student_api, name='api_delete_student'),
+    path('api/students/import/', views.import_students_api, name='api_import_students'),
+    path('api/students/qr/', views.student_qr_image_api, name='api_student_qr'),
     
     # API Paths - Attendance
     path('api/attendance/mark/', views.mark_attendance_api, name='api_mark_attendance'),
+    path('api/attendance/mark/batch/', views.mark_attendance_batch_api, name='api_mark_attendance_batch'),
     path('api/attendance/daily/', views.get_daily_attendance_api, name='api_daily_attendance'),
+    path('api/attendance/stream/', views.attendance_stream_api, name='api_attendance_stream'),
+    path('api/attendance/export/', views.export_attendance_api, name='api_export_attendance'),
     path('api/attendance/upload/', views.upload_qr_image_api, name='api_upload_qr'),
+    path('api/attendance/logs/', views.attendance_logs_api, name='api_attendance_logs'),
+    
+    # API Paths - Reports
+    path('api/reports/attendance/', views.attendance_report_api, name='api_attendance_report'),
+    path('api/reports/presence/', views.presence_query_api, name='api_presence_query'),
+    
+    # API Paths - Monitoring
+    path('api/metrics/', views.metrics_api, name='api_metrics'),
+    path('api/health/', views.database_health_api, name='api_database_health'),
 ]
\ No newline at end of file